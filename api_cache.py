@@ -0,0 +1,224 @@
+'''
+This module is used to cache OMDB responses on disk.
+'''
+
+import json
+import sqlite3
+import threading
+import time
+from api_requester import IApiRequester
+import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used);
+"""
+
+DAY = 24 * 60 * 60
+
+# The share of max_entries evicted beyond the excess, so the responses are
+# only counted again once that many were cached, not on every insert.
+EVICTION_SLACK = 0.01
+
+
+def normalize_title(title):
+    """
+    Normalize a title for use as a cache key.
+
+    Args:
+        title (str): The title of the movie.
+
+    Returns:
+        str: The title folded to lower case with collapsed whitespace.
+    """
+    return " ".join(title.casefold().split())
+
+
+class CachingApiRequester(IApiRequester):
+    """
+    API requester that caches the responses of another requester on disk.
+
+    Responses are stored in a SQLite file under the normalized title and,
+    for found movies, under their imdbID as well. Found movies are kept for
+    ttl seconds and "Response": "False" answers for negative_ttl seconds.
+    Once more than max_entries responses are stored, the least recently
+    used ones are evicted, with EVICTION_SLACK to spare. Failed requests
+    (None) are never cached.
+
+    Args:
+        requester (IApiRequester): The requester to fetch cache misses from.
+        cache_path (str): The path to the SQLite file storing the responses.
+        ttl (float): Seconds a found movie stays cached.
+        negative_ttl (float): Seconds a movie that was not found stays cached.
+        max_entries (int): The maximum number of cached responses.
+        clock (callable): Returns the current time in seconds.
+
+    Attributes:
+        hits (int): The number of requests answered from the cache.
+        misses (int): The number of requests forwarded to the requester.
+        _requester (IApiRequester): The requester to fetch cache misses from.
+        _ttl (float): Seconds a found movie stays cached.
+        _negative_ttl (float): Seconds a movie that was not found stays cached.
+        _max_entries (int): The maximum number of cached responses.
+        _clock (callable): Returns the current time in seconds.
+        _connection (sqlite3.Connection): The connection to the cache file.
+        _lock (threading.Lock): Serializes access to the connection.
+        _count (int): The number of cached responses, counting those cached
+        by other processes only as of the last count.
+    """
+
+    def __init__(self, requester: IApiRequester, cache_path: str, ttl: float = 30 * DAY,
+                 negative_ttl: float = 60 * 60, max_entries: int = 100_000, clock=time.time):
+        self.hits = 0
+        self.misses = 0
+        self._requester = requester
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._connection = sqlite3.connect(cache_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        (self._count,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+
+    def _get(self, key):
+        """
+        Look up a cached response and mark it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            dict: The cached response, or None if missing or expired.
+        """
+        now = self._clock()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT data, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._count -= self._connection.execute(
+                    "DELETE FROM responses WHERE key = ?", (key,)).rowcount
+                return None
+            self._connection.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def _put(self, keys, movie_data):
+        """
+        Cache a response under one or more keys and evict the least recently used.
+
+        Args:
+            keys (list): The cache keys.
+            movie_data (dict): The response to cache.
+        """
+        now = self._clock()
+        ttl = self._negative_ttl if movie_data.get("Response") == "False" else self._ttl
+        data = json.dumps(movie_data)
+        with self._lock, self._connection:
+            (replaced,) = self._connection.execute(
+                "SELECT COUNT(*) FROM responses WHERE key IN (SELECT value FROM json_each(?))",
+                (json.dumps(keys),)).fetchone()
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO responses (key, data, expires_at, last_used) "
+                "VALUES (?, ?, ?, ?)", ((key, data, now + ttl, now) for key in keys))
+            self._count += len(keys) - replaced
+            if self._count > self._max_entries:
+                self._evict()
+
+    def _evict(self):
+        """
+        Evict the least recently used responses once more than max_entries
+        are cached. Must be called inside a transaction. The responses are
+        counted again first, as other processes may share the cache file.
+        """
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self._max_entries:
+            excess = count - self._max_entries + int(self._max_entries * EVICTION_SLACK)
+            count -= self._connection.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used LIMIT ?)", (excess,)).rowcount
+        self._count = count
+
+    def _fetch(self, key, request, argument):
+        """
+        Answer a request from the cache, or forward it and cache the response.
+
+        Args:
+            key (str): The cache key of the request.
+            request (callable): The method of the requester to call on a miss.
+            argument (str): The title or imdbID to request.
+
+        Returns:
+            dict: The movie data.
+        """
+        movie_data = self._get(key)
+        with self._lock:
+            if movie_data is not None:
+                self.hits += 1
+                metrics.count("api.cache_hits")
+                return movie_data
+            self.misses += 1
+        metrics.count("api.cache_misses")
+        movie_data = request(argument)
+        if movie_data is not None:
+            keys = [key]
+            if movie_data.get("imdbID"):
+                keys.append(f"id:{movie_data['imdbID']}")
+            self._put(keys, movie_data)
+        return movie_data
+
+    def request_movie_data(self, title):
+        """
+        Request movie data by title, from the cache if possible.
+
+        Args:
+            title (str): The title of the movie.
+
+        Returns:
+            dict: The movie data.
+
+        """
+        return self._fetch(f"title:{normalize_title(title)}",
+                           self._requester.request_movie_data, title)
+
+    def request_movie_data_by_id(self, imdb_id):
+        """
+        Request movie data by IMDb id, from the cache if possible.
+
+        Args:
+            imdb_id (str): The IMDb id of the movie, e.g. "tt0800369".
+
+        Returns:
+            dict: The movie data.
+
+        """
+        return self._fetch(f"id:{imdb_id}", self._requester.request_movie_data_by_id, imdb_id)
+
+    def extract_data(self, movie_data):
+        """
+        Extracts relevant movie information using the wrapped requester.
+
+        Args:
+            movie_data (dict): The movie data retrieved from the API.
+
+        Returns:
+            dict: The extracted movie information.
+
+        """
+        return self._requester.extract_data(movie_data)
+
+    def clear(self):
+        """
+        Remove every cached response.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
@@ -2,8 +2,126 @@
 This module is used to make api request to OMDB.
 '''
 
+import random
+import re
+import threading
+import time
 from abc import ABC, abstractmethod
-import requests
+from email.utils import parsedate_to_datetime
+import metrics
+
+# Responses worth retrying: rate limiting and transient server errors.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class ApiError(Exception):
+    """
+    Raised when the API cannot be reached or answers with an error.
+
+    Args:
+        message (str): The description of the error.
+        status_code (int): The HTTP status of the last response, or None if
+        no response was received.
+
+    Attributes:
+        status_code (int): The HTTP status of the last response, or None.
+    """
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header.
+
+    Args:
+        value (str): The header value, in seconds or as an HTTP date.
+
+    Returns:
+        float: The seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, backoff, max_backoff):
+    """
+    Compute a jittered exponential backoff delay.
+
+    Args:
+        attempt (int): The number of the failed attempt, starting at 0.
+        backoff (float): The base delay in seconds.
+        max_backoff (float): The maximum delay in seconds.
+
+    Returns:
+        float: A random delay between 0 and min(max_backoff, backoff * 2 ** attempt).
+    """
+    return random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+
+
+def parse_year(value):
+    """
+    Parse the Year of an OMDB answer, which is a range such as "2019–2022"
+    for a series.
+
+    Args:
+        value (str): The year, as OMDB answers it.
+
+    Returns:
+        int: The first year, or None if the answer has none, e.g. "N/A".
+    """
+    match = re.match(r"\s*(\d{4})", str(value or ""))
+    return int(match.group(1)) if match else None
+
+
+def parse_rating(value):
+    """
+    Parse the imdbRating of an OMDB answer.
+
+    Args:
+        value (str): The rating, as OMDB answers it.
+
+    Returns:
+        float: The rating, or None if the movie has none, e.g. "N/A".
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_movie_data(movie_data):
+    """
+    Extracts relevant movie information from the data received from the API.
+
+    Args:
+        movie_data (dict): The movie data retrieved from the API.
+
+    Returns:
+        dict: The extracted movie information.
+    """
+    return {
+        "title": movie_data.get("Title"),
+        "year": parse_year(movie_data.get("Year")),
+        "rating": parse_rating(movie_data.get("imdbRating")),
+        "poster_url": movie_data.get("Poster"),
+        "imdbID": movie_data.get("imdbID"),
+        "genre": movie_data.get("Genre"),
+        "director": movie_data.get("Director"),
+        "actors": movie_data.get("Actors"),
+        "plot": movie_data.get("Plot"),
+    }
+
 
 class IApiRequester(ABC):
     """
@@ -22,6 +140,25 @@ class IApiRequester(ABC):
         Returns:
             dict: The movie data retrieved from the API.
 
+        Raises:
+            ApiError: If the API cannot be reached or answers with an error.
+
+        """
+
+    @abstractmethod
+    def request_movie_data_by_id(self, imdb_id):
+        """
+        Abstract method to request movie data from the API by IMDb id.
+
+        Args:
+            imdb_id (str): The IMDb id of the movie, e.g. "tt0800369".
+
+        Returns:
+            dict: The movie data retrieved from the API.
+
+        Raises:
+            ApiError: If the API cannot be reached or answers with an error.
+
         """
 
 
@@ -29,19 +166,123 @@ class ApiRequester(IApiRequester):
     """
     Class representing an API requester implementation.
 
+    Requests go through a pooled keep-alive session, created on the first
+    request so that requests is only imported by processes calling the
+    API. Lookups that fail with
+    a connection error, a timeout, HTTP 429 or a 5xx status are retried with
+    jittered exponential backoff, honoring the Retry-After header.
+
     Args:
         base_url (str): The base URL of the API.
         api_key (str): The API key to access the API.
+        pool_size (int): The maximum number of pooled connections.
+        timeout (tuple): The connect and read timeouts in seconds.
+        max_retries (int): The number of retries after a failed attempt.
+        backoff (float): The base backoff delay in seconds.
+        max_backoff (float): The maximum delay between two attempts in seconds.
 
     Attributes:
         _base_url (str): The base URL of the API.
         _api_key (str): The API key to access the API.
+        _timeout (tuple): The connect and read timeouts in seconds.
+        _max_retries (int): The number of retries after a failed attempt.
+        _backoff (float): The base backoff delay in seconds.
+        _max_backoff (float): The maximum delay between two attempts in seconds.
+        _pool_size (int): The maximum number of pooled connections.
+        _session (requests.Session): The pooled HTTP session, or None before
+        the first request.
+        _session_lock (threading.Lock): Serializes the creation of the session.
 
     """
 
-    def __init__(self, base_url, api_key):
+    def __init__(self, base_url, api_key, pool_size=10, timeout=(3.05, 10),
+                 max_retries=3, backoff=0.5, max_backoff=30.0):
         self._base_url = base_url
         self._api_key = api_key
+        self._timeout = timeout
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def _get_session(self):
+        """
+        Return the pooled session, creating it on first use.
+
+        Returns:
+            requests.Session: The session.
+        """
+        with self._session_lock:
+            if self._session is None:
+                import requests  # pylint: disable=import-outside-toplevel
+                from requests.adapters import HTTPAdapter  # pylint: disable=import-outside-toplevel
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size,
+                                      pool_block=True)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def close(self):
+        """
+        Close the pooled connections.
+        """
+        if self._session is not None:
+            self._session.close()
+
+    def _request(self, params):
+        """
+        Send a request to the API, retrying transient failures.
+
+        Args:
+            params (dict): The query parameters besides the API key.
+
+        Returns:
+            dict: The movie data retrieved from the API. A movie that is not
+            found is returned as is, with "Response" set to "False".
+
+        Raises:
+            ApiError: If the API cannot be reached or answers with an error
+            once the retries are exhausted.
+
+        """
+        session = self._get_session()
+        import requests  # pylint: disable=import-outside-toplevel
+        attempt = 0
+        while True:
+            retry_after = None
+            metrics.count("api.calls")
+            try:
+                with metrics.timer("api.request"):
+                    response = session.get(f"{self._base_url}/",
+                                           params={**params, "apikey": self._api_key},
+                                           timeout=self._timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                # The message of the error contains the URL, and with it the API key.
+                failure = ApiError(f"API is not accessible ({type(error).__name__})")
+            else:
+                metrics.count("api.bytes_read", len(response.content))
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError as error:
+                        raise ApiError("API answered with invalid JSON", 200) from error
+                failure = ApiError(f"API answered with HTTP {response.status_code}",
+                                   response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    raise failure
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            if attempt == self._max_retries:
+                raise failure
+            if retry_after is None:
+                retry_after = backoff_delay(attempt, self._backoff, self._max_backoff)
+            metrics.count("api.retries")
+            time.sleep(min(retry_after, self._max_backoff))
+            attempt += 1
 
     def request_movie_data(self, title):
         """
@@ -54,18 +295,20 @@ class ApiRequester(IApiRequester):
             dict: The movie data retrieved from the API.
 
         """
-        response = requests.get(f"{self._base_url}/?t={title}&apikey={self._api_key}")
+        return self._request({"t": title})
+
+    def request_movie_data_by_id(self, imdb_id):
+        """
+        Request movie data from the API by IMDb id.
 
-        if response.status_code != 200:
-            print("Error: API is not accessible.")
-            return None
+        Args:
+            imdb_id (str): The IMDb id of the movie, e.g. "tt0800369".
 
-        movie_data = response.json()
-        if movie_data.get("Response") == "False":
-            print(f"Error: Movie {title} not found.")
-            return None
+        Returns:
+            dict: The movie data retrieved from the API.
 
-        return movie_data
+        """
+        return self._request({"i": imdb_id})
 
     def extract_data(self, movie_data):
         """
@@ -78,11 +321,4 @@ class ApiRequester(IApiRequester):
             dict: The extracted movie information.
 
         """
-        return {
-            "title": movie_data.get("Title"),
-            "year": int(movie_data.get("Year")),
-            "rating": float(movie_data.get("imdbRating")),
-            "poster_url": movie_data.get("Poster"),
-            "imdbID": movie_data.get("imdbID"),
-            "genre": movie_data.get("Genre"),
-        }
+        return extract_movie_data(movie_data)
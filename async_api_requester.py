@@ -0,0 +1,206 @@
+'''
+This module is used to make asynchronous api requests to OMDB.
+'''
+
+import asyncio
+from abc import ABC, abstractmethod
+import aiohttp
+from api_requester import (ApiError, RETRY_STATUSES, backoff_delay, extract_movie_data,
+                           parse_retry_after)
+import metrics
+
+
+class IAsyncApiRequester(ABC):
+    """
+    Abstract base class representing an asynchronous API requester.
+    The coroutine counterpart of IApiRequester.
+
+    """
+
+    @abstractmethod
+    async def request_movie_data(self, title):
+        """
+        Abstract method to request movie data from the API.
+
+        Args:
+            title (str): The title of the movie.
+
+        Returns:
+            dict: The movie data retrieved from the API.
+
+        Raises:
+            ApiError: If the API cannot be reached or answers with an error.
+
+        """
+
+    @abstractmethod
+    async def request_movie_data_by_id(self, imdb_id):
+        """
+        Abstract method to request movie data from the API by IMDb id.
+
+        Args:
+            imdb_id (str): The IMDb id of the movie, e.g. "tt0800369".
+
+        Returns:
+            dict: The movie data retrieved from the API.
+
+        Raises:
+            ApiError: If the API cannot be reached or answers with an error.
+
+        """
+
+
+class AsyncApiRequester(IAsyncApiRequester):
+    """
+    Class representing an asynchronous API requester implementation.
+
+    Requests share one aiohttp session, so hundreds of lookups can be in
+    flight on a single event loop. Failures are retried exactly like
+    ApiRequester does: connection errors, timeouts, HTTP 429 and 5xx with
+    jittered exponential backoff, honoring the Retry-After header.
+
+    Use it as an async context manager, or call close() when done.
+
+    Args:
+        base_url (str): The base URL of the API.
+        api_key (str): The API key to access the API.
+        pool_size (int): The maximum number of concurrent connections.
+        timeout (tuple): The connect and read timeouts in seconds.
+        max_retries (int): The number of retries after a failed attempt.
+        backoff (float): The base backoff delay in seconds.
+        max_backoff (float): The maximum delay between two attempts in seconds.
+
+    Attributes:
+        _base_url (str): The base URL of the API.
+        _api_key (str): The API key to access the API.
+        _pool_size (int): The maximum number of concurrent connections.
+        _timeout (aiohttp.ClientTimeout): The connect and read timeouts.
+        _max_retries (int): The number of retries after a failed attempt.
+        _backoff (float): The base backoff delay in seconds.
+        _max_backoff (float): The maximum delay between two attempts in seconds.
+        _session (aiohttp.ClientSession): The HTTP session, created on first use.
+
+    """
+
+    def __init__(self, base_url, api_key, pool_size=100, timeout=(3.05, 10),
+                 max_retries=3, backoff=0.5, max_backoff=30.0):
+        self._base_url = base_url
+        self._api_key = api_key
+        self._pool_size = pool_size
+        self._timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the HTTP session.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        """
+        Return the HTTP session, creating it on the running event loop.
+
+        Returns:
+            aiohttp.ClientSession: The session.
+        """
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self._pool_size)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._timeout)
+        return self._session
+
+    async def _request(self, params):
+        """
+        Send a request to the API, retrying transient failures.
+
+        Args:
+            params (dict): The query parameters besides the API key.
+
+        Returns:
+            dict: The movie data retrieved from the API. A movie that is not
+            found is returned as is, with "Response" set to "False".
+
+        Raises:
+            ApiError: If the API cannot be reached or answers with an error
+            once the retries are exhausted.
+
+        """
+        session = self._get_session()
+        attempt = 0
+        while True:
+            retry_after = None
+            metrics.count("api.calls")
+            try:
+                async with session.get(f"{self._base_url}/",
+                                       params={**params, "apikey": self._api_key}) as response:
+                    metrics.count("api.bytes_read", response.content_length or 0)
+                    if response.status == 200:
+                        try:
+                            return await response.json(content_type=None)
+                        except ValueError as error:
+                            raise ApiError("API answered with invalid JSON", 200) from error
+                    failure = ApiError(f"API answered with HTTP {response.status}",
+                                       response.status)
+                    if response.status not in RETRY_STATUSES:
+                        raise failure
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                # The message of the error contains the URL, and with it the API key.
+                failure = ApiError(f"API is not accessible ({type(error).__name__})")
+
+            if attempt == self._max_retries:
+                raise failure
+            if retry_after is None:
+                retry_after = backoff_delay(attempt, self._backoff, self._max_backoff)
+            metrics.count("api.retries")
+            await asyncio.sleep(min(retry_after, self._max_backoff))
+            attempt += 1
+
+    async def request_movie_data(self, title):
+        """
+        Request movie data from the API.
+
+        Args:
+            title (str): The title of the movie.
+
+        Returns:
+            dict: The movie data retrieved from the API.
+
+        """
+        return await self._request({"t": title})
+
+    async def request_movie_data_by_id(self, imdb_id):
+        """
+        Request movie data from the API by IMDb id.
+
+        Args:
+            imdb_id (str): The IMDb id of the movie, e.g. "tt0800369".
+
+        Returns:
+            dict: The movie data retrieved from the API.
+
+        """
+        return await self._request({"i": imdb_id})
+
+    def extract_data(self, movie_data):
+        """
+        Extracts relevant movie information from the data received from the API.
+
+        Args:
+            movie_data (dict): The movie data retrieved from the API.
+
+        Returns:
+            dict: The extracted movie information.
+
+        """
+        return extract_movie_data(movie_data)
@@ -0,0 +1,156 @@
+'''
+This module contains the asynchronous counterpart of the storage
+operations, for embedding the movie database in an asyncio service.
+'''
+
+import asyncio
+from api_requester import ApiError
+from async_api_requester import IAsyncApiRequester
+from bulk_import import extract_or_fail
+from istorage import IStorage
+
+
+class AsyncStorage:
+    """
+    AsyncStorage exposes the IStorage operations as coroutines.
+
+    OMDB lookups go through an IAsyncApiRequester, so many of them can be in
+    flight on one event loop. Reading and saving the storage file is handed
+    to a worker thread, one operation at a time, so a save never blocks the
+    event loop.
+
+    Args:
+        storage (IStorage): The storage holding the movies.
+        api_requester (IAsyncApiRequester): The requester used to fetch movie data.
+
+    Attributes:
+        _storage (IStorage): The storage holding the movies.
+        _api_requester (IAsyncApiRequester): The requester used to fetch movie data.
+        _lock (asyncio.Lock): Serializes the access to the storage.
+    """
+
+    def __init__(self, storage: IStorage, api_requester: IAsyncApiRequester):
+        self._storage = storage
+        self._api_requester = api_requester
+        self._lock = asyncio.Lock()
+
+    async def _run(self, method, *args):
+        """
+        Run a storage method in a worker thread.
+
+        Args:
+            method (callable): The storage method.
+            *args: The arguments of the method.
+
+        Returns:
+            The result of the method.
+        """
+        async with self._lock:
+            return await asyncio.to_thread(method, *args)
+
+    async def load_movies(self):
+        """
+        Load all movies.
+
+        Returns:
+            dict: The movie data keyed by title.
+        """
+        return await self._run(self._storage.load_movies)
+
+    async def list_movies(self):
+        """
+        List all movies in the database.
+        """
+        await self._run(self._storage.list_movies)
+
+    def _resolve(self, title):
+        """Resolve a title to the key of a stored movie, or None."""
+        return self._storage.title_lookup().resolve(title)
+
+    async def add_movie(self, title):
+        """
+        Add a new movie to the database. The movie is fetched on the event
+        loop, then checked and saved by the storage in one step, as
+        IStorage.add_movie does.
+
+        Args:
+            title (str): The title of the movie to be added.
+
+        Returns:
+            bool: Whether the movie was added.
+        """
+        existing = await self._run(self._resolve, title)
+        if existing is not None:
+            print(f"Movie {existing} already exists!")
+            return False
+        try:
+            movie_data = await self._api_requester.request_movie_data(title)
+        except ApiError as error:
+            print(f"Error: {error}")
+            return False
+        if movie_data.get("Response") == "False":
+            print(f"Error: Movie {title} not found.")
+            return False
+        movie = self._api_requester.extract_data(movie_data)
+        return await self._run(self._storage.add_fetched_movie, title, movie)
+
+    async def add_movies(self, titles, max_concurrency=100):
+        """
+        Fetch many movies concurrently and add them in a single save.
+        Behaves like IStorage.add_movies.
+
+        Args:
+            titles (list): The titles of the movies to be added.
+            max_concurrency (int): The maximum number of API requests in flight.
+
+        Returns:
+            dict: The "added" and "skipped" titles, and the "failed" titles
+            mapped to the reason they failed.
+        """
+        lookup = await self._run(self._storage.title_lookup)
+        skipped, new_titles = await self._run(lookup.split_titles, titles)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(title):
+            async with semaphore:
+                try:
+                    movie_data = await self._api_requester.request_movie_data(title)
+                except Exception as error:  # pylint: disable=broad-except
+                    return title, None, str(error) or type(error).__name__
+            return (title, *extract_or_fail(self._api_requester, movie_data))
+
+        movies = {}
+        failures = {}
+        for title, movie, failure in await asyncio.gather(*map(fetch, new_titles)):
+            if failure is None:
+                movies[title] = movie
+            else:
+                failures[title] = failure
+        # Stored movies may have changed while fetching.
+        skipped += await self._run(self._storage.add_fetched_movies, movies)
+        return {"added": list(movies), "skipped": skipped, "failed": failures}
+
+    async def delete_movie(self, title):
+        """
+        Delete a movie from the database.
+
+        Args:
+            title (str): The title of the movie to be deleted.
+
+        Returns:
+            bool: Whether the movie was deleted.
+        """
+        return await self._run(self._storage.delete_movie, title)
+
+    async def update_movie(self, title, notes):
+        """
+        Update the notes of a movie in the database.
+
+        Args:
+            title (str): The title of the movie to be updated.
+            notes (str): The additional notes for the movie.
+
+        Returns:
+            bool: Whether the movie was updated.
+        """
+        return await self._run(self._storage.update_movie, title, notes)
@@ -0,0 +1,4 @@
+'''
+Benchmarks for the movie app.
+Run: python3 -m benchmarks.<module> from the repository root.
+'''
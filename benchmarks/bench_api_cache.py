@@ -0,0 +1,40 @@
+'''
+Benchmark of the on-disk OMDB response cache against an offline stub.
+Run: python3 -m benchmarks.bench_api_cache [count]
+'''
+
+import os
+import sys
+import tempfile
+import time
+from api_cache import CachingApiRequester
+from benchmarks.synthetic import StubApiRequester
+
+LATENCY = 0.005  # simulated seconds per OMDB round trip
+
+
+class SlowStubApiRequester(StubApiRequester):
+    """Stub requester that sleeps like a network round trip."""
+
+    def request_movie_data(self, title):
+        time.sleep(LATENCY)
+        return super().request_movie_data(title)
+
+
+def main():
+    """Request every title twice and report the time and hit rate of each pass."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    titles = [f"Movie {i}" if i % 10 else f"Missing {i}" for i in range(count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        requester = CachingApiRequester(SlowStubApiRequester(), os.path.join(tmp, "cache.db"))
+        for label in ("cold", "warm"):
+            start = time.perf_counter()
+            for title in titles:
+                requester.request_movie_data(f"  {title.upper()} ")
+            elapsed = time.perf_counter() - start
+            print(f"{label}: {elapsed:7.3f}s for {count} titles "
+                  f"(hits={requester.hits}, misses={requester.misses})")
+
+
+if __name__ == "__main__":
+    main()
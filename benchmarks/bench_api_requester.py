@@ -0,0 +1,61 @@
+'''
+Latency and failure rate of ApiRequester against a flaky local OMDB stub.
+Run: python3 -m benchmarks.bench_api_requester [count] [failure_rate]
+
+Compares one connection per request without retries (the old
+requests.get behaviour) with the pooled session retrying failures.
+'''
+
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from api_requester import ApiRequester, ApiError
+from benchmarks.omdb_stub import OmdbStub
+
+
+class UnpooledApiRequester(ApiRequester):
+    """ApiRequester opening a new connection for every request."""
+
+    def __init__(self, base_url, api_key, max_retries):
+        super().__init__(base_url, api_key, max_retries=max_retries, backoff=0.01)
+        self._session = requests
+
+
+def run(requester, titles, workers):
+    """Request every title and return the latencies and the number of failures."""
+    def lookup(title):
+        start = time.perf_counter()
+        try:
+            requester.request_movie_data(title)
+            failed = False
+        except ApiError:
+            failed = True
+        return time.perf_counter() - start, failed
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lookup, titles))
+    return [latency for latency, _ in results], sum(failed for _, failed in results)
+
+
+def main():
+    """Benchmark both requesters and print latency percentiles and failure rates."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    failure_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    titles = [f"Movie {i}" for i in range(count)]
+    with OmdbStub(latency=0.002, failure_rate=failure_rate) as stub:
+        for label, requester in (
+                ("unpooled, no retry", UnpooledApiRequester(stub.base_url, "key", 0)),
+                ("pooled, no retry", ApiRequester(stub.base_url, "key", max_retries=0)),
+                ("pooled, retrying", ApiRequester(stub.base_url, "key", backoff=0.01))):
+            start = time.perf_counter()
+            latencies, failures = run(requester, titles, workers=8)
+            elapsed = time.perf_counter() - start
+            quantiles = statistics.quantiles(latencies, n=100)
+            print(f"{label:<20} {count / elapsed:7.1f} req/s  p50={quantiles[49] * 1000:6.1f}ms  "
+                  f"p99={quantiles[98] * 1000:6.1f}ms  failed={failures / count:6.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+'''
+Compare the asyncio and the threaded import paths against a local OMDB stub.
+Run: python3 -m benchmarks.bench_async [count] [latency]
+
+Both paths must store identical movies; the script fails otherwise.
+'''
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from api_requester import ApiRequester
+from async_api_requester import AsyncApiRequester
+from async_storage import AsyncStorage
+from storage_json import StorageJson
+from benchmarks.omdb_stub import OmdbStub
+
+
+async def import_async(storage, base_url, titles):
+    """Import titles through AsyncStorage and return the report."""
+    async with AsyncApiRequester(base_url, "key") as requester:
+        return await AsyncStorage(storage, requester).add_movies(titles, max_concurrency=200)
+
+
+def main():
+    """Import the same titles through both paths and compare."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    titles = [f"Movie {i}" if i % 50 else f"Missing {i}" for i in range(count)]
+    with OmdbStub(latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        sync_storage = StorageJson(os.path.join(tmp, "sync.json"),
+                                   ApiRequester(stub.base_url, "key", pool_size=32))
+        start = time.perf_counter()
+        sync_report = sync_storage.add_movies(titles, max_workers=32)
+        print(f"threads (32 workers): {count / (time.perf_counter() - start):8.1f} titles/s")
+
+        async_storage = StorageJson(os.path.join(tmp, "async.json"), None)
+        start = time.perf_counter()
+        async_report = asyncio.run(import_async(async_storage, stub.base_url, titles))
+        print(f"asyncio (200 in flight): {count / (time.perf_counter() - start):5.1f} titles/s")
+
+        assert sync_report == async_report, "reports differ"
+        assert sync_storage.load_movies() == async_storage.load_movies(), "movies differ"
+        print(f"identical results: {len(async_report['added'])} added, "
+              f"{len(async_report['failed'])} failed")
+
+
+if __name__ == "__main__":
+    main()
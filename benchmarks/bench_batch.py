@@ -0,0 +1,90 @@
+'''
+Benchmark of the batch command against one process per operation.
+Run: python3 -m benchmarks.bench_batch [count] [operations]
+
+Updates the notes of operations movies of a JSON catalogue of count
+movies, first running main.py once per update, as scripts driving the
+menu do, then running all the updates as one batch of JSON lines.
+
+Then runs a batch with invalid operations between two updates and
+checks that both updates are saved; the status is 1 if they are not.
+'''
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.synthetic import generate_movies, write_catalogue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+# Operations that fail on their own, without stopping the batch.
+INVALID = (
+    {"op": "top", "order_by": "bogus"},
+    {"op": "top", "limit": "5"},
+    {"op": "update", "title": 5, "notes": "not a title"},
+    {"op": "site", "page_size": 0},
+    {"op": ["not", "a", "command"]},
+)
+
+
+def check_invalid_lines(path, titles):
+    """
+    Run a batch with invalid operations between two updates.
+
+    Returns:
+        bool: Whether the invalid operations failed and both updates were saved.
+    """
+    operations = [{"op": "update", "title": titles[0], "notes": "before"}, *INVALID,
+                  {"op": "update", "title": titles[1], "notes": "after"}]
+    output = subprocess.run([sys.executable, MAIN, path, "batch"], cwd=os.path.dirname(path),
+                            input="".join(json.dumps(operation) + "\n" for operation in operations),
+                            text=True, check=False, capture_output=True).stdout
+    results = [json.loads(line) for line in output.splitlines()]
+    with open(path, "r", encoding="utf-8") as file:
+        stored = json.load(file)
+    return ([result["ok"] for result in results] == [True, *[False] * len(INVALID), True]
+            and stored[titles[0]].get("notes") == "before"
+            and stored[titles[1]].get("notes") == "after")
+
+
+def main():
+    """Run the same updates one process each, then as one batch."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    movies = generate_movies(count)
+    titles = list(movies)[:operations]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "movies.json")
+        write_catalogue(path, movies)
+        start = time.perf_counter()
+        for title in titles:
+            subprocess.run([sys.executable, MAIN, path, "update", title, "one by one"],
+                           cwd=tmp, check=True, capture_output=True)
+        single = time.perf_counter() - start
+
+        batch = "".join(json.dumps({"op": "update", "title": title, "notes": "batched"}) + "\n"
+                        for title in titles)
+        start = time.perf_counter()
+        subprocess.run([sys.executable, MAIN, path, "batch"], cwd=tmp, input=batch, text=True,
+                       check=True, capture_output=True)
+        batched = time.perf_counter() - start
+
+        with open(path, "r", encoding="utf-8") as file:
+            stored = json.load(file)
+        applied = sum(stored[title].get("notes") == "batched" for title in titles)
+        kept = check_invalid_lines(path, titles)
+    print(f"{operations} updates of a {count} movie catalogue")
+    print(f"  one process each {single:8.2f}s")
+    print(f"  one batch        {batched:8.2f}s  ({single / batched:.1f}x), "
+          f"{applied}/{operations} applied")
+    print(f"  {len(INVALID)} invalid lines between two updates: "
+          f"{'updates kept' if kept else 'UPDATES LOST'}")
+    sys.exit(0 if kept else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+'''
+Benchmark of bulk imports against a local OMDB stub server.
+Run: python3 -m benchmarks.bench_bulk_import [count] [latency]
+
+Shows how the import throughput scales with the number of workers.
+'''
+
+import os
+import sys
+import tempfile
+import time
+from api_requester import ApiRequester
+from storage_json import StorageJson
+from benchmarks.omdb_stub import OmdbStub
+
+
+def main():
+    """Import the same titles with a growing worker pool."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    titles = [f"Movie {i}" if i % 50 else f"Missing {i}" for i in range(count)]
+    with OmdbStub(latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        for workers in (1, 4, 16, 32):
+            storage = StorageJson(os.path.join(tmp, f"movies-{workers}.json"),
+                                  ApiRequester(stub.base_url, "key"))
+            start = time.perf_counter()
+            report = storage.add_movies(titles, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f"workers={workers:<3} {count / elapsed:8.1f} titles/s  "
+                  f"added={len(report['added'])} failed={len(report['failed'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+'''
+Benchmark of the resident movie cache of StorageJson and StorageCsv.
+Run: python3 -m benchmarks.bench_cache [count]
+
+Shows that after the first load, read-only menu actions no longer
+re-read the storage file, and how long a single mutation takes.
+'''
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from storage_json import StorageJson
+from storage_csv import StorageCsv
+from utility import Utility
+from benchmarks.synthetic import generate_movies, write_catalogue, StubApiRequester
+
+
+def _timed(func, *args):
+    """Run func silently and return the elapsed seconds."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+    return time.perf_counter() - start
+
+
+def run(storage):
+    """Time the menu actions against one storage and print a report."""
+    util = Utility(storage)
+    cache = storage._cache  # pylint: disable=protected-access
+    print(f"  cold load          {_timed(storage.load_movies):8.4f}s  reads={cache.loads}")
+    for name, action in (("list", storage.list_movies), ("stats", util.stats),
+                         ("search", lambda: util.search_movie("00042")),
+                         ("sorted", util.movies_sorted_by_rating)):
+        elapsed = min(_timed(action) for _ in range(3))
+        print(f"  warm {name:<14}{elapsed:8.4f}s  reads={cache.loads}")
+    title = next(iter(storage.load_movies()))
+    print(f"  update_movie       {_timed(storage.update_movie, title, 'notes'):8.4f}s"
+          f"  reads={cache.loads}")
+
+
+def main():
+    """Generate a catalogue and benchmark both storage backends."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    movies = generate_movies(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "movies.json")
+        csv_path = os.path.join(tmp, "movies.csv")
+        write_catalogue(json_path, movies)
+        write_catalogue(csv_path, movies)
+
+        for label, storage in (("StorageJson", StorageJson(json_path, StubApiRequester())),
+                               ("StorageCsv", StorageCsv(csv_path, StubApiRequester()))):
+            print(f"{label} with {count} movies")
+            run(storage)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+'''
+Benchmark of the rating charts.
+Run: python3 -m benchmarks.bench_charts [count]
+
+Compares drawing the former histogram, from a list of every rating, with
+drawing the four charts from the binned rating statistics, then calls
+again with unchanged data, after a change the charts do not show, and
+after a movie was added.
+'''
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from charts import render_charts
+from storage_json import StorageJson
+from benchmarks.synthetic import generate_movies, write_catalogue, StubApiRequester
+
+
+def list_histogram(storage, path):
+    """Draw the histogram the way create_rating_histogram used to, to a file."""
+    from matplotlib.figure import Figure  # pylint: disable=import-outside-toplevel
+    ratings = [movie['rating'] for movie in storage.load_movies().values()]
+    figure = Figure()
+    axes = figure.subplots()
+    axes.hist(ratings)
+    figure.savefig(path)
+
+
+def _timed(func, *args):
+    """Run func silently, returning its result and the elapsed seconds."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    """Draw the charts of a synthetic catalogue as it changes."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "movies.json")
+        write_catalogue(path, generate_movies(count))
+        storage = StorageJson(path, StubApiRequester(), journaled=True)
+        storage.load_movies()
+        directory = os.path.join(tmp, "charts")
+        # matplotlib is imported once, outside of the timings.
+        list_histogram(storage, os.path.join(tmp, "warm.png"))
+
+        print(f"{count} movies")
+        _, seconds = _timed(list_histogram, storage, os.path.join(tmp, "histogram.png"))
+        print(f"  list of ratings, 1 histogram   {seconds:8.3f}s")
+
+        def charts():
+            return render_charts(storage.rating_stats(), directory, 'png')
+
+        for label, change in (
+                ("binned, 4 charts, first call", None),
+                ("binned, unchanged", None),
+                ("binned, after update_movie", lambda: storage.update_movie(
+                    next(iter(storage.load_movies())), "notes")),
+                ("binned, after add_movie", lambda: storage.add_movie("Brand New Movie"))):
+            if change is not None:
+                _timed(change)
+            drawn, seconds = _timed(charts)
+            print(f"  {label:<31}{seconds:8.3f}s  {len(drawn)} drawn")
+
+
+if __name__ == "__main__":
+    main()
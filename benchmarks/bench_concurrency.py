@@ -0,0 +1,78 @@
+'''
+Stress test of concurrent writers sharing one storage file.
+Run: python3 -m benchmarks.bench_concurrency [writers] [operations]
+
+Forks writers processes that each add operations movies and update the
+notes of their own movie after every add, all against the same file.
+Checks that every movie added and the last note of every writer are on
+disk, reports the throughput under contention and the number of writes
+that found the file changed since they read it, and exits with status 1
+if any update was lost.
+'''
+
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from main import create_storage
+from benchmarks.synthetic import generate_movies, write_catalogue, StubApiRequester
+
+
+def writer(file_path, journaled, number, operations, conflicts):
+    """Add movies and update the notes of this writer's movie."""
+    storage = create_storage(file_path, StubApiRequester(), journaled)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for operation in range(operations):
+            storage.add_movie(f"Writer {number} movie {operation}")
+            storage.update_movie(f"Seed {number}", f"note {operation}")
+    with conflicts.get_lock():
+        conflicts.value += storage.conflicts
+
+
+def run(file_path, journaled, writers, operations):
+    """Run the writers against one file and check what they left on disk."""
+    movies = generate_movies(1000)
+    movies.update({f"Seed {number}": {"title": f"Seed {number}", "year": 2000, "rating": 5.0}
+                   for number in range(writers)})
+    write_catalogue(file_path, movies)
+    conflicts = multiprocessing.Value("i", 0)
+    processes = [multiprocessing.Process(target=writer,
+                                         args=(file_path, journaled, number, operations,
+                                               conflicts))
+                 for number in range(writers)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    stored = create_storage(file_path, None, journaled).load_movies()
+    lost_adds = sum(f"Writer {number} movie {operation}" not in stored
+                    for number in range(writers) for operation in range(operations))
+    lost_notes = sum(stored[f"Seed {number}"].get("notes") != f"note {operations - 1}"
+                     for number in range(writers))
+    print(f"  {os.path.basename(file_path):<14}{'journaled' if journaled else '':<10}"
+          f"{2 * writers * operations / elapsed:8.1f} writes/s  conflicts={conflicts.value:<5}"
+          f"lost adds={lost_adds} lost notes={lost_notes}")
+    return lost_adds + lost_notes
+
+
+def main():
+    """Stress every file based storage with concurrent writers."""
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    print(f"{writers} writers, {operations} adds and {operations} updates each")
+    lost = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, journaled in (("movies.json", False), ("journal.json", True),
+                                ("movies.csv", False), ("movies.snap", False)):
+            lost += run(os.path.join(tmp, name), journaled, writers, operations)
+    sys.exit(1 if lost else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+'''
+Benchmark of journaled versus full-rewrite mutations.
+Run: python3 -m benchmarks.bench_journal [count]
+'''
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from storage_json import StorageJson
+from storage_csv import StorageCsv
+from benchmarks.synthetic import generate_movies, write_catalogue, StubApiRequester
+
+MUTATIONS = 50
+
+
+def run(storage, titles):
+    """Return the mean seconds per update_movie call."""
+    storage.load_movies()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for title in titles:
+            storage.update_movie(title, "seen it")
+    return (time.perf_counter() - start) / len(titles)
+
+
+def main():
+    """Benchmark update_movie with and without the journal for both backends."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    movies = generate_movies(count)
+    titles = list(movies)[:MUTATIONS]
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, cls, ext in (("StorageJson", StorageJson, "json"),
+                                ("StorageCsv", StorageCsv, "csv")):
+            for journaled in (False, True):
+                path = os.path.join(tmp, f"movies-{journaled}.{ext}")
+                write_catalogue(path, movies)
+                storage = cls(path, StubApiRequester(), journaled=journaled)
+                per_call = run(storage, titles)
+                mode = "journaled" if journaled else "rewrite"
+                print(f"{label:<12} {mode:<10} {count} movies: {per_call * 1000:8.2f} ms/update")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+'''
+Benchmark of title resolution in update_movie.
+Run: python3 -m benchmarks.bench_lookup [count] [updates]
+
+Updates the notes of movies of a journaled JSON catalogue, giving their
+titles in lower case so they have to be resolved, and compares the time
+per update with the two passes over the catalogue update_movie used to
+make to find a title ignoring case.
+'''
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from storage_json import StorageJson
+from benchmarks.synthetic import generate_movies, write_catalogue
+
+
+def scan_lookup(movies, title):
+    """Find a title ignoring case the way update_movie used to."""
+    title_lowercase = title.lower()
+    movies_lowercase = {k.lower(): v for k, v in movies.items()}
+    if movies_lowercase.get(title_lowercase):
+        return [k for k in movies.keys() if k.lower() == title_lowercase][0]
+    return None
+
+
+def main():
+    """Time case insensitive updates against the lookup and the old scans."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    movies = generate_movies(count)
+    titles = [title.lower() for title in list(movies)[::max(1, count // updates)][:updates]]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "movies.json")
+        write_catalogue(path, movies)
+        storage = StorageJson(path, None, journaled=True, compact_threshold=10 * updates)
+        start = time.perf_counter()
+        storage.title_lookup().resolve("")
+        built = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            updated = sum(bool(storage.update_movie(title, "seen")) for title in titles)
+        indexed = (time.perf_counter() - start) / len(titles)
+
+        loaded = storage.load_movies()
+        start = time.perf_counter()
+        for title in titles:
+            scan_lookup(loaded, title)
+        scanned = (time.perf_counter() - start) / len(titles)
+    print(f"{count} movies, loaded and indexed in {built * 1000:.1f}ms, "
+          f"{updated}/{len(titles)} updated")
+    print(f"  update with the lookup  {indexed * 1000:8.3f}ms")
+    print(f"  two scans to resolve    {scanned * 1000:8.3f}ms  ({scanned / indexed:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+'''
+Benchmark of the overhead of the instrumentation.
+Run: python3 -m benchmarks.bench_metrics [count]
+
+Times reading, searching, querying and updating a synthetic catalogue
+with the timers and counters off, as the app runs by default, and on, as
+with --profile, then prints what was recorded.
+'''
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import metrics
+from storage_json import StorageJson
+from utility import Utility
+from benchmarks.synthetic import generate_movies, write_catalogue, StubApiRequester
+
+ROUNDS = 1000
+
+
+def run(storage, util, titles):
+    """Return the seconds of ROUNDS rounds of reads, searches, queries and updates."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for number in range(ROUNDS):
+            storage.load_movies()
+            util.find_movies("the")
+            storage.query_movies(limit=10)
+            storage.update_movie(titles[number % len(titles)], f"seen {number}")
+    return time.perf_counter() - start
+
+
+def main():
+    """Compare the operations with the instrumentation off and on."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    movies = generate_movies(count)
+    titles = list(movies)[:50]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "movies.json")
+        write_catalogue(path, movies)
+        storage = StorageJson(path, StubApiRequester(), journaled=True)
+        util = Utility(storage, posters=False)
+        run(storage, util, titles)
+        timings = {}
+        recorded = None
+        for enabled in (False, True) * 3:
+            metrics.enable(enabled)
+            metrics.reset()
+            seconds = run(storage, util, titles)
+            if seconds <= timings.get(enabled, seconds):
+                timings[enabled] = seconds
+                if enabled:
+                    recorded = metrics.snapshot()
+        metrics.enable(False)
+    print(f"{count} movies, {ROUNDS} rounds, best of 3")
+    for enabled, label in ((False, "off"), (True, "on")):
+        print(f"  metrics {label:<4}{timings[enabled] * 1000:10.1f} ms")
+    print(f"  overhead   {timings[True] / timings[False] - 1:+9.1%}")
+    print(metrics.format_report(recorded, timings[True]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+'''
+Benchmark of the poster store against a local poster CDN.
+Run: python3 -m benchmarks.bench_posters [count] [latency]
+
+Downloads the posters of count movies one at a time and then
+concurrently, syncs again while the posters are fresh, checks them again
+with conditional requests, and downloads them again after every poster
+changed. Then compares the images the cards show with the posters they
+used to link.
+'''
+
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+from posters import PosterStore
+from utility import Utility
+from benchmarks.poster_stub import PosterStub
+from benchmarks.synthetic import generate_movies
+
+# The marks of a linked and of a size annotated card image.
+LINKED = 'src="http'
+ANNOTATED = 'decoding="async" width='
+
+
+def _sync(stub, store, urls, label):
+    """Sync urls and print the time taken, the requests made and the report."""
+    requests = stub.requests.value
+    start = time.perf_counter()
+    report = store.sync(urls)
+    seconds = time.perf_counter() - start
+    print(f"  {label:<24}{seconds:8.2f}s {stub.requests.value - requests:6} requests  "
+          f"{report['downloaded']} downloaded, {report['unchanged']} unchanged, "
+          f"{report['cached']} cached, {len(report['failed'])} failed")
+    return report
+
+
+def _size(directory, name):
+    """Return the size of a file in bytes."""
+    return os.path.getsize(os.path.join(directory, name))
+
+
+def main():
+    """Download, check and render the posters of a synthetic catalogue."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    movies = list(generate_movies(count).values())
+    with PosterStub(latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        # The last tenth of the movies share the posters of the first ones.
+        for number, movie in enumerate(movies):
+            movie["poster_url"] = stub.poster_url(number % max(1, count - count // 10))
+        urls = [movie["poster_url"] for movie in movies]
+        pillow = importlib.util.find_spec("PIL") is not None
+        print(f"{count} movies, {len(set(urls))} posters, {latency * 1000:.0f}ms latency, "
+              f"thumbnails {'made with Pillow' if pillow else 'off, Pillow is missing'}")
+
+        # The stub draws a poster on its first request, which is not timed.
+        PosterStore(os.path.join(tmp, "warm"), max_workers=8).sync(urls)
+        _sync(stub, PosterStore(os.path.join(tmp, "serial"), max_workers=1), urls,
+              "cold, one at a time")
+        directory = os.path.join(tmp, "posters")
+        store = PosterStore(directory, max_workers=8)
+        _sync(stub, store, urls, "cold, 8 concurrent")
+        _sync(stub, store, urls, "fresh")
+        not_modified = stub.not_modified.value
+        _sync(stub, PosterStore(directory, max_workers=8, max_age=0), urls, "stale, conditional")
+        print(f"  {'':<24}{stub.not_modified.value - not_modified} answered 304 Not Modified")
+        with stub.version.get_lock():
+            stub.version.value += 1
+        PosterStore(os.path.join(tmp, "warm"), max_workers=8, max_age=0).sync(urls)
+        changed = PosterStore(directory, max_workers=8, max_age=0)
+        failed = _sync(stub, changed, urls, "every poster changed")['failed']
+
+        with open(os.path.join(directory, "posters.json"), "rb") as file:
+            manifest = json.load(file)
+        images = changed.images()
+        stored = len(os.listdir(directory)) - 1
+        linked = sum(_size(directory, manifest[url]["file"]) for url in urls)
+        shown = sum(_size(tmp, images[url][0]) for url in urls)
+        # pylint: disable=protected-access
+        before = ''.join(Utility._generate_movie_html(movie) for movie in movies)
+        after = ''.join(Utility._generate_movie_html(movie, images.get(movie["poster_url"]))
+                        for movie in movies)
+    print(f"  {stored} files stored for {len(set(urls))} posters, {len(failed)} failed")
+    print(f"  card images   linked {linked / 2 ** 20:6.1f}MiB, "
+          f"local {shown / 2 ** 20:6.1f}MiB ({linked / shown:.1f}x lighter)")
+    print(f"  remote images linked {before.count(LINKED):6}, local {after.count(LINKED):6}, "
+          f"{after.count(ANNOTATED)} cards size annotated")
+
+
+if __name__ == "__main__":
+    main()
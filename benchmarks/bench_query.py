@@ -0,0 +1,77 @@
+'''
+Benchmark of top-k and range queries.
+Run: python3 -m benchmarks.bench_query [count]
+
+Compares sorting the whole catalogue for every query with the sorted
+indexes behind IStorage.query_movies, including the cost of keeping
+them up to date when a movie is added.
+'''
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from storage_json import StorageJson
+from benchmarks.synthetic import generate_movies, write_catalogue, StubApiRequester
+
+QUERIES = {
+    "top 50": {"limit": 50},
+    "rated 7 to 8, top 50": {"min_rating": 7, "max_rating": 8, "limit": 50},
+    "1990-1999, top 50": {"min_year": 1990, "max_year": 1999, "limit": 50},
+    "1990-1999 by year, 50": {"min_year": 1990, "max_year": 1999, "order_by": "year",
+                              "limit": 50},
+}
+
+
+def full_sort(movies, min_rating=None, max_rating=None, min_year=None, max_year=None,
+              order_by='rating', limit=None):
+    """Answer a query by filtering and sorting every movie."""
+    rows = [(title, movie['year'], movie['rating']) for title, movie in movies.items()
+            if (min_rating is None or movie['rating'] >= min_rating)
+            and (max_rating is None or movie['rating'] <= max_rating)
+            and (min_year is None or movie['year'] >= min_year)
+            and (max_year is None or movie['year'] <= max_year)]
+    if order_by == 'rating':
+        rows.sort(key=lambda row: (-row[2], row[0]))
+    else:
+        rows.sort(key=lambda row: (row[1], -row[2], row[0]))
+    return rows[:limit]
+
+
+def _timed(func, *args, **kwargs):
+    """Return the best of three elapsed seconds of func."""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    """Generate a catalogue and benchmark the queries against it."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    movies = generate_movies(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "movies.json")
+        write_catalogue(json_path, movies)
+        storage = StorageJson(json_path, StubApiRequester(), journaled=True)
+        movies = storage.load_movies()
+        start = time.perf_counter()
+        storage.query_movies(limit=1)
+        print(f"{count} movies, building the indexes {time.perf_counter() - start:8.4f}s")
+        for name, query in QUERIES.items():
+            print(f"  {name:<24} full sort {_timed(full_sort, movies, **query):8.4f}s"
+                  f"  indexed {_timed(storage.query_movies, **query):8.6f}s")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.add_movie("Brand New Movie")
+        elapsed = time.perf_counter() - start
+        print(f"  add_movie updating the indexes {elapsed:8.4f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+'''
+Benchmark of the catalogue refresh against a local OMDB stub server.
+Run: python3 -m benchmarks.bench_refresh [count] [latency]
+
+Refreshes a JSON catalogue with a growing worker pool, then interrupts a
+refresh halfway and resumes it from its checkpoint, counting the requests
+the resumed run sends.
+'''
+
+import os
+import sys
+import tempfile
+import time
+from api_requester import ApiRequester
+from refresh import refresh_movies
+from storage_json import StorageJson
+from benchmarks.omdb_stub import OmdbStub
+from benchmarks.synthetic import generate_movies, write_catalogue
+
+
+class InterruptingRequester(ApiRequester):
+    """ApiRequester raising KeyboardInterrupt once it sent limit requests."""
+
+    def __init__(self, base_url, limit):
+        super().__init__(base_url, "key")
+        self._limit = limit
+
+    def request_movie_data_by_id(self, imdb_id):
+        self._limit -= 1
+        if self._limit < 0:
+            raise KeyboardInterrupt
+        return super().request_movie_data_by_id(imdb_id)
+
+
+def main():
+    """Refresh the same catalogue with a growing worker pool, then resume one."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    movies = generate_movies(count)
+    with OmdbStub(latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        for workers in (1, 8, 32):
+            path = os.path.join(tmp, f"movies-{workers}.json")
+            write_catalogue(path, movies)
+            start = time.perf_counter()
+            report = refresh_movies(StorageJson(path, None), ApiRequester(stub.base_url, "key"),
+                                    max_workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f"workers={workers:<3} {count / elapsed:8.1f} movies/s  "
+                  f"updated={len(report['updated'])} unchanged={report['unchanged']}")
+
+        path = os.path.join(tmp, "resumed.json")
+        checkpoint = f"{path}.refresh"
+        write_catalogue(path, movies)
+        try:
+            refresh_movies(StorageJson(path, None),
+                           InterruptingRequester(stub.base_url, count // 2), max_workers=1,
+                           checkpoint_path=checkpoint)
+        except KeyboardInterrupt:
+            pass
+        with stub.requests.get_lock():
+            before = stub.requests.value
+        report = refresh_movies(StorageJson(path, None), ApiRequester(stub.base_url, "key"),
+                                max_workers=8, checkpoint_path=checkpoint)
+        print(f"resumed after {count // 2} requests: {stub.requests.value - before} more "
+              f"requests, updated={len(report['updated'])}, "
+              f"checkpoint left={os.path.exists(checkpoint)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+'''
+Benchmark of the random movie suggestions.
+Run: python3 -m benchmarks.bench_sampling [count]
+
+Compares picking a movie by listing the whole catalogue with the
+MovieSampler behind IStorage.sample_movies, uniform and weighted,
+and the cost of keeping it up to date when a movie is added.
+'''
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from storage_json import StorageJson
+from benchmarks.synthetic import generate_movies, write_catalogue, StubApiRequester
+
+
+def list_and_pick(movies):
+    """Pick a movie the way random_movie used to."""
+    return list(movies.items())[random.randint(0, len(movies) - 1)]
+
+
+def _per_call(func, *args, calls=100):
+    """Return the average seconds per call of func."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        func(*args)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    """Generate a catalogue and benchmark the suggestions against it."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    movies = generate_movies(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "movies.json")
+        write_catalogue(json_path, movies)
+        storage = StorageJson(json_path, StubApiRequester(), journaled=True)
+        movies = storage.load_movies()
+        print(f"{count} movies")
+        print(f"  list and pick, per call    {_per_call(list_and_pick, movies, calls=10):10.6f}s")
+        start = time.perf_counter()
+        storage.sample_movies()
+        print(f"  first sample, builds       {time.perf_counter() - start:10.6f}s")
+        print(f"  uniform sample, per call   {_per_call(storage.sample_movies):10.6f}s")
+        print(f"  10 suggestions, per call   {_per_call(storage.sample_movies, 10):10.6f}s")
+        start = time.perf_counter()
+        storage.sample_movies(1, 'rating')
+        print(f"  first weighted, builds     {time.perf_counter() - start:10.6f}s")
+        seconds = _per_call(storage.sample_movies, 1, 'rating')
+        print(f"  weighted sample, per call  {seconds:10.6f}s")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.add_movie("Brand New Movie")
+        print(f"  add_movie with sampler     {time.perf_counter() - start:10.6f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+'''
+Benchmark of the movie search.
+Run: python3 -m benchmarks.bench_search [count]
+
+Compares a linear substring scan with the search index: building it,
+loading it from disk in a new process, querying it exactly and with
+typos, and keeping it up to date after a mutation.
+'''
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from search_index import SearchIndex
+from storage_json import StorageJson
+from benchmarks.synthetic import generate_movies, write_catalogue, StubApiRequester
+
+QUERIES = ("movie 0004217", "0004217", "moive 004217", "drama")
+
+
+def _timed(func, *args):
+    """Run func silently and return the best of three elapsed seconds and its result."""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    """Generate a catalogue and benchmark the search against it."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    movies = generate_movies(count)
+
+    def scan(query):
+        query = query.lower()
+        return [title for title in movies if query in title.lower()]
+
+    start = time.perf_counter()
+    index = SearchIndex.build(movies)
+    print(f"build index ({count} movies)  {time.perf_counter() - start:8.4f}s")
+    for query in QUERIES:
+        scan_time, scanned = _timed(scan, query)
+        index_time, found = _timed(index.search, query, 10)
+        print(f"  {query!r:<16} scan {scan_time:8.4f}s ({len(scanned)} hits)"
+              f"  index {index_time:8.4f}s (top {found[:3]})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "movies.json")
+        write_catalogue(json_path, movies)
+        storage = StorageJson(json_path, StubApiRequester(), journaled=True)
+        storage.load_movies()
+        start = time.perf_counter()
+        storage.search_movies("0004217", 10)
+        print(f"first search, builds and saves  {time.perf_counter() - start:8.4f}s")
+        reopened = StorageJson(json_path, StubApiRequester(), journaled=True)
+        reopened.load_movies()
+        start = time.perf_counter()
+        reopened.search_movies("0004217", 10)
+        print(f"first search, loads saved index {time.perf_counter() - start:8.4f}s")
+        elapsed, _ = _timed(reopened.add_movie, "Brand New Movie")
+        print(f"add_movie with index listening  {elapsed:8.4f}s")
+        elapsed, found = _timed(reopened.search_movies, "brand new", 10)
+        print(f"search after mutation           {elapsed:8.4f}s {list(found)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+'''
+Benchmark of the paginated website generation.
+Run: python3 -m benchmarks.bench_site_pages [count] [page_size]
+'''
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from storage_json import StorageJson
+from utility import Utility, TEMPLATE_PATH, WEBSITE_PATH
+from benchmarks.synthetic import generate_movies, write_catalogue, StubApiRequester
+
+
+def main():
+    """Generate a paginated website with several groupings and worker counts."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    template = os.path.abspath(TEMPLATE_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "_static"))
+        shutil.copy(template, os.path.join(tmp, TEMPLATE_PATH))
+        os.chdir(tmp)
+        write_catalogue("movies.json", generate_movies(count))
+        util = Utility(StorageJson("movies.json", StubApiRequester()), posters=False)
+        # The charts are drawn once, outside of the timings.
+        util.generate_website(page_size, None, 1)
+        for group_by in (None, "genre", "letter"):
+            for workers in (1, os.cpu_count()):
+                for name in os.listdir("_static"):
+                    if name.startswith(("page", "index.")):
+                        os.remove(os.path.join("_static", name))
+                start = time.perf_counter()
+                util.generate_website(page_size, group_by, workers)
+                elapsed = time.perf_counter() - start
+                pages = sum(name.endswith(".html") for name in os.listdir("_static")) - 2
+                print(f"group_by={str(group_by):<7} workers={workers:<3} {elapsed:7.3f}s  "
+                      f"{pages} pages, index.html {os.path.getsize(WEBSITE_PATH) // 1024} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+'''
+Benchmark of the binary snapshot storage against the JSON and CSV
+storages on cold start.
+Run: python3 -m benchmarks.bench_snapshot [count]
+
+Each storage is opened in a fresh process, which loads the movies, looks
+up one title and reads its rating, as the menu does for a single action.
+Reports the elapsed time, the peak resident memory of the process and
+the file size. The movies carry a director, actors and a plot, so the
+records are as long as real OMDB data.
+'''
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.synthetic import generate_movies, write_catalogue
+
+# ru_maxrss of a child starts from the peak of the parent at fork time on
+# Linux, so the peak of the process itself is read from /proc when possible.
+PEAK_RSS = '''
+import resource
+def peak_rss():
+    try:
+        with open("/proc/self/status") as status:
+            return next(int(line.split()[1]) for line in status if line.startswith("VmHWM"))
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+'''
+
+CHILD = PEAK_RSS + '''
+import sys, time
+from main import create_storage
+start = time.perf_counter()
+movies = create_storage(sys.argv[1], None).load_movies()
+rating = movies[sys.argv[2]]['rating']
+print(time.perf_counter() - start, peak_rss())
+'''
+
+BASELINE = PEAK_RSS + '''
+from main import create_storage
+print(0, peak_rss())
+'''
+
+
+def _child(code, *args):
+    """Run code in a fresh interpreter and return its seconds and peak RSS in KiB."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code, *args], cwd=root, check=True,
+                            capture_output=True, text=True).stdout.split()
+    return float(output[0]), int(output[1])
+
+
+def main():
+    """Generate a catalogue, write it in every format and compare cold starts."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    movies = generate_movies(count, details=True)
+    title = f"Movie {count // 2:07d}"
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for extension in ("json", "csv", "snap"):
+            paths[extension] = os.path.join(tmp, f"movies.{extension}")
+            start = time.perf_counter()
+            write_catalogue(paths[extension], movies)
+            print(f"  write {extension:<5} {time.perf_counter() - start:8.2f}s")
+        del movies
+
+        _, baseline = _child(BASELINE)
+        print(f"{count} movies, interpreter and imports {baseline / 1024:.0f}MiB")
+        for extension, path in paths.items():
+            elapsed, peak = _child(CHILD, path, title)
+            print(f"  {extension:<5} cold start {elapsed:8.4f}s"
+                  f"  peak RSS {peak / 1024:8.1f}MiB (+{(peak - baseline) / 1024:.1f})"
+                  f"  file {os.path.getsize(path) / 2 ** 20:8.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
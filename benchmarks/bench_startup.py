@@ -0,0 +1,128 @@
+'''
+Benchmark of the start up cost of main.py for each entry path.
+Run: python3 -m benchmarks.bench_startup [--runs N] [--max-ms MS] [--max-mib MIB]
+
+Runs main.py with -X importtime for each storage format and a few
+commands, and reports the cumulative import time, the wall time and the
+peak resident memory of the process, best of --runs. Exits with status 1
+if a path imports a module it should not load, such as pandas for a JSON
+file, or if a path marked as light exceeds the time or memory cap.
+'''
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from main import create_storage
+from benchmarks.synthetic import generate_movies, write_catalogue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs main.py as a script, then reports the peak resident memory on stderr.
+CHILD = '''
+import runpy, sys
+sys.argv = sys.argv[1:]
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+finally:
+    with open("/proc/self/status") as status:
+        peak = next(int(line.split()[1]) for line in status if line.startswith("VmHWM"))
+    print(f"peak {peak}", file=sys.stderr)
+'''
+
+# The heavy modules, and the entry paths that must not import them.
+HEAVY = ('pandas', 'matplotlib', 'requests', 'numpy')
+
+# (name, arguments after main.py, modules that must not be imported, light)
+PATHS = (
+    ('help', ['--help'], HEAVY, True),
+    ('json list', ['{dir}/movies.json', '--json', 'list'], HEAVY, True),
+    ('json stats', ['{dir}/movies.json', '--json', 'stats'], HEAVY, True),
+    ('json top', ['{dir}/movies.json', '--json', 'top', '5'], HEAVY, True),
+    ('sqlite top', ['{dir}/movies.db', '--json', 'top', '5'], HEAVY, True),
+    ('snap top', ['{dir}/movies.snap', '--json', 'top', '5'], ('pandas', 'matplotlib',
+                                                              'requests'), False),
+    ('csv top', ['{dir}/movies.csv', '--json', 'top', '5'], ('matplotlib', 'requests'), False),
+)
+
+
+def run_path(arguments, cwd):
+    """
+    Run main.py once with -X importtime.
+
+    Args:
+        arguments (list): The arguments after main.py.
+        cwd (str): The directory to run in.
+
+    Returns:
+        tuple: The cumulative import time in ms, the wall time in ms, the
+        peak RSS in MiB and the set of top level modules imported.
+    """
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD,
+                                os.path.join(ROOT, "main.py"), *arguments], cwd=cwd,
+                               env=dict(os.environ, PYTHONPATH=ROOT), check=True,
+                               capture_output=True, text=True)
+    wall = (time.perf_counter() - start) * 1000
+    imported = 0
+    modules = set()
+    peak = 0
+    started = False
+    for line in completed.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if not cumulative.strip().isdigit():
+                continue
+            if name.strip() == "runpy":
+                # The interpreter and this wrapper are done starting up.
+                started = True
+            elif started and not name.startswith("  "):
+                # Only top level imports count, their own imports are included.
+                imported += int(cumulative)
+            modules.add(name.strip().split(".")[0])
+        elif line.startswith("peak "):
+            peak = int(line.split()[1]) / 1024
+    return imported / 1000, wall, peak, modules
+
+
+def main():
+    """Run every entry path and check it against its budget."""
+    parser = argparse.ArgumentParser(description='Benchmark the start up of main.py.')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--max-ms', type=float, default=150.0,
+                        help='Import time cap of the light paths in ms')
+    parser.add_argument('--max-mib', type=float, default=40.0,
+                        help='Peak RSS cap of the light paths in MiB')
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        movies = generate_movies(1000)
+        for extension in ('json', 'csv', 'snap'):
+            write_catalogue(os.path.join(tmp, f"movies.{extension}"), movies)
+        database = create_storage(os.path.join(tmp, "movies.db"), None)
+        database.import_movies(movies)
+        database.close()
+        print(f"{'path':<12}{'imports':>10}{'wall':>10}{'peak RSS':>12}")
+        for name, arguments, forbidden, light in PATHS:
+            arguments = [argument.format(dir=tmp) for argument in arguments]
+            runs = [run_path(arguments, tmp) for _ in range(args.runs)]
+            imported = min(run[0] for run in runs)
+            wall = min(run[1] for run in runs)
+            peak = min(run[2] for run in runs)
+            loaded = sorted(set(forbidden) & runs[0][3])
+            problems = [f"imports {module}" for module in loaded]
+            if light and imported > args.max_ms:
+                problems.append(f"imports take over {args.max_ms:.0f}ms")
+            if light and peak > args.max_mib:
+                problems.append(f"peak RSS over {args.max_mib:.0f}MiB")
+            failed = failed or bool(problems)
+            print(f"{name:<12}{imported:8.1f}ms{wall:8.1f}ms{peak:9.1f}MiB  "
+                  f"{', '.join(problems) or 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
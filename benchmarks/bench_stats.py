@@ -0,0 +1,59 @@
+'''
+Benchmark of the rating statistics.
+Run: python3 -m benchmarks.bench_stats [count]
+
+Compares the former sort based statistics with the histogram based
+RatingStats: the first call, which builds it in one pass, a repeated
+call, and a call after a movie was added.
+'''
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from storage_json import StorageJson
+from benchmarks.synthetic import generate_movies, write_catalogue, StubApiRequester
+
+
+def sorted_stats(movies):
+    """The statistics as computed before RatingStats: sum, full sort, extra pass."""
+    n = len(movies)
+    average = sum(float(movie['rating']) for movie in movies.values()) / n
+    sorted_ratings = sorted(movie['rating'] for movie in movies.values())
+    mid = n // 2
+    median = ((sorted_ratings[mid - 1] + sorted_ratings[mid]) / 2 if n % 2 == 0
+              else sorted_ratings[mid])
+    best = [title for title, movie in movies.items() if movie['rating'] == sorted_ratings[-1]]
+    worst = [title for title, movie in movies.items() if movie['rating'] == sorted_ratings[0]]
+    return average, median, best, worst
+
+
+def _timed(func, *args):
+    """Run func silently and return the elapsed seconds."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    """Generate a catalogue and benchmark the statistics against it."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    movies = generate_movies(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "movies.json")
+        write_catalogue(json_path, movies)
+        storage = StorageJson(json_path, StubApiRequester(), journaled=True)
+        movies = storage.load_movies()
+        print(f"{count} movies")
+        print(f"  sort based, every call   {_timed(sorted_stats, movies):8.4f}s")
+        print(f"  RatingStats, first call  {_timed(storage.rating_stats):8.4f}s")
+        print(f"  RatingStats, next call   {_timed(storage.rating_stats):8.4f}s")
+        storage.add_movie("Brand New Movie")
+        print(f"  RatingStats, after add   {_timed(storage.rating_stats):8.4f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+'''
+Benchmark of the streaming mode on catalogues larger than memory.
+Run: python3 -m benchmarks.bench_streaming [count] [--cap MiB]
+
+Writes a JSON and a CSV catalogue of count movies (5 million by default,
+about 2GB each) without holding them in memory, then lists, searches,
+summarizes and renders each one in a fresh process with a streaming
+Utility. Reports the time of every action and the peak resident memory
+of the process, and exits with status 1 if the peak exceeds the cap.
+'''
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.synthetic import iter_generated_movies, stream_catalogue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the catalogue directory, so the website is written there.
+CHILD = '''
+import contextlib, json, os, resource, sys, time
+from main import create_storage
+from utility import Utility
+
+def peak_rss():
+    try:
+        with open("/proc/self/status") as status:
+            return next(int(line.split()[1]) for line in status if line.startswith("VmHWM"))
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+util = Utility(create_storage(sys.argv[1], None), streaming=True)
+storage = util._storage
+timings = {}
+with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+    for name, action in (("list", storage.list_movies),
+                         ("search", lambda: util.search_movie("jorney kng")),
+                         ("stats", util.stats),
+                         ("website", util.generate_website)):
+        start = time.perf_counter()
+        action()
+        timings[name] = time.perf_counter() - start
+print(json.dumps({"timings": timings, "peak": peak_rss()}))
+'''
+
+
+def main():
+    """Write the catalogues and run the streaming actions against each."""
+    parser = argparse.ArgumentParser(description='Benchmark the streaming mode.')
+    parser.add_argument('count', type=int, nargs='?', default=5_000_000)
+    parser.add_argument('--cap', type=int, default=512, help='The RSS cap in MiB')
+    args = parser.parse_args()
+
+    exceeded = False
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "_static"))
+        shutil.copy(os.path.join(ROOT, "_static", "index_template.html"),
+                    os.path.join(tmp, "_static"))
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        for extension in ("json", "csv"):
+            path = os.path.join(tmp, f"movies.{extension}")
+            start = time.perf_counter()
+            stream_catalogue(path, iter_generated_movies(args.count, details=True))
+            print(f"{args.count} movies, {extension} file "
+                  f"{os.path.getsize(path) / 2 ** 30:.2f}GiB written in "
+                  f"{time.perf_counter() - start:.1f}s")
+            output = subprocess.run([sys.executable, "-c", CHILD, path], cwd=tmp, env=env,
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output)
+            for name, elapsed in result["timings"].items():
+                print(f"  {name:<8} {elapsed:8.1f}s")
+            peak = result["peak"] / 1024
+            exceeded = exceeded or peak > args.cap
+            print(f"  peak RSS {peak:.1f}MiB, cap {args.cap}MiB: "
+                  f"{'EXCEEDED' if peak > args.cap else 'ok'}")
+            os.remove(path)
+    sys.exit(1 if exceeded else 0)
+
+
+if __name__ == "__main__":
+    main()
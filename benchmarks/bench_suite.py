@@ -0,0 +1,255 @@
+'''
+Benchmark suite of every storage and utility operation, compared with a
+stored baseline.
+Run: python3 -m benchmarks.bench_suite [--sizes N ...] [--backends json csv ...]
+     [--repeat N] [--journal] [--no-memory] [--baseline path] [--save]
+     [--tolerance T]
+
+Writes a synthetic catalogue of every size (1000 to 100000 movies by
+default, up to millions) for every backend and runs the operations of
+the app against it in a fresh process, with the offline stub requester,
+so nothing touches the network. Each round opens the catalogue with a new
+storage and Utility and runs the operations twice: cold, as the first
+command after start up, which loads the file and builds the indexes, and
+warm, as the next command of the menu. The best of --repeat rounds is
+kept. A last cold round measures the peak memory every operation
+allocates, with tracemalloc, and the peak resident memory of the process
+is reported too.
+
+The results are compared with benchmarks/baseline.json; the status is 1
+if an operation is slower or allocates more than the baseline by more
+than the tolerance. --save records the results as the new baseline.
+Baselines only compare on the machine they were recorded on.
+'''
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from benchmarks.synthetic import generate_movies, write_catalogue, StubApiRequester
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+BACKENDS = {'json': 'json', 'csv': 'csv', 'sqlite': 'db', 'snap': 'snap'}
+SIZES = (1000, 10000, 100000)
+
+# The operations of a round, in the order they run.
+OPERATIONS = ('load', 'list', 'stats', 'search', 'sort', 'random', 'add', 'update', 'delete',
+              'website')
+
+# Differences below these are noise, whatever the tolerance.
+TIME_FLOOR = 0.005
+MEMORY_FLOOR = 1.0
+
+
+def peak_rss():
+    """Return the peak resident memory of the process in KiB."""
+    try:
+        with open("/proc/self/status") as status:
+            return next(int(line.split()[1]) for line in status if line.startswith("VmHWM"))
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _new_title(name, count):
+    """
+    Find a title named after name whose stub imdbID is not one of the
+    count generated movies, so adding it never finds it already stored.
+    """
+    for number in range(1000):
+        title = f"Suite {name} {number}"
+        if zlib.crc32(title.encode()) % 10 ** 7 >= count:
+            return title
+    raise ValueError(f"No free title for {name}")
+
+
+def _round(file_path, journaled, title):
+    """
+    Open the catalogue and build the operations of one round.
+
+    Returns:
+        dict: The operation of every name of OPERATIONS.
+    """
+    # pylint: disable=import-outside-toplevel
+    from main import create_storage
+    from utility import Utility
+    storage = create_storage(file_path, StubApiRequester(), journaled)
+    util = Utility(storage, posters=False)
+
+    def checked(method, *args):
+        if not method(*args):
+            raise RuntimeError(f"{method.__name__}{args} failed")
+
+    return {
+        'load': storage.load_movies,
+        'list': storage.list_movies,
+        'stats': util.stats,
+        'search': lambda: util.search_movie("journey king"),
+        'sort': lambda: util.movies_sorted_by_rating(0, 20),
+        'random': util.random_movie,
+        'add': lambda: checked(storage.add_movie, title),
+        'update': lambda: checked(storage.update_movie, title, "Seen it"),
+        'delete': lambda: checked(storage.delete_movie, title),
+        'website': util.generate_website,
+    }
+
+
+def run_child(file_path, count, repeat, journaled, memory):
+    """
+    Run the rounds in this process and print the results as JSON.
+    Runs in the directory of the catalogue, so the website is written there.
+    """
+    cold = {}
+    warm = {}
+    peaks = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # The charts are drawn once, untimed, as an existing website already has them.
+        _round(file_path, journaled, _new_title("warm up", count))['website']()
+        for number in range(repeat):
+            operations = _round(file_path, journaled, _new_title(f"round {number}", count))
+            for timings in (cold, warm):
+                for name in OPERATIONS:
+                    gc.collect()
+                    start = time.perf_counter()
+                    operations[name]()
+                    seconds = time.perf_counter() - start
+                    timings[name] = min(seconds, timings.get(name, seconds))
+        rss = peak_rss()
+        if memory:
+            operations = _round(file_path, journaled, _new_title("memory", count))
+            for name in OPERATIONS:
+                gc.collect()
+                tracemalloc.start()
+                operations[name]()
+                peaks[name] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                tracemalloc.stop()
+    print(json.dumps({name: {"cold": cold[name], "warm": warm[name], "peak_mib": peaks.get(name)}
+                      for name in OPERATIONS} | {"process": {"peak_rss_mib": rss / 1024}}))
+
+
+def _measure(backend, count, args, tmp):
+    """Write the catalogue of one backend and size and run the rounds against it."""
+    file_path = os.path.join(tmp, f"movies.{BACKENDS[backend]}")
+    write_catalogue(file_path, generate_movies(count, details=True))
+    command = [sys.executable, "-m", "benchmarks.bench_suite", "--child", file_path,
+               "--sizes", str(count), "--repeat", str(args.repeat)]
+    command += ["--journal"] if args.journal else []
+    command += [] if args.memory else ["--no-memory"]
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    try:
+        output = subprocess.run(command, cwd=tmp, env=env, check=True, capture_output=True,
+                                text=True).stdout
+    finally:
+        for name in os.listdir(tmp):
+            if name.startswith("movies."):
+                os.remove(os.path.join(tmp, name))
+    return json.loads(output)
+
+
+def _compare(key, metric, value, baseline, tolerance, floor):
+    """
+    Compare one measurement with the baseline.
+
+    Returns:
+        tuple: The change as text, and whether it is a regression.
+    """
+    reference = baseline.get(key, {}).get(metric)
+    if reference is None or value is None:
+        return "", False
+    change = value / reference - 1 if reference else 0.0
+    regressed = change > tolerance and value - reference > floor
+    return f"{change:+5.0%}{'!' if regressed else ' '}", regressed
+
+
+def main():
+    """Run the suite, print the results and compare them with the baseline."""
+    parser = argparse.ArgumentParser(description='Benchmark every operation of the app.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='The numbers of movies of the catalogues')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=['json', 'csv'])
+    parser.add_argument('--repeat', type=int, default=3, help='The rounds to keep the best of')
+    parser.add_argument('--journal', action='store_true',
+                        help='Append changes to a journal instead of rewriting the file')
+    parser.add_argument('--memory', action=argparse.BooleanOptionalAction, default=True,
+                        help='Measure the memory every operation allocates')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='The baseline file')
+    parser.add_argument('--save', action='store_true',
+                        help='Record the results in the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='The slowdown or memory growth reported as a regression')
+    parser.add_argument('--child', metavar='file_path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child, args.sizes[0], args.repeat, args.journal, args.memory)
+        return
+
+    try:
+        with open(args.baseline, encoding="utf-8") as file:
+            stored = json.load(file)
+    except FileNotFoundError:
+        stored = {"results": {}}
+    baseline = stored.get("results", {})
+    machine = {"platform": platform.platform(), "python": platform.python_version(),
+               "cpus": os.cpu_count()}
+    if baseline and stored.get("machine") != machine:
+        print(f"The baseline was recorded on {stored.get('machine')}, not on this machine.")
+
+    results = {}
+    regressions = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "_static"))
+        shutil.copy(os.path.join(ROOT, "_static", "index_template.html"),
+                    os.path.join(tmp, "_static"))
+        for count in args.sizes:
+            for backend in args.backends:
+                measured = _measure(backend, count, args, tmp)
+                print(f"{backend} {count} movies, best of {args.repeat}, peak RSS "
+                      f"{measured['process']['peak_rss_mib']:.1f}MiB")
+                print(f"  {'operation':<10}{'cold ms':>11}{'':>7}{'warm ms':>11}{'':>7}"
+                      f"{'peak MiB':>10}")
+                mode = f"{backend}-journal" if args.journal else backend
+                for name in OPERATIONS:
+                    key = f"{mode}/{count}/{name}"
+                    result = results[key] = measured[name]
+                    line = f"  {name:<10}"
+                    for metric in ('cold', 'warm'):
+                        change, regressed = _compare(key, metric, result[metric], baseline,
+                                                     args.tolerance, TIME_FLOOR)
+                        line += f"{result[metric] * 1000:11.2f}{change:>7}"
+                        if regressed:
+                            regressions.append(f"{key} {metric} {change}")
+                    if result['peak_mib'] is not None:
+                        change, regressed = _compare(key, 'peak_mib', result['peak_mib'],
+                                                     baseline, args.tolerance, MEMORY_FLOOR)
+                        line += f"{result['peak_mib']:10.1f}{change:>7}"
+                        if regressed:
+                            regressions.append(f"{key} memory {change}")
+                    print(line)
+
+    if args.save:
+        stored = {"machine": machine, "results": {**baseline, **results}}
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(stored, file, indent=1, sort_keys=True)
+            file.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regressions of more than {args.tolerance:.0%} "
+              f"against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
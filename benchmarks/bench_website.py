@@ -0,0 +1,51 @@
+'''
+Benchmark of the incremental website generation.
+Run: python3 -m benchmarks.bench_website [count]
+'''
+
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from storage_json import StorageJson
+from utility import Utility, TEMPLATE_PATH, WEBSITE_PATH
+from benchmarks.synthetic import generate_movies, write_catalogue, StubApiRequester
+
+
+def _timed(func, *args):
+    """Run func silently and return the elapsed seconds."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    """Generate the website, then regenerate it unchanged and after one update."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    template = os.path.abspath(TEMPLATE_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "_static"))
+        shutil.copy(template, os.path.join(tmp, TEMPLATE_PATH))
+        os.chdir(tmp)
+        write_catalogue("movies.json", generate_movies(count))
+        storage = StorageJson("movies.json", StubApiRequester())
+        util = Utility(storage, posters=False)
+        storage.load_movies()
+
+        print(f"{count} movies")
+        print(f"  first generation      {_timed(util.generate_website):8.3f}s")
+        mtime = os.stat(WEBSITE_PATH).st_mtime_ns
+        print(f"  unchanged catalogue   {_timed(util.generate_website):8.3f}s  "
+              f"rewritten={os.stat(WEBSITE_PATH).st_mtime_ns != mtime}")
+        storage.update_movie(next(iter(storage.load_movies())), "Changed notes")
+        print(f"  after update_movie    {_timed(util.generate_website):8.3f}s")
+        cold = Utility(storage, posters=False)
+        print(f"  cold, new Utility     {_timed(cold.generate_website):8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+'''
+This module runs a local HTTP server imitating the OMDB API.
+'''
+
+import json
+import multiprocessing
+import random
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from benchmarks.synthetic import GENRES
+
+
+def movie_response(title=None, imdb_id=None):
+    """
+    Build a deterministic OMDB response for a title or imdbID.
+    Titles starting with "Missing" are not found.
+
+    Args:
+        title (str): The requested title.
+        imdb_id (str): The requested imdbID.
+
+    Returns:
+        dict: The OMDB response.
+    """
+    if title is not None and title.startswith("Missing"):
+        return {"Response": "False", "Error": "Movie not found!"}
+    seed = zlib.crc32((title or imdb_id).casefold().encode())
+    return {
+        "Title": title or f"Title of {imdb_id}",
+        "Year": str(1920 + seed % 104),
+        "imdbRating": f"{1 + seed % 90 / 10:.1f}",
+        "Poster": "N/A",
+        "imdbID": imdb_id or f"tt{seed % 10 ** 7:07d}",
+        "Genre": GENRES[seed % len(GENRES)],
+        "Director": "Jane Doe",
+        "Actors": "John Doe, Jane Roe",
+        "Plot": "A synthetic movie.",
+        "Response": "True",
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Answers OMDB style t= and i= lookups."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve one lookup."""
+        stub = self.server.stub
+        with stub.requests.get_lock():
+            stub.requests.value += 1
+        params = parse_qs(urlparse(self.path).query)
+        if stub.latency:
+            time.sleep(stub.latency)
+        status, body, headers = stub.respond(params)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Keep the benchmark output quiet."""
+
+
+class OmdbStub:
+    """
+    Local OMDB imitation served from a child process, so the server does
+    not compete with the client being benchmarked for the GIL.
+
+    Args:
+        latency (float): Seconds each request is delayed, like a network round trip.
+        failure_rate (float): The fraction of requests answered with an error.
+        Half of the errors are HTTP 503, the other half HTTP 429 with Retry-After.
+        retry_after (float): The Retry-After seconds sent with HTTP 429.
+
+    Attributes:
+        base_url (str): The URL to point ApiRequester at, set once started.
+        latency (float): Seconds each request is delayed.
+        failure_rate (float): The fraction of requests answered with an error.
+        retry_after (float): The Retry-After seconds sent with HTTP 429.
+        requests (multiprocessing.Value): The number of requests served.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, retry_after=0.01):
+        self.base_url = None
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.retry_after = retry_after
+        self.requests = multiprocessing.Value("i", 0)
+        self._process = None
+        self._random = random.Random(1)
+
+    def respond(self, params):
+        """
+        Build the status and body answering a request.
+
+        Args:
+            params (dict): The parsed query parameters.
+
+        Returns:
+            tuple: The HTTP status, the JSON body and extra headers.
+        """
+        roll = self._random.random()
+        if roll < self.failure_rate / 2:
+            return 503, {"Response": "False", "Error": "Service unavailable"}, {}
+        if roll < self.failure_rate:
+            return (429, {"Response": "False", "Error": "Too many requests"},
+                    {"Retry-After": str(self.retry_after)})
+        if "i" in params:
+            return 200, movie_response(imdb_id=params["i"][0]), {}
+        return 200, movie_response(title=params.get("t", [""])[0]), {}
+
+    def _serve(self, port_queue):
+        """Run the server in the child process."""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        server.daemon_threads = True
+        server.request_queue_size = 128
+        server.stub = self
+        port_queue.put(server.server_address[1])
+        server.serve_forever()
+
+    def __enter__(self):
+        port_queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=self._serve, args=(port_queue,),
+                                                daemon=True)
+        self._process.start()
+        self.base_url = f"http://127.0.0.1:{port_queue.get()}"
+        return self
+
+    def __exit__(self, *exc_info):
+        self._process.terminate()
+        self._process.join()
@@ -0,0 +1,186 @@
+'''
+This module runs a local HTTP server imitating a poster CDN.
+'''
+
+import functools
+import io
+import multiprocessing
+import random
+import struct
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The size of the served posters, about twice the size cards show.
+POSTER_WIDTH, POSTER_HEIGHT = 600, 890
+
+
+def _png_chunk(kind, data):
+    """Frame one PNG chunk."""
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+@functools.lru_cache(maxsize=4)
+def _gradient(width, height):
+    """The rows of a smooth colour gradient, shared by every poster."""
+    return [bytes(((x + y + channel * 160) % 496) // 2 for x in range(width)
+                  for channel in range(3)) for y in range(height)]
+
+
+# Maps a random byte to noise of 0 to 3, which never overflows the gradient.
+_NOISE = bytes.maketrans(bytes(range(256)), bytes(value % 4 for value in range(256)))
+
+
+def poster_png(name, version=0, width=POSTER_WIDTH, height=POSTER_HEIGHT):
+    """
+    Draw a deterministic poster, different for every name and version.
+    It is a noisy gradient, which compresses like a photograph.
+
+    Args:
+        name (str): The poster name.
+        version (int): The poster version; a new version is a new image.
+        width (int): The width in pixels.
+        height (int): The height in pixels.
+
+    Returns:
+        bytes: The poster as a PNG file.
+    """
+    rng = random.Random(f"{name}/{version}")
+    gradient = _gradient(width, height)
+    shift = rng.randrange(height)
+    size = width * 3
+    rows = []
+    for y in range(height):
+        noise = rng.randbytes(size).translate(_NOISE)
+        pixels = (int.from_bytes(gradient[(y + shift) % height], 'big')
+                  + int.from_bytes(noise, 'big'))
+        rows.append(b'\0' + pixels.to_bytes(size, 'big'))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header)
+            + _png_chunk(b'IDAT', zlib.compress(b''.join(rows), 6)) + _png_chunk(b'IEND', b''))
+
+
+def poster_image(name, version=0):
+    """
+    Draw a poster the way CDNs serve them, as a JPEG, or as a PNG if
+    Pillow is not installed to encode it.
+
+    Args:
+        name (str): The poster name.
+        version (int): The poster version.
+
+    Returns:
+        tuple: The image file and its content type.
+    """
+    png = poster_png(name, version)
+    try:
+        from PIL import Image  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return png, "image/png"
+    output = io.BytesIO()
+    with Image.open(io.BytesIO(png)) as image:
+        image.save(output, 'JPEG', quality=90)
+    return output.getvalue(), "image/jpeg"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves /posters/<name>.jpg with an ETag, answering 304 when it matches."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve one poster."""
+        stub = self.server.stub
+        with stub.requests.get_lock():
+            stub.requests.value += 1
+        if stub.latency:
+            time.sleep(stub.latency)
+        if not (self.path.startswith('/posters/') and self.path.endswith('.jpg')):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        name = self.path[len('/posters/'):-len('.jpg')]
+        version = stub.version.value
+        etag = f'"{zlib.crc32(f"{name}/{version}".encode()):08x}"'
+        if self.headers.get("If-None-Match") == etag:
+            with stub.not_modified.get_lock():
+                stub.not_modified.value += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        key = (name, version)
+        if key not in self.server.posters:
+            self.server.posters[key] = poster_image(name, version)
+        payload, content_type = self.server.posters[key]
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Keep the benchmark output quiet."""
+
+
+class PosterStub:
+    """
+    Local poster CDN served from a child process, answering conditional
+    requests like a real CDN.
+
+    Args:
+        latency (float): Seconds each request is delayed, like a network round trip.
+
+    Attributes:
+        base_url (str): The URL posters are served under, set once started.
+        latency (float): Seconds each request is delayed.
+        requests (multiprocessing.Value): The number of requests served.
+        not_modified (multiprocessing.Value): The number of 304 answers.
+        version (multiprocessing.Value): The version of every poster; increment
+        it to change them all.
+    """
+
+    def __init__(self, latency=0.0):
+        self.base_url = None
+        self.latency = latency
+        self.requests = multiprocessing.Value("i", 0)
+        self.not_modified = multiprocessing.Value("i", 0)
+        self.version = multiprocessing.Value("i", 0)
+        self._process = None
+
+    def poster_url(self, name):
+        """
+        Build the URL of a poster.
+
+        Args:
+            name: The poster name.
+
+        Returns:
+            str: The URL of the poster.
+        """
+        return f"{self.base_url}/posters/{name}.jpg"
+
+    def _serve(self, port_queue):
+        """Run the server in the child process."""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        server.daemon_threads = True
+        server.request_queue_size = 128
+        server.stub = self
+        server.posters = {}
+        port_queue.put(server.server_address[1])
+        server.serve_forever()
+
+    def __enter__(self):
+        port_queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=self._serve, args=(port_queue,),
+                                                daemon=True)
+        self._process.start()
+        self.base_url = f"http://127.0.0.1:{port_queue.get()}"
+        return self
+
+    def __exit__(self, *exc_info):
+        self._process.terminate()
+        self._process.join()
@@ -0,0 +1,153 @@
+'''
+This module generates synthetic movie catalogues for the benchmarks.
+'''
+
+import csv
+import json
+import random
+import zlib
+from api_requester import IApiRequester
+
+GENRES = ["Action", "Adventure", "Comedy", "Crime", "Drama", "Fantasy",
+          "Horror", "Romance", "Sci-Fi", "Thriller"]
+
+
+WORDS = ["love", "war", "city", "night", "secret", "journey", "family", "star",
+         "river", "king", "ghost", "summer", "escape", "dream", "storm", "game"]
+
+
+def iter_generated_movies(count, seed=42, details=False):
+    """
+    Generate a deterministic catalogue of movies one movie at a time, for
+    catalogues too large to hold in memory.
+
+    Args:
+        count (int): The number of movies to generate.
+        seed (int): The seed of the random generator.
+        details (bool): Also generate a director, actors and a plot, the
+        long text fields of real OMDB data.
+
+    Yields:
+        tuple: The title and the movie, in the shape the storages save.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        title = f"Movie {i:07d}"
+        movie = {
+            "title": title,
+            "year": rng.randint(1920, 2023),
+            "rating": round(rng.uniform(1.0, 9.9), 1),
+            "poster_url": f"https://example.com/posters/{i}.jpg",
+            "imdbID": f"tt{i:07d}",
+            "genre": ", ".join(rng.sample(GENRES, rng.randint(1, 3))),
+        }
+        if details:
+            movie.update({
+                "director": f"Director {rng.randint(1, count // 10 + 1)}",
+                "actors": ", ".join(f"Actor {rng.randint(1, count)}" for _ in range(4)),
+                "plot": " ".join(rng.choices(WORDS, k=rng.randint(15, 40))).capitalize() + ".",
+            })
+        yield title, movie
+
+
+def generate_movies(count, seed=42, details=False):
+    """
+    Generate a deterministic catalogue of movies.
+
+    Args:
+        count (int): The number of movies to generate.
+        seed (int): The seed of the random generator.
+        details (bool): Also generate a director, actors and a plot.
+
+    Returns:
+        dict: The movies keyed by title, in the shape the storages save.
+    """
+    return dict(iter_generated_movies(count, seed, details))
+
+
+def write_catalogue(file_path, movies):
+    """
+    Write movies to file_path in the format of its extension.
+
+    Args:
+        file_path (str): A .json, .csv, .snap or .db path.
+        movies (dict): The movies keyed by title.
+    """
+    if file_path.endswith((".db", ".sqlite")):
+        from storage_sqlite import StorageSqlite  # pylint: disable=import-outside-toplevel
+        storage = StorageSqlite(file_path, None)
+        storage.import_movies(movies)
+        storage.close()
+    elif file_path.endswith(".snap"):
+        from snapshot import write_snapshot  # pylint: disable=import-outside-toplevel
+        write_snapshot(file_path, movies)
+    elif file_path.endswith(".csv"):
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        pd.DataFrame.from_dict(movies, orient='index').to_csv(file_path, index=True)
+    else:
+        with open(file_path, "w") as file:
+            json.dump(movies, file)
+
+
+def stream_catalogue(file_path, movies):
+    """
+    Write movies to a .json or .csv file one movie at a time, in the same
+    format write_catalogue writes.
+
+    Args:
+        file_path (str): A .json or .csv path.
+        movies (iterable): (title, movie) pairs, all movies having the same fields.
+    """
+    with open(file_path, "w", newline="") as file:
+        if file_path.endswith(".csv"):
+            writer = None
+            for title, movie in movies:
+                if writer is None:
+                    writer = csv.writer(file)
+                    writer.writerow(["", *movie])
+                writer.writerow([title, *movie.values()])
+            return
+        file.write("{")
+        for number, (title, movie) in enumerate(movies):
+            file.write(", " if number else "")
+            file.write(f"{json.dumps(title)}: {json.dumps(movie)}")
+        file.write("}")
+
+
+class StubApiRequester(IApiRequester):
+    """
+    Offline API requester answering every title with a synthetic movie,
+    except titles starting with "Missing", which are not found.
+    """
+
+    def __init__(self):
+        self._rng = random.Random(7)
+
+    def request_movie_data(self, title):
+        return self._movie_data(title)
+
+    def request_movie_data_by_id(self, imdb_id):
+        return self._movie_data(f"Title of {imdb_id}", imdb_id)
+
+    def _movie_data(self, title, imdb_id=None):
+        if title.startswith("Missing"):
+            return {"Response": "False", "Error": "Movie not found!"}
+        return {
+            "Title": title,
+            "Year": str(self._rng.randint(1920, 2023)),
+            "imdbRating": str(round(self._rng.uniform(1.0, 9.9), 1)),
+            "Poster": "N/A",
+            "imdbID": imdb_id or f"tt{zlib.crc32(title.encode()) % 10 ** 7:07d}",
+            "Genre": self._rng.choice(GENRES),
+            "Response": "True",
+        }
+
+    def extract_data(self, movie_data):
+        return {
+            "title": movie_data.get("Title"),
+            "year": int(movie_data.get("Year")),
+            "rating": float(movie_data.get("imdbRating")),
+            "poster_url": movie_data.get("Poster"),
+            "imdbID": movie_data.get("imdbID"),
+            "genre": movie_data.get("Genre"),
+        }
@@ -0,0 +1,120 @@
+'''
+This module is used to fetch many movies from OMDB at once.
+'''
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+
+class RateLimiter:
+    """
+    Thread safe limiter spacing out calls to at most rate per second.
+
+    Args:
+        rate (float): The maximum number of calls per second.
+
+    Attributes:
+        _interval (float): The seconds between two calls.
+        _next_slot (float): The monotonic time the next call may start.
+        _lock (threading.Lock): Guards _next_slot.
+    """
+
+    def __init__(self, rate):
+        self._interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until the caller may make its call.
+        """
+        with self._lock:
+            slot = max(time.monotonic(), self._next_slot)
+            self._next_slot = slot + self._interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def read_titles(file):
+    """
+    Read titles to import, one per line.
+    Blank lines and lines starting with # are skipped.
+
+    Args:
+        file: A text file object.
+
+    Returns:
+        list: The titles.
+    """
+    titles = []
+    for line in file:
+        title = line.strip()
+        if title and not title.startswith("#"):
+            titles.append(title)
+    return titles
+
+
+def extract_or_fail(api_requester, movie_data):
+    """
+    Extract a fetched movie, or explain why it cannot be added.
+
+    Args:
+        api_requester: The requester the movie data was fetched with.
+        movie_data (dict): The movie data retrieved from the API, or None.
+
+    Returns:
+        tuple: The extracted movie and None, or None and the failure reason.
+    """
+    if movie_data is None:
+        return None, "API is not accessible"
+    if movie_data.get("Response") == "False":
+        return None, movie_data.get("Error", "Movie not found!")
+    try:
+        return api_requester.extract_data(movie_data), None
+    except (TypeError, ValueError) as error:
+        return None, f"Invalid movie data: {error}"
+
+
+@metrics.timed("api.fetch_movies")
+def fetch_movies(api_requester, titles, max_workers=8, rate_limit=None, by_id=False):
+    """
+    Fetch and extract the data of many movies concurrently.
+
+    A title that is not found or whose request fails is reported in the
+    failures and does not stop the other titles.
+
+    Args:
+        api_requester (IApiRequester): The requester used to fetch movie data.
+        titles (list): The titles to fetch.
+        max_workers (int): The maximum number of requests in flight.
+        rate_limit (float): The maximum number of requests per second, or None.
+        by_id (bool): titles are IMDb ids, fetched with request_movie_data_by_id.
+
+    Returns:
+        tuple: The extracted movies keyed by title, and the failure
+        reasons keyed by title.
+    """
+    limiter = RateLimiter(rate_limit) if rate_limit else None
+    request = api_requester.request_movie_data_by_id if by_id else api_requester.request_movie_data
+
+    def fetch(title):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            movie_data = request(title)
+        except Exception as error:  # pylint: disable=broad-except
+            return title, None, str(error) or type(error).__name__
+        return (title, *extract_or_fail(api_requester, movie_data))
+
+    movies = {}
+    failures = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for title, movie, failure in executor.map(fetch, titles):
+            if failure is None:
+                movies[title] = movie
+            else:
+                failures[title] = failure
+    return movies, failures
@@ -0,0 +1,195 @@
+'''
+This module draws the charts of the website from the rating statistics,
+which are binned as movies are added and removed, off screen to SVG or
+PNG files.
+'''
+
+import hashlib
+import json
+import os
+from journal import atomic_write
+import metrics
+from rating_stats import RATING_BINS
+
+CHART_DIR = '_static/charts'
+CHART_FORMATS = ('svg', 'png')
+MANIFEST_NAME = 'charts.json'
+
+# Increase to draw every chart again after changing how charts are drawn.
+CHART_STYLE = 1
+
+# The pixels per inch of PNG charts, and of the sizes given to the website.
+DPI = 100
+
+# The name, title and size in inches of every chart.
+CHARTS = (
+    ('ratings', 'Rating distribution', (6.4, 4.0)),
+    ('decades', 'Ratings by decade', (6.4, 4.0)),
+    ('genres', 'Movies per genre', (6.4, 4.0)),
+    ('genre_ratings', 'Rating distribution per genre', (6.4, 4.8)),
+)
+
+COLOR = '#007BFF'
+MEDIAN_COLOR = '#28A745'
+
+
+def chart_data(stats):
+    """
+    Extract the data of every chart from the rating statistics, without
+    going over the movies: the statistics are already binned.
+
+    Args:
+        stats (dict): The rating statistics, see rating_stats.summarize.
+
+    Returns:
+        dict: The data of each chart keyed by chart name, serializable as JSON.
+    """
+    genres = stats['genres']
+    return {
+        'ratings': stats['distribution'],
+        'decades': [[int(decade), summary['average'], summary['median'], summary['count']]
+                    for decade, summary in stats['decades'].items()],
+        'genres': sorted(([genre, summary['count']] for genre, summary in genres.items()),
+                         key=lambda item: (-item[1], item[0])),
+        'genre_ratings': [[genre, summary['distribution']] for genre, summary in genres.items()],
+    }
+
+
+def _draw_ratings(axes, bins):
+    """Draw the number of movies per rating bin."""
+    axes.bar(range(RATING_BINS), bins, width=0.9, align='edge', color=COLOR)
+    axes.set_xticks(range(RATING_BINS + 1))
+    axes.set_xlabel('Rating')
+    axes.set_ylabel('Movies')
+
+
+def _draw_decades(axes, decades):
+    """Draw the average and median rating of every decade."""
+    labels = [f"{decade}s" for decade, _, _, _ in decades]
+    axes.bar(labels, [average for _, average, _, _ in decades], color=COLOR, label='Average')
+    axes.plot(labels, [median for _, _, median, _ in decades], 'o', color=MEDIAN_COLOR,
+              label='Median')
+    axes.set_ylim(0, 10)
+    axes.set_ylabel('Rating')
+    axes.tick_params(axis='x', labelrotation=45)
+    axes.legend(loc='upper right')
+
+
+def _draw_genres(axes, genres):
+    """Draw the number of movies per genre, the largest genre on top."""
+    axes.barh([genre for genre, _ in reversed(genres)],
+              [count for _, count in reversed(genres)], color=COLOR)
+    axes.set_xlabel('Movies')
+
+
+def _draw_genre_ratings(axes, genres):
+    """Draw the share of the movies of every genre in each rating bin."""
+    shares = [[count / max(1, sum(bins)) for count in bins] for _, bins in genres]
+    image = axes.imshow(shares, aspect='auto', cmap='Blues', vmin=0,
+                        extent=(0, RATING_BINS, len(genres), 0))
+    axes.set_yticks([row + 0.5 for row in range(len(genres))],
+                    [genre for genre, _ in genres])
+    axes.set_xticks(range(RATING_BINS + 1))
+    axes.set_xlabel('Rating')
+    axes.figure.colorbar(image, ax=axes, label='Share of the genre')
+
+
+_DRAW = {
+    'ratings': _draw_ratings,
+    'decades': _draw_decades,
+    'genres': _draw_genres,
+    'genre_ratings': _draw_genre_ratings,
+}
+
+
+def _chart_key(chart_format, size, data):
+    """Hash everything a chart file depends on."""
+    content = json.dumps([CHART_STYLE, chart_format, size, data], sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _draw(path, chart_format, title, size, draw, data):
+    """
+    Draw one chart to path.
+
+    matplotlib is imported here, so only drawing a chart pays for it. The
+    Figure is not registered with pyplot, so no window is opened and
+    nothing is kept once it is saved.
+    """
+    from matplotlib.figure import Figure  # pylint: disable=import-outside-toplevel
+    figure = Figure(figsize=size, dpi=DPI, layout='constrained')
+    axes = figure.subplots()
+    axes.set_title(title)
+    if any(data):
+        draw(axes, data)
+    else:
+        axes.text(0.5, 0.5, 'No rated movies', ha='center', va='center',
+                  transform=axes.transAxes)
+        axes.set_axis_off()
+    with atomic_write(path) as temp_path:
+        # No creation date, so a chart drawn again from the same data is the same file.
+        figure.savefig(temp_path, format=chart_format,
+                       metadata={'Date': None} if chart_format == 'svg' else None)
+
+
+def render_charts(stats, directory=CHART_DIR, chart_format='svg'):
+    """
+    Draw the charts whose data changed since they were last drawn.
+
+    charts.json keeps a hash of the data, size and format of every chart
+    drawn, and a chart is only drawn again if its hash changed or its file
+    is missing.
+
+    Args:
+        stats (dict): The rating statistics, see rating_stats.summarize.
+        directory (str): The directory of the charts.
+        chart_format (str): 'svg' or 'png'.
+
+    Returns:
+        list: The paths of the charts drawn; the other charts were up to date.
+    """
+    if chart_format not in CHART_FORMATS:
+        raise ValueError(f"Unsupported chart format: {chart_format}")
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+    data = chart_data(stats)
+    drawn = []
+    for name, title, size in CHARTS:
+        file_name = f"{name}.{chart_format}"
+        path = os.path.join(directory, file_name)
+        key = _chart_key(chart_format, size, data[name])
+        if manifest.get(file_name) == key and os.path.exists(path):
+            metrics.count("charts.cached")
+            continue
+        os.makedirs(directory, exist_ok=True)
+        with metrics.timer("charts.draw"):
+            _draw(path, chart_format, title, size, _DRAW[name], data[name])
+        metrics.count("charts.drawn")
+        manifest[file_name] = key
+        drawn.append(path)
+    if drawn:
+        with atomic_write(manifest_path) as temp_path:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(manifest, file, indent=1, sort_keys=True)
+    return drawn
+
+
+def chart_images(directory=CHART_DIR, chart_format='svg'):
+    """
+    The images of the charts, as the website shows them.
+
+    Args:
+        directory (str): The directory of the charts, inside the website directory.
+        chart_format (str): 'svg' or 'png'.
+
+    Returns:
+        list: The path relative to the website directory, the title, the
+        width and the height in pixels of every chart.
+    """
+    folder = os.path.basename(os.path.normpath(directory))
+    return [(f"{folder}/{name}.{chart_format}", title, round(size[0] * DPI),
+             round(size[1] * DPI)) for name, title, size in CHARTS]
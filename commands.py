@@ -0,0 +1,263 @@
+'''
+This module runs the commands of the app without its menu, one at a
+time or as a batch of JSON lines, for scripts and automation.
+
+An operation is a dictionary whose "op" names the command and whose other
+keys are its arguments, e.g. {"op": "update", "title": "Alien", "notes": "Classic"}.
+Running it returns a result dictionary that can be written as JSON.
+'''
+
+import contextlib
+import io
+import json
+from utility import SEARCH_LIMIT
+import metrics
+
+# The commands and the arguments their operations take, required ones first.
+COMMANDS = {
+    'list': (),
+    'add': ('title',),
+    'delete': ('title',),
+    'update': ('title', 'notes'),
+    'stats': (),
+    'search': ('query', 'limit'),
+    'site': ('page_size', 'group_by'),
+    'top': ('limit', 'min_rating', 'max_rating', 'min_year', 'max_year', 'order_by'),
+}
+
+# The arguments an operation cannot leave out.
+REQUIRED = {'add': ('title',), 'delete': ('title',), 'update': ('title', 'notes'),
+            'search': ('query',)}
+
+# The type of every argument, and the name an error gives it. Optional
+# arguments may also be null.
+ARGUMENT_TYPES = {
+    'title': (str, 'a string'),
+    'notes': (str, 'a string'),
+    'query': (str, 'a string'),
+    'limit': (int, 'a non-negative integer'),
+    'page_size': (int, 'a positive integer'),
+    'group_by': (str, 'a string'),
+    'min_rating': ((int, float), 'a number'),
+    'max_rating': ((int, float), 'a number'),
+    'min_year': (int, 'an integer'),
+    'max_year': (int, 'an integer'),
+    'order_by': (str, 'a string'),
+}
+
+
+def _argument_problems(name, operation):
+    """
+    Check the types of the arguments of an operation.
+
+    Args:
+        name (str): The command of the operation.
+        operation (dict): The operation.
+
+    Returns:
+        list: A description of every argument of the wrong type.
+    """
+    problems = []
+    for argument in COMMANDS[name]:
+        if argument not in operation:
+            continue
+        value = operation[argument]
+        if value is None and argument not in REQUIRED.get(name, ()):
+            continue
+        expected, description = ARGUMENT_TYPES[argument]
+        # JSON true and false are not numbers, although bool is an int.
+        valid = isinstance(value, expected) and not isinstance(value, bool)
+        if valid and argument == 'limit':
+            valid = value >= 0
+        elif valid and argument == 'page_size':
+            valid = value >= 1
+        if not valid:
+            problems.append(f"{argument} must be {description}")
+    return problems
+
+
+def _mutate(method, *args):
+    """
+    Run a storage change, capturing the message it prints.
+
+    Args:
+        method (callable): add_movie, delete_movie or update_movie of a storage.
+        *args: The arguments of the change.
+
+    Returns:
+        dict: "ok" set to whether the change was made, and its "message".
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        ok = method(*args)
+    return {"ok": bool(ok), "message": output.getvalue().strip()}
+
+
+def run_operation(storage, util, operation):
+    """
+    Run one operation.
+
+    Args:
+        storage (IStorage): The storage the operation reads or changes.
+        util (Utility): The utility over the same storage.
+        operation (dict): The operation.
+
+    Returns:
+        dict: The "op", whether it was "ok", and either the output of the
+        command or the "error" that made it fail.
+    """
+    name = operation.get("op")
+    if not isinstance(name, str) or name not in COMMANDS:
+        return {"op": name, "ok": False, "error": f"Unknown command: {name}"}
+    unknown = set(operation) - set(COMMANDS[name]) - {"op"}
+    missing = [argument for argument in REQUIRED.get(name, ()) if argument not in operation]
+    problems = [f"unknown argument {argument}" for argument in sorted(unknown)]
+    problems += [f"missing argument {argument}" for argument in missing]
+    problems += _argument_problems(name, operation)
+    if problems:
+        return {"op": name, "ok": False, "error": ", ".join(problems)}
+
+    result = {"op": name, "ok": True}
+    try:
+        with metrics.timer(f"command.{name}"):
+            _dispatch(storage, util, name, operation, result)
+    except ValueError as error:
+        # An unsupported ordering or grouping, found before anything changed.
+        return {"op": name, "ok": False, "error": str(error)}
+    if not result["ok"]:
+        result["error"] = result.pop("message")
+    return result
+
+
+def _dispatch(storage, util, name, operation, result):
+    """
+    Run the command of a checked operation, adding its output to result.
+
+    Args:
+        storage (IStorage): The storage the operation reads or changes.
+        util (Utility): The utility over the same storage.
+        name (str): The command of the operation.
+        operation (dict): The operation.
+        result (dict): The result of the operation.
+    """
+    if name == 'list':
+        result["movies"] = {title: dict(movie) for title, movie in storage.iter_movies()}
+    elif name == 'add':
+        result.update(_mutate(storage.add_movie, operation["title"]))
+    elif name == 'delete':
+        result.update(_mutate(storage.delete_movie, operation["title"]))
+    elif name == 'update':
+        result.update(_mutate(storage.update_movie, operation["title"], operation["notes"]))
+    elif name == 'stats':
+        result["stats"] = util.rating_stats()
+    elif name == 'search':
+        result["movies"] = util.find_movies(operation["query"],
+                                            operation.get("limit", SEARCH_LIMIT))
+    elif name == 'site':
+        report = util.generate_website(operation.get("page_size"), operation.get("group_by"))
+        if report is not None:
+            result["posters"] = report
+    elif name == 'top':
+        filters = {argument: operation[argument] for argument in COMMANDS['top']
+                   if argument in operation}
+        filters.setdefault("limit", 10)
+        result["movies"] = [{"title": title, "year": year, "rating": rating}
+                            for title, year, rating in storage.query_movies(**filters)]
+
+
+def _add_results(storage, titles, workers, rate):
+    """
+    Add consecutive titles of a batch with one concurrent fetch.
+
+    Args:
+        storage (IStorage): The storage to add the movies to.
+        titles (list): The titles, in batch order.
+        workers (int): The maximum number of concurrent OMDB requests.
+        rate (float): The maximum number of OMDB requests per second, or None.
+
+    Returns:
+        list: The result of every add operation, in batch order.
+    """
+    report = storage.add_movies(titles, max_workers=workers, rate_limit=rate)
+    added = set(report["added"])
+    results = []
+    for title in titles:
+        if title in added:
+            added.discard(title)
+            results.append({"op": "add", "ok": True,
+                            "message": f"Movie {title} successfully added"})
+        elif title in report["failed"]:
+            results.append({"op": "add", "ok": False, "error": report["failed"][title]})
+        else:
+            results.append({"op": "add", "ok": False,
+                            "error": f"Movie {title} already exists!"})
+    return results
+
+
+def run_batch(storage, util, lines, workers=8, rate=None):
+    """
+    Run the operations read from JSON lines against one loaded catalogue,
+    saving the changes once at the end, see IStorage.batch.
+
+    Consecutive add operations are fetched from OMDB concurrently, as by
+    IStorage.add_movies. Blank lines are skipped, and a line that is not a
+    valid operation fails on its own without stopping the batch.
+
+    The results are only returned once the batch is saved, so no change
+    is reported as made if the save fails.
+
+    Args:
+        storage (IStorage): The storage the operations read or change.
+        util (Utility): The utility over the same storage.
+        lines (iterable): The JSON lines, one operation per line.
+        workers (int): The maximum number of concurrent OMDB requests.
+        rate (float): The maximum number of OMDB requests per second, or None.
+
+    Returns:
+        list: The result of every operation, in order, with the number of
+        the "line" it was read from.
+    """
+    results = []
+    with storage.batch():
+        adds = []
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                operation = json.loads(line)
+            except ValueError as error:
+                operation = None
+                result = {"op": None, "ok": False, "error": f"Invalid JSON: {error}"}
+            else:
+                if not isinstance(operation, dict):
+                    result = {"op": None, "ok": False, "error": "Not a JSON object"}
+                    operation = None
+            if (operation is not None and operation.get("op") == 'add'
+                    and set(operation) == {"op", "title"} and isinstance(operation["title"], str)):
+                adds.append((number, operation["title"]))
+                continue
+            if adds:
+                results += _numbered(adds, _add_results(storage, [title for _, title in adds],
+                                                        workers, rate))
+                adds = []
+            if operation is not None:
+                result = run_operation(storage, util, operation)
+            results.append({"line": number, **result})
+        if adds:
+            results += _numbered(adds, _add_results(storage, [title for _, title in adds],
+                                                    workers, rate))
+    return results
+
+
+def _numbered(adds, results):
+    """
+    Tag the results of grouped add operations with their line numbers.
+
+    Args:
+        adds (list): (line number, title) pairs.
+        results (list): The results, in the same order.
+
+    Returns:
+        list: The results with their "line".
+    """
+    return [{"line": number, **result} for (number, _), result in zip(adds, results)]
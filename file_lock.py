@@ -0,0 +1,119 @@
+'''
+This module contains the advisory file lock that serializes
+writers of the same storage file across processes.
+'''
+
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where locking is skipped.
+    fcntl = None
+
+# The seconds between two attempts to take a busy lock.
+POLL_INTERVAL = 0.005
+
+
+class LockTimeout(Exception):
+    """
+    Raised when a lock could not be taken in time.
+    """
+
+
+class FileLock:
+    """
+    FileLock is an advisory fcntl lock on ``<file_path>.lock``, shared by
+    every process using the same storage file.
+
+    Writers hold the lock exclusively from the moment they check the
+    version of the data they change until the new version is on disk, so
+    two processes never write from the same version. Readers of a journaled
+    file hold it shared while they read the file and replay the journal, so
+    they neither see a half written entry nor a compaction in between.
+
+    The lock is reentrant within a FileLock, as flock locks belong to an
+    open file and a second open file in the same process would deadlock.
+    A shared hold within an exclusive one stays exclusive; an exclusive
+    hold must not start within a shared one.
+
+    Args:
+        file_path (str): The path of the storage file.
+        timeout (float): The seconds to wait for the lock, or None to wait forever.
+
+    Attributes:
+        file_path (str): The path of the lock file.
+        _timeout (float): The seconds to wait for the lock, or None.
+        _file: The open lock file while the lock is held, or None.
+        _depth (int): The number of nested acquisitions.
+    """
+
+    def __init__(self, file_path, timeout=30.0):
+        self.file_path = f"{file_path}.lock"
+        self._timeout = timeout
+        self._file = None
+        self._depth = 0
+
+    def _acquire(self, operation):
+        """
+        Open the lock file and take the lock, polling until the timeout.
+
+        Args:
+            operation (int): fcntl.LOCK_EX or fcntl.LOCK_SH.
+
+        Raises:
+            LockTimeout: If another process held the lock for too long.
+        """
+        file = open(self.file_path, "a")
+        deadline = None if self._timeout is None else time.monotonic() + self._timeout
+        while True:
+            try:
+                fcntl.flock(file.fileno(), operation | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    file.close()
+                    raise LockTimeout(f"Timed out waiting for {self.file_path}") from None
+                time.sleep(POLL_INTERVAL)
+            except BaseException:
+                file.close()
+                raise
+        self._file = file
+
+    @contextmanager
+    def _held(self, operation):
+        """
+        Hold the lock for the duration of the block.
+        """
+        if fcntl is None:
+            yield
+            return
+        if self._depth == 0:
+            self._acquire(operation)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                file, self._file = self._file, None
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+                file.close()
+
+    def exclusive(self):
+        """
+        Hold the lock exclusively, for writing.
+
+        Returns:
+            contextmanager: Holds the lock while its block runs.
+        """
+        return self._held(fcntl.LOCK_EX if fcntl else None)
+
+    def shared(self):
+        """
+        Hold the lock shared with other readers.
+
+        Returns:
+            contextmanager: Holds the lock while its block runs.
+        """
+        return self._held(fcntl.LOCK_SH if fcntl else None)
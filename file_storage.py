@@ -0,0 +1,407 @@
+'''
+This module contains the base class of the storage systems keeping
+the whole catalogue in one file: JSON, CSV and binary snapshots.
+'''
+
+import os
+from abc import abstractmethod
+from contextlib import contextmanager
+from istorage import IStorage
+from api_requester import IApiRequester, ApiError
+from movie_cache import MovieCache
+from file_lock import FileLock
+from journal import Journal
+import metrics
+
+
+class FileStorage(IStorage):
+    """
+    FileStorage is the base of the storages rewriting a single file on
+    every change, optionally appending the changes to a journal instead.
+
+    It keeps the movie data resident, serializes writers across processes
+    with a FileLock, and checks every change against the current version
+    of the file. Subclasses read and write the file with _read_movies and
+    _write_movies, and list and iterate over the movies in their own way.
+
+    Args:
+        file_path (str): The path to the file storing the movie data.
+        api_requester (IApiRequester): An object implementing the
+        IApiRequester interface for making API requests.
+        journaled (bool): Append mutations to a journal instead of rewriting the file.
+        compact_threshold (int): The number of journal entries that triggers a compaction.
+
+    Attributes:
+        _file_path (str): The path to the file storing the movie data.
+        _api_requester (IApiRequester): An object implementing the
+        IApiRequester interface for making API requests.
+        _journal (Journal): The journal of mutations, or None if not journaled.
+        _cache (MovieCache): The resident copy of the movie data.
+        _lock (FileLock): The lock serializing writers across processes.
+        conflicts (int): The number of mutations that found the file changed
+        by another process since they read it, and were checked again.
+        _batching (bool): Whether a batch is deferring the saves.
+        _pending (dict): The movie data the current batch will save, or None.
+    """
+
+    def __init__(self, file_path: str, api_requester: IApiRequester,
+                 journaled: bool = False, compact_threshold: int = 1000):
+        super().__init__()
+        self._file_path = file_path
+        self._api_requester = api_requester
+        if journaled:
+            self._journal = Journal(file_path, compact_threshold)
+            self._cache = MovieCache(file_path, self._journal.file_path)
+        else:
+            self._journal = None
+            self._cache = MovieCache(file_path)
+        self._lock = FileLock(file_path)
+        self.conflicts = 0
+        self._batching = False
+        self._pending = None
+
+    @abstractmethod
+    def _read_movies(self):
+        """
+        Read the movie data from the file.
+
+        Returns:
+            dict: The movie data keyed by title, empty if the file does not exist.
+        """
+
+    @abstractmethod
+    def _write_movies(self, movies):
+        """
+        Replace the file with movies, atomically.
+
+        Args:
+            movies (dict): The movie data keyed by title.
+
+        Returns:
+            dict: The movie data to keep resident, usually movies.
+        """
+
+    def _mutable(self, movies):
+        """
+        Return movie data that a change can be applied to in place.
+
+        Args:
+            movies (dict): The movie data, as returned by load_movies.
+
+        Returns:
+            dict: movies, or a copy if it is read only.
+        """
+        return movies
+
+    def load_movies(self):
+        """
+        Load movies, reading the file only if it changed since the last load.
+
+        Returns:
+            dict: The movie data keyed by title.
+        """
+        return self._sync_listeners(self._cache.get(self._load))
+
+    def _load(self):
+        """
+        Read the file and replay the journal onto it. Both are read under
+        the shared lock, so a compaction cannot happen in between and mix
+        two versions of the movies.
+
+        Returns:
+            dict: The movie data keyed by title.
+        """
+        if self._journal is None:
+            return self._read_movies()
+        with self._lock.shared():
+            movies = self._read_movies()
+            self._journal.replay(movies)
+        return movies
+
+    def _current_movies(self, movies):
+        """
+        Check that movies is still the version on disk, under the exclusive
+        lock, before changing it. If another process wrote the file since,
+        the file is loaded again so the change is checked and applied
+        against the current version instead of overwriting it.
+
+        Args:
+            movies (dict): The movie data the caller read.
+
+        Returns:
+            dict: The current movie data, to check and change.
+        """
+        current = self.load_movies()
+        if current is not movies:
+            self.conflicts += 1
+        return current
+
+    def _save_movies(self, movies):
+        """
+        Save movies to the file, or to the pending batch while batching.
+        The file is replaced atomically and the journal, if any, is cleared.
+
+        Args:
+            movies (dict): The movie data keyed by title.
+        """
+        if self._batching:
+            self._pending = movies
+            self._cache.store(movies)
+            return
+        try:
+            with metrics.timer("storage.write"):
+                resident = self._write_movies(movies)
+            if self._journal is not None:
+                self._journal.clear()
+        except Exception:
+            self._cache.invalidate()
+            raise
+        self._cache.store(resident)
+        metrics.count("storage.records_written", len(movies))
+        metrics.count("storage.bytes_written", os.path.getsize(self._file_path))
+
+    def _commit(self, movies, operation, title, data=None):
+        """
+        Persist a single mutation that was already applied to movies.
+
+        In journaled mode the mutation is appended to the journal, also
+        within a batch, and the file is only rewritten once the journal is
+        due for compaction, at the end of the batch if batching. Otherwise
+        the whole file is saved.
+
+        Args:
+            movies (dict): The movie data including the mutation.
+            operation (str): One of "add", "delete" or "update".
+            title (str): The title of the movie that was changed.
+            data: The movie added, or the notes of the movie updated.
+        """
+        if self._journal is None or self._pending is not None:
+            # Once the batch saves the whole file, later changes join that save.
+            self._save_movies(movies)
+            return
+        try:
+            self._journal.append(operation, title, data)
+        except Exception:
+            self._cache.invalidate()
+            raise
+        if self._journal.needs_compaction() and not self._batching:
+            self._save_movies(movies)
+        else:
+            self._cache.store(movies)
+
+    @contextmanager
+    def batch(self):
+        """
+        Save the changes made within the block once, at its end.
+
+        The exclusive lock is held for the whole block, so its changes are
+        applied to a single version of the file and no other process writes
+        in between. If the block raises, its changes are discarded.
+
+        In journaled mode single changes are still appended to the journal
+        as they are made, and kept if the block raises; the file is only
+        rewritten at the end if the journal is due for compaction, or if
+        the block imported or merged movies.
+
+        Yields:
+            None
+        """
+        if self._batching:
+            yield
+            return
+        with self._lock.exclusive():
+            self._batching = True
+            try:
+                yield
+            except BaseException:
+                self._pending = None
+                self._cache.invalidate()
+                raise
+            finally:
+                self._batching = False
+            movies, self._pending = self._pending, None
+            if movies is not None:
+                self._save_movies(movies)
+            elif self._journal is not None and self._journal.needs_compaction():
+                self.compact()
+
+    def _search_index_file(self):
+        """
+        Persist the search index next to the storage file, tagged with the
+        state of the file it was built from.
+
+        Returns:
+            tuple: The path of the index file and the stamp of the loaded movies.
+        """
+        return f"{self._file_path}.search", self._cache.stamp
+
+    def compact(self):
+        """
+        Fold the journal into a new version of the file.
+        """
+        with self._lock.exclusive():
+            self._save_movies(self._mutable(self.load_movies()))
+
+    def add_movie(self, title):
+        """
+        Add a new movie to the database.
+
+        Args:
+            title (str): The title of the movie to be added.
+
+        Returns:
+            bool: Whether the movie was added.
+        """
+        movies = self.load_movies()
+        existing = self.title_lookup().resolve(title)
+        if existing is not None:
+            print(f"Movie {existing} already exists!")
+            return False
+        try:
+            movie_data = self._api_requester.request_movie_data(title)
+        except ApiError as error:
+            print(f"Error: {error}")
+            return False
+        if movie_data.get("Response") == "False":
+            print(f"Error: Movie {title} not found.")
+            return False
+        movie = self._api_requester.extract_data(movie_data)
+        return self.add_fetched_movie(title, movie, movies)
+
+    def add_fetched_movie(self, title, movie, movies=None):
+        """
+        Add a movie already fetched from OMDB, unless its title or IMDb id
+        is already stored. The check and the change are made under the
+        exclusive lock, against the current version of the file.
+
+        Args:
+            title (str): The title to store the movie under.
+            movie (dict): The extracted movie data.
+            movies (dict): The movie data read before fetching, to count a
+            conflict if another process changed the file since, or None.
+
+        Returns:
+            bool: Whether the movie was added.
+        """
+        with self._lock.exclusive():
+            if movies is None:
+                movies = self.load_movies()
+            else:
+                movies = self._current_movies(movies)
+            existing = self.title_lookup().find(title, movie)
+            if existing is not None:
+                print(f"Movie {existing} already exists!")
+                return False
+            movies = self._mutable(movies)
+            movies[title] = movie
+            self._notify_add(title, movie)
+            self._commit(movies, "add", title, movie)
+        print(f"Movie {title} successfully added")
+        return True
+
+    def add_fetched_movies(self, movies):
+        """
+        Add movies already fetched from OMDB in a single save, skipping
+        those whose title or IMDb id is already stored. The check and the
+        save are made under the exclusive lock.
+
+        Args:
+            movies (dict): The extracted movie data keyed by title. The
+            skipped movies are removed from it.
+
+        Returns:
+            list: The titles skipped.
+        """
+        with self._lock.exclusive():
+            return super().add_fetched_movies(movies)
+
+    def delete_movie(self, title):
+        """
+        Delete an existing movie from the database.
+
+        Args:
+            title (str): The title of the movie to be deleted.
+
+        Returns:
+            bool: Whether the movie was deleted.
+        """
+        with self._lock.exclusive():
+            movies = self.load_movies()
+            key = self.title_lookup().resolve(title)
+            if key is None:
+                print(f"Movie {title} doesn't exist in the database!")
+                return False
+            movies = self._mutable(movies)
+            self._notify_remove(key, movies.pop(key))
+            self._commit(movies, "delete", key)
+        print(f"Movie {key} Deleted Successfully!")
+        return True
+
+    def update_movie(self, title, notes):
+        """
+        Update the notes for an existing movie in the database.
+
+        Args:
+            title (str): The title of the movie to be updated.
+            notes (str): The additional notes for the movie.
+
+        Returns:
+            bool: Whether the movie was updated.
+        """
+        with self._lock.exclusive():
+            movies = self.load_movies()
+            key = self.title_lookup().resolve(title)
+            if key is None:
+                print(f"{title} doesn't exist in the database!")
+                return False
+            movies = self._mutable(movies)
+            self._notify_remove(key, movies[key])
+            movies[key]["notes"] = notes
+            self._notify_add(key, movies[key])
+            self._commit(movies, "update", key, notes)
+        print(f"{key} Updated Successfully!")
+        return True
+
+    def import_movies(self, movies):
+        """
+        Add already fetched movies to the database in a single save.
+        Movies whose title is already stored are replaced.
+
+        Args:
+            movies (dict): The movie data keyed by title.
+        """
+        with self._lock.exclusive():
+            stored_movies = self._mutable(self.load_movies())
+            for title, movie in movies.items():
+                if title in stored_movies:
+                    self._notify_remove(title, stored_movies[title])
+                stored_movies[title] = movie
+                self._notify_add(title, movie)
+            self._save_movies(stored_movies)
+
+    def merge_movies(self, changes):
+        """
+        Change some fields of stored movies in a single save. The fields are
+        applied to the current version of every movie under the exclusive
+        lock, so concurrent changes to its other fields are kept.
+
+        Args:
+            changes (dict): The fields to set, keyed by title.
+
+        Returns:
+            list: The titles changed; titles no longer stored are skipped.
+        """
+        with self._lock.exclusive():
+            movies = self._mutable(self.load_movies())
+            merged = []
+            for title, fields in changes.items():
+                movie = movies.get(title)
+                if movie is None:
+                    continue
+                self._notify_remove(title, movie)
+                movie.update(fields)
+                self._notify_add(title, movie)
+                merged.append(title)
+            if merged:
+                self._save_movies(movies)
+        return merged
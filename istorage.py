@@ -3,14 +3,150 @@ This module contains abstract storage class.
 '''
 
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from bulk_import import fetch_movies
+from movie_sampler import MovieSampler
+from rating_stats import RatingStats
+from search_index import SearchIndex
+from sorted_index import SortedIndex
+from title_index import TitleIndex
 
 
 class IStorage(ABC):
     """
     Interface for storage class.
     Defines abstract methods that each storage class must implement.
+    Storage classes keep the requester they fetch movies with in _api_requester.
+
+    Listeners, such as the search index, are derived views of the stored
+    movies. Storage classes keep them in sync by passing the result of
+    load_movies through _sync_listeners, and by calling _notify_remove
+    before and _notify_add after changing a movie.
+
+    Attributes:
+        _listeners (list): [listener, movies] pairs, movies being the movie
+        data the listener currently reflects.
+        _search_index (SearchIndex): The search index, built on first search.
+        _rating_stats (RatingStats): The rating statistics, built on first use.
+        _sorted_index (SortedIndex): The rating and year indexes, built on first query.
+        _sampler (MovieSampler): The random movie sampler, built on first use.
+        _title_index (TitleIndex): The title and IMDb id lookup, built on first use.
     """
 
+    def __init__(self):
+        self._listeners = []
+        self._search_index = None
+        self._rating_stats = None
+        self._sorted_index = None
+        self._sampler = None
+        self._title_index = None
+
+    def add_listener(self, listener, movies):
+        """
+        Keep a listener in sync with the stored movies.
+
+        The listener must provide reset(movies), add(title, movie) and
+        remove(title, movie), and must already reflect movies.
+
+        Args:
+            listener: The object to keep in sync.
+            movies (dict): The movie data, as returned by load_movies.
+        """
+        self._listeners.append([listener, movies])
+
+    def _sync_listeners(self, movies):
+        """
+        Reset the listeners if the movie data was reloaded.
+
+        Args:
+            movies (dict): The movie data just loaded.
+
+        Returns:
+            dict: movies, unchanged.
+        """
+        for entry in self._listeners:
+            if entry[1] is not movies:
+                entry[0].reset(movies)
+                entry[1] = movies
+        return movies
+
+    def _notify_add(self, title, movie):
+        """
+        Tell the listeners a movie was added, or is back after an update.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data.
+        """
+        for listener, _ in self._listeners:
+            listener.add(title, movie)
+
+    def _notify_remove(self, title, movie):
+        """
+        Tell the listeners a movie is about to be removed or updated.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data.
+        """
+        for listener, _ in self._listeners:
+            listener.remove(title, movie)
+
+    def _search_index_file(self):
+        """
+        Return where to persist the search index.
+
+        Returns:
+            tuple: The path of the index file and the stamp of the currently
+            loaded movies, or None to keep the index in memory only.
+        """
+        return None
+
+    @abstractmethod
+    def load_movies(self):
+        """
+        Abstract method to load all movies.
+
+        Returns:
+            dict: The movie data keyed by title.
+        """
+
+    def iter_movies(self):
+        """
+        Iterate over the stored movies one at a time.
+
+        Storages able to read their file movie by movie override this, so
+        catalogues larger than memory can be listed, searched and summarized.
+
+        Returns:
+            iterator: (title, movie) pairs.
+        """
+        return iter(self.load_movies().items())
+
+    @abstractmethod
+    def import_movies(self, movies):
+        """
+        Abstract method to add already fetched movies in a single save.
+        Movies whose title is already stored are replaced.
+
+        Args:
+            movies (dict): The movie data keyed by title.
+        """
+
+    @abstractmethod
+    def merge_movies(self, changes):
+        """
+        Abstract method to change some fields of stored movies in a single
+        save. The fields are applied to the current version of every movie,
+        so concurrent changes to its other fields are kept.
+
+        Args:
+            changes (dict): The fields to set, keyed by title.
+
+        Returns:
+            list: The titles changed; titles no longer stored are skipped.
+        """
+
     @abstractmethod
     def list_movies(self):
         """
@@ -27,8 +163,44 @@ class IStorage(ABC):
 
         Args:
             title (str): The title of the movie.
+
+        Returns:
+            bool: Whether the movie was added.
         """
 
+    @abstractmethod
+    def add_fetched_movie(self, title, movie):
+        """
+        Abstract method to add a movie already fetched from OMDB, unless
+        its title or IMDb id is already stored. The check and the insert
+        are one step, so two callers adding the same movie add it once.
+
+        Args:
+            title (str): The title to store the movie under.
+            movie (dict): The extracted movie data.
+
+        Returns:
+            bool: Whether the movie was added.
+        """
+
+    def add_fetched_movies(self, movies):
+        """
+        Add movies already fetched from OMDB in a single save, skipping
+        those whose title or IMDb id is already stored. Storages shared by
+        several writers override this to check and save under one lock.
+
+        Args:
+            movies (dict): The extracted movie data keyed by title. The
+            skipped movies are removed from it.
+
+        Returns:
+            list: The titles skipped.
+        """
+        skipped = self.title_lookup().drop_duplicates(movies)
+        if movies:
+            self.import_movies(movies)
+        return skipped
+
     @abstractmethod
     def delete_movie(self, title):
         """
@@ -36,6 +208,9 @@ class IStorage(ABC):
 
         Args:
             title (str): The title of the movie to delete.
+
+        Returns:
+            bool: Whether the movie was deleted.
         """
 
     @abstractmethod
@@ -46,4 +221,149 @@ class IStorage(ABC):
         Args:
             title (str): The title of the movie to update.
             notes (str): Any additional notes or details about the movie.
+
+        Returns:
+            bool: Whether the movie was updated.
+        """
+
+    @contextmanager
+    def batch(self):
+        """
+        Group the changes made within the block.
+
+        Storages rewriting their whole file on every change override this
+        to save the file once, at the end of the block. By default every
+        change is saved as it is made.
+
+        Yields:
+            None
+        """
+        yield
+
+    def add_movies(self, titles, max_workers=8, rate_limit=None):
+        """
+        Fetch many movies concurrently and add them in a single save.
+
+        Titles that are already stored, ignoring case and accents, are
+        skipped, and so are fetched movies whose IMDb id is already stored
+        or fetched under another title. Titles that are not found or whose
+        request fails are reported without aborting the batch.
+
+        Args:
+            titles (list): The titles of the movies to be added.
+            max_workers (int): The maximum number of API requests in flight.
+            rate_limit (float): The maximum number of API requests per second, or None.
+
+        Returns:
+            dict: The "added" and "skipped" titles, and the "failed" titles
+            mapped to the reason they failed.
+        """
+        skipped, new_titles = self.title_lookup().split_titles(titles)
+        movies, failures = fetch_movies(self._api_requester, new_titles, max_workers, rate_limit)
+        # Stored movies may have changed while fetching.
+        skipped += self.add_fetched_movies(movies)
+        return {"added": list(movies), "skipped": skipped, "failed": failures}
+
+    def title_lookup(self):
+        """
+        Return the lookup resolving titles, ignoring case and accents, and
+        IMDb ids to the keys of the stored movies. It is built on first use
+        and kept up to date as movies change.
+
+        Returns:
+            TitleIndex: The lookup.
+        """
+        movies = self.load_movies()
+        if self._title_index is None:
+            self._title_index = TitleIndex.build(movies)
+            self.add_listener(self._title_index, movies)
+        return self._title_index
+
+    def search_movies(self, query, limit=None):
+        """
+        Find the movies best matching query in their title, genre,
+        director, actors or plot, tolerating typos.
+
+        Args:
+            query (str): The words to search for.
+            limit (int): The maximum number of results, or None for all.
+
+        Returns:
+            dict: The matching titles mapped to their rating, best match first.
+        """
+        movies = self.load_movies()
+        if self._search_index is None:
+            index_file = self._search_index_file()
+            index = SearchIndex.load(*index_file) if index_file else None
+            if index is None:
+                index = SearchIndex.build(movies)
+                if index_file:
+                    index.save(*index_file)
+            self._search_index = index
+            self.add_listener(index, movies)
+        return {title: movies[title]['rating']
+                for title in self._search_index.search(query, limit)}
+
+    def query_movies(self, min_rating=None, max_rating=None, min_year=None, max_year=None,
+                     order_by='rating', limit=None, offset=0):
+        """
+        Find the movies in a rating and year range, best rated or oldest
+        first, using sorted indexes kept up to date as movies change.
+
+        Args:
+            min_rating (float): The lowest rating, or None.
+            max_rating (float): The highest rating, or None.
+            min_year (int): The first release year, or None.
+            max_year (int): The last release year, or None.
+            order_by (str): 'rating' for best rated first, or 'year' for
+            oldest first and best rated first within a year.
+            limit (int): The maximum number of results, or None for all.
+            offset (int): The number of results to skip, for paging.
+
+        Returns:
+            list: (title, year, rating) tuples.
+        """
+        movies = self.load_movies()
+        if self._sorted_index is None:
+            self._sorted_index = SortedIndex.build(movies)
+            self.add_listener(self._sorted_index, movies)
+        return self._sorted_index.query(min_rating, max_rating, min_year, max_year,
+                                        order_by, limit, offset)
+
+    def sample_movies(self, count=1, weight=None):
+        """
+        Suggest random movies. Uniform suggestions do not repeat a movie
+        before all movies were suggested, across calls; weighted ones
+        suggest every movie in proportion to its weight.
+
+        Args:
+            count (int): The number of movies to suggest.
+            weight (str): None for uniform suggestions, 'rating', 'recency'
+            or 'genre:<name>', see movie_sampler.weight_function.
+
+        Returns:
+            list: Up to count distinct (title, year, rating) tuples.
+        """
+        movies = self.load_movies()
+        if self._sampler is None:
+            self._sampler = MovieSampler()
+            self._sampler.reset(movies)
+            self.add_listener(self._sampler, movies)
+        return [(title, movies[title].get('year'), movies[title].get('rating'))
+                for title in self._sampler.sample(count, weight)]
+
+    def rating_stats(self):
+        """
+        Calculate the rating statistics of the movies.
+
+        The statistics are computed in one pass on first use and then kept
+        up to date as movies are added, deleted and updated.
+
+        Returns:
+            dict: The rating statistics, see rating_stats.summarize.
         """
+        movies = self.load_movies()
+        if self._rating_stats is None:
+            self._rating_stats = RatingStats(movies)
+            self.add_listener(self._rating_stats, movies)
+        return self._rating_stats.summary()
@@ -0,0 +1,174 @@
+'''
+This module contains the append-only journal used by the
+file based storage systems, and the atomic file replacement
+used to write their snapshots.
+'''
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+import metrics
+
+
+def _file_mode(file_path):
+    """
+    Return the permission bits a replacement of file_path should get.
+
+    Args:
+        file_path (str): The path of the file to replace.
+
+    Returns:
+        int: The mode of the existing file, or the umask default for a new one.
+    """
+    try:
+        return os.stat(file_path).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+@contextmanager
+def atomic_write(file_path):
+    """
+    Write a file atomically.
+
+    Yields a temporary path in the same directory as file_path. When the
+    block completes, the temporary file replaces file_path with os.replace,
+    so readers see either the old or the new file, never a truncated one.
+
+    Args:
+        file_path (str): The path of the file to replace.
+
+    Yields:
+        str: The temporary path to write the new contents to.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    file_descriptor, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    os.close(file_descriptor)
+    try:
+        os.chmod(temp_path, _file_mode(file_path))
+        yield temp_path
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class Journal:
+    """
+    Journal is an append-only log of storage mutations.
+
+    Every add, delete or update is appended as one JSON line to
+    ``<file_path>.journal``. Loading replays the log on top of the base
+    snapshot, and once the log reaches compact_threshold entries the storage
+    folds it into a new snapshot and clears it.
+
+    Args:
+        file_path (str): The path of the snapshot file the journal belongs to.
+        compact_threshold (int): The number of entries that triggers a compaction.
+
+    Attributes:
+        file_path (str): The path of the journal file.
+        _compact_threshold (int): The number of entries that triggers a compaction.
+        _entries (int): The number of entries currently in the journal.
+    """
+
+    def __init__(self, file_path, compact_threshold=1000):
+        self.file_path = f"{file_path}.journal"
+        self._compact_threshold = compact_threshold
+        self._entries = 0
+
+    def append(self, operation, title, data=None):
+        """
+        Append a mutation to the journal and flush it to disk.
+
+        Args:
+            operation (str): One of "add", "delete" or "update".
+            title (str): The title of the movie that was changed.
+            data: The movie added, or the notes of the movie updated.
+        """
+        record = json.dumps({"op": operation, "title": title, "data": data}) + "\n"
+        with metrics.timer("journal.append"):
+            with open(self.file_path, "a", encoding="utf-8") as file:
+                file.write(record)
+                file.flush()
+                os.fsync(file.fileno())
+        self._entries += 1
+        metrics.count("storage.records_written")
+        metrics.count("storage.bytes_written", len(record.encode()))
+
+    def replay(self, movies):
+        """
+        Apply the journaled mutations to movies loaded from the snapshot.
+
+        A torn record at the end of the journal, left by a crash during an
+        append, is discarded and cut from the file.
+
+        Args:
+            movies (dict): The movie data loaded from the snapshot.
+
+        Returns:
+            dict: The movie data with the journal applied.
+        """
+        self._entries = 0
+        try:
+            file = open(self.file_path, "rb")
+        except FileNotFoundError:
+            return movies
+        with file:
+            valid_bytes = 0
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self._apply(movies, record)
+                self._entries += 1
+                valid_bytes += len(line)
+            size = os.fstat(file.fileno()).st_size
+        if valid_bytes < size:
+            with open(self.file_path, "r+b") as file:
+                file.truncate(valid_bytes)
+        return movies
+
+    @staticmethod
+    def _apply(movies, record):
+        """
+        Apply a single journal record to movies.
+
+        Args:
+            movies (dict): The movie data to change.
+            record (dict): The journal record.
+        """
+        title = record["title"]
+        if record["op"] == "add":
+            movies[title] = record["data"]
+        elif record["op"] == "delete":
+            movies.pop(title, None)
+        elif record["op"] == "update" and title in movies:
+            movies[title]["notes"] = record["data"]
+
+    def needs_compaction(self):
+        """
+        Check whether the journal is long enough to be folded into the snapshot.
+
+        Returns:
+            bool: True if the storage should compact.
+        """
+        return self._entries >= self._compact_threshold
+
+    def clear(self):
+        """
+        Remove the journal after its entries were written to a snapshot.
+        """
+        try:
+            os.remove(self.file_path)
+        except FileNotFoundError:
+            pass
+        self._entries = 0
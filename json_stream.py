@@ -0,0 +1,156 @@
+'''
+This module contains the incremental JSON reader used to go over
+movie files larger than memory, and the conversion of movie data to
+strict JSON.
+'''
+
+import json
+import math
+
+# The number of characters read from the file at a time.
+CHUNK_SIZE = 1 << 20
+
+WHITESPACE = ' \t\n\r'
+
+
+class _Buffer:
+    """
+    _Buffer holds the part of a file read but not parsed yet.
+
+    Args:
+        file: The text file to read from.
+        chunk_size (int): The number of characters read at a time.
+
+    Attributes:
+        text (str): The characters read and not dropped yet.
+        position (int): The position of the next character to parse in text.
+        eof (bool): Whether the whole file was read.
+    """
+
+    def __init__(self, file, chunk_size):
+        self._file = file
+        self._chunk_size = chunk_size
+        self.text = ''
+        self.position = 0
+        self.eof = False
+
+    def read_more(self):
+        """
+        Read the next chunk, dropping the characters already parsed.
+
+        Returns:
+            bool: False if the file was read to the end.
+        """
+        if self.eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        self.text = self.text[self.position:] + chunk
+        self.position = 0
+        self.eof = not chunk
+        return not self.eof
+
+    def next_char(self):
+        """
+        Skip whitespace and return the next character without consuming it.
+
+        Returns:
+            str: The character, or '' at the end of the file.
+        """
+        while True:
+            while self.position < len(self.text) and self.text[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.text) or not self.read_more():
+                return self.text[self.position:self.position + 1]
+
+    def expect(self, chars):
+        """
+        Consume the next character, which must be one of chars.
+
+        Returns:
+            str: The character.
+
+        Raises:
+            ValueError: If the next character is another one.
+        """
+        char = self.next_char()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} but found {char or 'end of file'!r}")
+        self.position += 1
+        return char
+
+    def value(self, decoder):
+        """
+        Decode the next JSON value, reading more of the file as needed.
+
+        A value ending exactly at the end of the text read so far may be cut
+        short, a number for instance, so it is decoded again once more of the
+        file is read.
+
+        Returns:
+            The decoded value.
+        """
+        self.next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.position)
+            except json.JSONDecodeError:
+                if not self.read_more():
+                    raise
+                continue
+            if end < len(self.text) or not self.read_more():
+                self.position = end
+                return value
+
+
+def iter_object_items(file, chunk_size=CHUNK_SIZE):
+    """
+    Iterate over the members of the JSON object a file holds, without
+    reading the whole file. Only one member is decoded at a time, so memory
+    use depends on the size of the largest member, not of the file.
+
+    Args:
+        file: The text file, holding a single JSON object.
+        chunk_size (int): The number of characters read at a time.
+
+    Yields:
+        tuple: The key and the decoded value of every member, in file order.
+
+    Raises:
+        ValueError: If the file does not hold a JSON object.
+    """
+    buffer = _Buffer(file, chunk_size)
+    decoder = json.JSONDecoder()
+    if not buffer.next_char():
+        return
+    buffer.expect('{')
+    if buffer.next_char() == '}':
+        return
+    while True:
+        key = buffer.value(decoder)
+        if not isinstance(key, str):
+            raise ValueError(f"Expected a member name but found {key!r}")
+        buffer.expect(':')
+        yield key, buffer.value(decoder)
+        if buffer.expect(',}') == '}':
+            return
+
+
+def strict_json(value):
+    """
+    Replace the float NaN and infinities in value, such as the empty cells
+    of a CSV catalogue, with None, so it can be dumped as strict JSON with
+    allow_nan=False.
+
+    Args:
+        value: The value, with nested dictionaries, lists and tuples.
+
+    Returns:
+        The value, with null for every number JSON cannot represent.
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: strict_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [strict_json(item) for item in value]
+    return value
@@ -1,43 +1,364 @@
 '''
 main file.
-Run: python3 main.py file_path
+Run: python3 main.py file_path [--journal] [--import titles_path | --refresh]
+     [--workers N] [--rate R] [--batch-size N] [--no-posters]
+     [--chart-format svg|png] [--json] [--profile] [--cprofile path]
+     [--metrics path] [command ...]
 Arguments:
-    1. file_path with .csv or .json extension
+    1. file_path with .csv, .json, .db, .sqlite or .snap extension
+    2. --journal to append changes to file_path.journal instead of
+       rewriting file_path on every change
+    3. --import to add the titles listed in titles_path, one per line,
+       instead of starting the menu. Use - to read titles from stdin.
+       --workers limits the concurrent OMDB requests and --rate the
+       requests per second.
+    4. --page-size to split the generated website into pages of that many
+       movies, optionally grouped with --group-by genre, year or letter.
+       The posters are downloaded into _static/posters unless --no-posters
+       is given, and the rating charts are drawn to _static/charts as SVG
+       files, or PNG files with --chart-format png.
+    5. --refresh to fetch every stored movie again by imdbID and save the
+       changed ratings and details, --batch-size movies at a time, instead of
+       starting the menu. An interrupted refresh resumes from file_path.refresh.
+    6. --stream to list, search, summarize and render the movies one at a
+       time instead of loading the file, for files larger than memory.
+    7. A command to run it instead of starting the menu: list, add titles,
+       delete titles, update title notes, stats, search query, site or
+       top [limit]. --json prints the result as JSON. batch [path] runs
+       the JSON lines operations read from path (stdin by default) with a
+       single save and, once saved, prints one JSON result per line.
+    8. --profile to print the time spent in the storage, OMDB, website and
+       chart operations, with the bytes, records, requests and cache hits
+       counted, to stderr when the app exits. --cprofile writes a cProfile
+       dump to path and prints its slowest functions. --metrics, or the
+       METRICS_PATH environment variable, appends the same measurements
+       as one JSON line to path.
 '''
 import os
+import sys
+import time
 import argparse
+import contextlib
+import json
 from dotenv import load_dotenv
-from api_requester import ApiRequester
-from movie_app import MovieApp
-from storage_json import StorageJson
-from storage_csv import StorageCsv
+import metrics
+from charts import CHART_FORMATS
+from site_pages import GROUP_BY
+
+# The functions a --cprofile report lists.
+PROFILE_LINES = 25
+
+# The storages, the menu, the charts and the OMDB client pull in pandas,
+# numpy, matplotlib and requests, so each is imported by the function
+# that needs it. A command only pays for the modules it uses.
 
 load_dotenv()  # load environment variables from .env file
 API_KEY = os.getenv("API_KEY")  # read the API key from the .env file
 BASE_URL = "http://www.omdbapi.com"
+CACHE_PATH = os.getenv("OMDB_CACHE", ".omdb_cache.db")  # where OMDB responses are cached
 
 
-def create_app(file_path: str) -> MovieApp:
+def create_storage(file_path: str, api_requester, journaled: bool = False):
+    """
+    Creates the storage class matching the file extension.
+
+    Args:
+        file_path (str): The path to the storage file.
+        api_requester (IApiRequester): The requester used to fetch movie data.
+        journaled (bool): Append mutations to a journal instead of rewriting the file.
+        Ignored for SQLite databases and snapshots.
+
+    Returns:
+        IStorage: The storage for the file.
+    """
+    if file_path.endswith('.json'):
+        from storage_json import StorageJson  # pylint: disable=import-outside-toplevel
+        return StorageJson(file_path, api_requester, journaled)
+    if file_path.endswith('.csv'):
+        from storage_csv import StorageCsv  # pylint: disable=import-outside-toplevel
+        return StorageCsv(file_path, api_requester, journaled)
+    if file_path.endswith(('.db', '.sqlite')):
+        from storage_sqlite import StorageSqlite  # pylint: disable=import-outside-toplevel
+        return StorageSqlite(file_path, api_requester)
+    if file_path.endswith('.snap'):
+        from storage_snapshot import StorageSnapshot  # pylint: disable=import-outside-toplevel
+        return StorageSnapshot(file_path, api_requester)
+    raise ValueError(f"Unsupported file type: {file_path}")
+
+
+def create_api_requester(pool_size: int = 10):
+    """
+    Creates the OMDB requester, caching responses on disk.
+
+    Args:
+        pool_size (int): The maximum number of pooled OMDB connections.
+
+    Returns:
+        IApiRequester: The requester.
+    """
+    from api_requester import ApiRequester  # pylint: disable=import-outside-toplevel
+    from api_cache import CachingApiRequester  # pylint: disable=import-outside-toplevel
+    return CachingApiRequester(ApiRequester(BASE_URL, API_KEY, pool_size), CACHE_PATH)
+
+
+def create_app(file_path: str, journaled: bool = False, page_size: int = None,
+               group_by: str = None, streaming: bool = False, posters: bool = True,
+               chart_format: str = 'svg'):
     """
     Creates an instance of the MovieApp using the appropriate storage
     class based on the file extension.
 
     Args:
         file_path (str): The path to the storage file.
+        journaled (bool): Append mutations to a journal instead of rewriting the file.
+        page_size (int): The number of movies per website page, or None for a single page.
+        group_by (str): Group the website pages by 'genre', 'year' or 'letter'.
+        streaming (bool): Go over the movies one at a time instead of loading them.
+        posters (bool): Download the posters for the website instead of linking them.
+        chart_format (str): Draw the charts as 'svg' or 'png' files.
 
     Returns:
         MovieApp: An instance of the MovieApp.
     """
-    api_requester = ApiRequester(BASE_URL, API_KEY)
+    from movie_app import MovieApp  # pylint: disable=import-outside-toplevel
+    storage = create_storage(file_path, create_api_requester(), journaled)
+    return MovieApp(storage, page_size, group_by, streaming, posters, chart_format)
 
-    if file_path.endswith('.json'):
-        storage = StorageJson(file_path, api_requester)
-    elif file_path.endswith('.csv'):
-        storage = StorageCsv(file_path, api_requester)
+
+def import_titles(storage, titles_path: str, workers: int, rate: float):
+    """
+    Adds every title listed in a file and prints a summary.
+
+    Args:
+        storage (IStorage): The storage to add the movies to.
+        titles_path (str): The file listing one title per line, or - for stdin.
+        workers (int): The maximum number of concurrent OMDB requests.
+        rate (float): The maximum number of OMDB requests per second, or None.
+    """
+    from bulk_import import read_titles  # pylint: disable=import-outside-toplevel
+    if titles_path == '-':
+        titles = read_titles(sys.stdin)
     else:
-        raise ValueError(f"Unsupported file type: {file_path}")
+        with open(titles_path, 'r', encoding='utf-8') as file:
+            titles = read_titles(file)
+
+    report = storage.add_movies(titles, max_workers=workers, rate_limit=rate)
+    for title, reason in report['failed'].items():
+        print(f"Error: {title}: {reason}")
+    print(f"Added {len(report['added'])} movies, skipped {len(report['skipped'])} "
+          f"already stored, {len(report['failed'])} failed.")
+
+
+def refresh_catalogue(storage, file_path: str, workers: int, rate: float, batch_size: int):
+    """
+    Refreshes every stored movie from OMDB and prints a summary.
+    OMDB is queried directly, as cached responses would be as old as the
+    stored movies.
+
+    Args:
+        storage (IStorage): The storage to refresh.
+        file_path (str): The path to the storage file, next to which the
+        checkpoint is kept.
+        workers (int): The maximum number of concurrent OMDB requests.
+        rate (float): The maximum number of OMDB requests per second, or None.
+        batch_size (int): The number of movies fetched and saved together.
+    """
+    from api_requester import ApiRequester  # pylint: disable=import-outside-toplevel
+    from refresh import refresh_movies  # pylint: disable=import-outside-toplevel
+    report = refresh_movies(storage, ApiRequester(BASE_URL, API_KEY, workers), batch_size,
+                            workers, rate, f"{file_path}.refresh")
+    for title, reason in report['failed'].items():
+        print(f"Error: {title}: {reason}")
+    print(f"Updated {len(report['updated'])} movies, {report['unchanged']} unchanged, "
+          f"skipped {len(report['skipped'])} without imdbID, {len(report['failed'])} failed.")
+
+
+def add_command_parsers(parser):
+    """
+    Adds the commands that run without the menu to the argument parser.
 
-    return MovieApp(storage)
+    Args:
+        parser (argparse.ArgumentParser): The parser of main.
+    """
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.add_parser('list', help='List the movies')
+    add = commands.add_parser('add', help='Add movies by title')
+    add.add_argument('titles', nargs='+')
+    delete = commands.add_parser('delete', help='Delete movies by title')
+    delete.add_argument('titles', nargs='+')
+    update = commands.add_parser('update', help='Set the notes of a movie')
+    update.add_argument('title')
+    update.add_argument('notes')
+    commands.add_parser('stats', help='Print the rating statistics')
+    search = commands.add_parser('search', help='Search the movies')
+    search.add_argument('query')
+    commands.add_parser('site', help='Generate the website')
+    top = commands.add_parser('top', help='List the best rated movies')
+    top.add_argument('limit', type=int, nargs='?', default=10)
+    batch = commands.add_parser('batch', help='Run JSON lines operations with one save')
+    batch.add_argument('path', nargs='?', default='-',
+                       help='The file of operations, - for stdin (the default)')
+
+
+def batch_changes(storage, changes):
+    """
+    Group the changes of a command in a single save if there are several,
+    see IStorage.batch. A single change is saved as usual, so in journaled
+    mode it is appended to the journal instead of rewriting the file.
+
+    Args:
+        storage (IStorage): The storage the command changes.
+        changes (int): The number of changes the command makes.
+
+    Returns:
+        contextmanager: The batch, or a context doing nothing.
+    """
+    return storage.batch() if changes > 1 else contextlib.nullcontext()
+
+
+def run_command(storage, util, args):
+    """
+    Runs a command given on the command line and prints its result.
+
+    Args:
+        storage (IStorage): The storage the command reads or changes.
+        util (Utility): The utility over the same storage.
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        bool: Whether every operation of the command succeeded.
+    """
+    from commands import run_batch, run_operation  # pylint: disable=import-outside-toplevel
+    from json_stream import strict_json  # pylint: disable=import-outside-toplevel
+    if args.command == 'batch':
+        if args.path == '-':
+            lines = sys.stdin
+        else:
+            lines = open(args.path, 'r', encoding='utf-8')
+        with lines:
+            results = run_batch(storage, util, lines, args.workers, args.rate)
+        for result in results:
+            print(json.dumps(strict_json(result), allow_nan=False))
+        return all(result["ok"] for result in results)
+
+    if args.command in ('add', 'delete'):
+        operations = [{"op": args.command, "title": title} for title in args.titles]
+    elif args.command == 'update':
+        operations = [{"op": "update", "title": args.title, "notes": args.notes}]
+    elif args.command == 'search':
+        operations = [{"op": "search", "query": args.query}]
+    elif args.command == 'site':
+        operations = [{"op": "site", "page_size": args.page_size, "group_by": args.group_by}]
+    elif args.command == 'top':
+        operations = [{"op": "top", "limit": args.limit}]
+    else:
+        operations = [{"op": args.command}]
+
+    if args.json:
+        changes = sum(operation["op"] in ('add', 'delete', 'update') for operation in operations)
+        with batch_changes(storage, changes):
+            results = [run_operation(storage, util, operation) for operation in operations]
+        for result in results:
+            print(json.dumps(strict_json(result), allow_nan=False))
+        return all(result["ok"] for result in results)
+
+    if args.command == 'list':
+        storage.list_movies()
+    elif args.command == 'add':
+        with batch_changes(storage, len(args.titles)):
+            return all([storage.add_movie(title) for title in args.titles])
+    elif args.command == 'delete':
+        with batch_changes(storage, len(args.titles)):
+            return all([storage.delete_movie(title) for title in args.titles])
+    elif args.command == 'update':
+        return storage.update_movie(args.title, args.notes)
+    elif args.command == 'stats':
+        util.stats()
+    elif args.command == 'search':
+        util.search_movie(args.query)
+    elif args.command == 'site':
+        report = util.generate_website(args.page_size, args.group_by)
+        print("Website Created!")
+        if report and report['failed']:
+            print(f"{len(report['failed'])} posters could not be downloaded and are linked.")
+    elif args.command == 'top':
+        util.movies_sorted_by_rating(0, args.limit)
+    return True
+
+
+def run(args):
+    """
+    Runs the import, the refresh, the command or the menu the arguments ask for.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        bool: Whether it succeeded.
+    """
+    if args.import_path:
+        storage = create_storage(args.file_path, create_api_requester(args.workers),
+                                 args.journal)
+        import_titles(storage, args.import_path, args.workers, args.rate)
+    elif args.refresh:
+        storage = create_storage(args.file_path, None, args.journal)
+        refresh_catalogue(storage, args.file_path, args.workers, args.rate, args.batch_size)
+    elif args.command:
+        from utility import Utility  # pylint: disable=import-outside-toplevel
+        # Only adding movies asks OMDB, so other commands skip the requester and its cache.
+        needs_api = args.command in ('add', 'batch')
+        storage = create_storage(args.file_path,
+                                 create_api_requester(args.workers) if needs_api else None,
+                                 args.journal)
+        util = Utility(storage, args.stream, args.posters, args.chart_format)
+        return run_command(storage, util, args)
+    else:
+        app = create_app(args.file_path, args.journal, args.page_size, args.group_by,
+                         args.stream, args.posters, args.chart_format)
+        app.run()
+    return True
+
+
+def run_profiled(args):
+    """
+    Runs the app under cProfile, dumps the profile to args.cprofile and
+    prints the functions with the most cumulative time to stderr.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        bool: Whether it succeeded.
+    """
+    import cProfile  # pylint: disable=import-outside-toplevel
+    import pstats  # pylint: disable=import-outside-toplevel
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(run, args)
+    finally:
+        profiler.dump_stats(args.cprofile)
+        print(f"Profile written to {args.cprofile}", file=sys.stderr)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(
+            PROFILE_LINES)
+
+
+def report_metrics(args, seconds):
+    """
+    Prints the recorded metrics for --profile and appends them to the
+    --metrics file.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+        seconds (float): The wall time of the run.
+    """
+    if args.profile:
+        print(f"\nProfile of {seconds * 1000:.1f} ms:", file=sys.stderr)
+        print(metrics.format_report(metrics.snapshot(), seconds), file=sys.stderr)
+    if args.metrics:
+        command = args.command or ('import' if args.import_path
+                                   else 'refresh' if args.refresh else 'menu')
+        metrics.write_record(args.metrics, command=command, file=args.file_path,
+                             seconds=seconds)
 
 
 def main():
@@ -47,10 +368,48 @@ def main():
     """
     parser = argparse.ArgumentParser(description='Process storage file.')
     parser.add_argument('file_path', help='The storage file path')
+    parser.add_argument('--journal', action='store_true',
+                        help='Append changes to a journal instead of rewriting the file')
+    parser.add_argument('--import', dest='import_path', metavar='titles_path',
+                        help='Add the titles listed in this file (- for stdin) and exit')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Fetch the stored movies again by imdbID, save changes and exit')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='Maximum concurrent OMDB requests for --import and --refresh')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Maximum OMDB requests per second for --import and --refresh')
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help='Movies fetched and saved together by --refresh')
+    parser.add_argument('--page-size', type=int, default=None,
+                        help='Split the generated website into pages of this many movies')
+    parser.add_argument('--group-by', choices=GROUP_BY, default=None,
+                        help='Group the website pages by genre, year or first letter')
+    parser.add_argument('--no-posters', dest='posters', action='store_false',
+                        help='Link the posters in the website instead of downloading them')
+    parser.add_argument('--chart-format', choices=CHART_FORMATS, default='svg',
+                        help='Draw the rating charts as SVG or PNG files')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read the movies one at a time, for files larger than memory')
+    parser.add_argument('--json', action='store_true',
+                        help='Print the result of a command as JSON')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print the time and counts of every operation on exit')
+    parser.add_argument('--cprofile', metavar='path', default=None,
+                        help='Write a cProfile dump to this file and print its top functions')
+    parser.add_argument('--metrics', metavar='path', default=os.getenv("METRICS_PATH"),
+                        help='Append the metrics of the run as a JSON line to this file')
+    add_command_parsers(parser)
     args = parser.parse_args()
 
-    app = create_app(args.file_path)
-    app.run()
+    metrics.enable(bool(args.profile or args.metrics))
+    start = time.perf_counter()
+    try:
+        ok = run_profiled(args) if args.cprofile else run(args)
+    finally:
+        if metrics.is_enabled():
+            report_metrics(args, time.perf_counter() - start)
+    if not ok:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+'''
+This module contains the instrumentation of the app: timers and counters
+of the storage, API and rendering hot paths, reported by main.py --profile
+and appended to a JSON lines file by --metrics.
+
+Instrumentation is off until enable is called, and then a timer or a
+counter costs one check of a flag, so the hot paths keep it in place.
+'''
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_enabled = False
+# The number of calls, total seconds and longest call of every timer.
+_timers = {}
+_counters = {}
+
+
+def enable(enabled=True):
+    """
+    Turn the instrumentation on or off.
+
+    Args:
+        enabled (bool): Whether timers and counters record anything.
+    """
+    global _enabled  # pylint: disable=global-statement
+    _enabled = enabled
+
+
+def is_enabled():
+    """
+    Returns:
+        bool: Whether timers and counters record anything.
+    """
+    return _enabled
+
+
+def reset():
+    """
+    Forget everything recorded so far.
+    """
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def add_time(name, seconds):
+    """
+    Record one call of an operation.
+
+    Args:
+        name (str): The operation, e.g. "storage.read".
+        seconds (float): How long the call took.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            _timers[name] = [1, seconds, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+
+@contextmanager
+def timer(name):
+    """
+    Time the block as one call of an operation. Nested timers each count
+    the whole of their block.
+
+    Args:
+        name (str): The operation, e.g. "storage.read".
+    """
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """
+    Decorate a function to time every call as an operation.
+
+    Args:
+        name (str): The operation, e.g. "utility.stats".
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add_time(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """
+    Add to a counter.
+
+    Args:
+        name (str): The counter, e.g. "storage.bytes_read".
+        value (int): The amount to add.
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def snapshot():
+    """
+    Returns:
+        dict: The 'timers', each with its 'calls', total 'seconds' and
+        'max' seconds, and the 'counters', keyed by name.
+    """
+    with _lock:
+        return {
+            "timers": {name: {"calls": calls, "seconds": seconds, "max": longest}
+                       for name, (calls, seconds, longest) in sorted(_timers.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def format_report(recorded, total=None):
+    """
+    Lay out recorded metrics as a table, slowest operations first.
+
+    Args:
+        recorded (dict): The metrics, see snapshot.
+        total (float): The seconds of the whole run, to show each operation's share.
+
+    Returns:
+        str: The table.
+    """
+    lines = [f"{'operation':<32}{'calls':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}"
+             + ("   share" if total else "")]
+    timers = sorted(recorded["timers"].items(), key=lambda item: -item[1]["seconds"])
+    for name, timer in timers:
+        line = (f"{name:<32}{timer['calls']:>8}{timer['seconds'] * 1000:>12.1f}"
+                f"{timer['seconds'] * 1000 / timer['calls']:>10.2f}{timer['max'] * 1000:>10.1f}")
+        if total:
+            line += f"{timer['seconds'] / total:>8.0%}"
+        lines.append(line)
+    if recorded["counters"]:
+        lines.append(f"{'counter':<32}{'value':>8}")
+        lines.extend(f"{name:<32}{value:>8}" for name, value in recorded["counters"].items())
+    return "\n".join(lines)
+
+
+def write_record(path, **fields):
+    """
+    Append the metrics recorded so far as one JSON line, e.g. to follow
+    the latency of a command across releases.
+
+    Args:
+        path (str): The JSON lines file.
+        **fields: Extra fields of the record, such as the command.
+    """
+    record = {"time": time.time(), "pid": os.getpid(),
+              "python": ".".join(map(str, sys.version_info[:3])), **fields, **snapshot()}
+    line = json.dumps(record, default=str) + "\n"
+    # One write of a whole line in append mode, so the records of concurrent
+    # processes do not interleave.
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(line)
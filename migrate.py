@@ -0,0 +1,49 @@
+'''
+Migrate a movie database between storage formats.
+Run: python3 migrate.py source_path target_path
+Arguments:
+    1. source_path with .csv, .json, .db, .sqlite or .snap extension
+    2. target_path with .csv, .json, .db, .sqlite or .snap extension
+
+The movies of the source are added to the target in a single save,
+replacing movies of the same title. Converting a JSON or CSV database
+to a .snap snapshot, or back, goes through the same path.
+'''
+import argparse
+from main import create_storage
+
+
+def migrate(source_path: str, target_path: str) -> int:
+    """
+    Copy every movie from one storage file to another.
+
+    Args:
+        source_path (str): The storage file to read.
+        target_path (str): The storage file to write.
+
+    Returns:
+        int: The number of movies migrated.
+    """
+    source = create_storage(source_path, None)
+    target = create_storage(target_path, None)
+    # Snapshots decode movies lazily, the other storages save dictionaries.
+    movies = {title: dict(movie) for title, movie in source.load_movies().items()}
+    target.import_movies(movies)
+    return len(movies)
+
+
+def main():
+    """
+    The main entry point of the script.
+    """
+    parser = argparse.ArgumentParser(description='Migrate a movie database.')
+    parser.add_argument('source_path', help='The storage file to read')
+    parser.add_argument('target_path', help='The storage file to write')
+    args = parser.parse_args()
+
+    count = migrate(args.source_path, args.target_path)
+    print(f"Migrated {count} movies from {args.source_path} to {args.target_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,21 +5,36 @@ This module contains the code to run our Movies App.
 from colorama import Fore, Style
 from utility import Utility
 
+# The number of movies shown at once by the sorted and filtered listings.
+LIST_PAGE_SIZE = 50
+
+
 class MovieApp:
     """
     MovieApp class represents an application for managing a movie database.
 
     Args:
         storage: The storage object that implements the required methods for managing movies.
+        page_size (int): The number of movies per website page, or None for a single page.
+        group_by (str): Group the website pages by 'genre', 'year' or 'letter'.
+        streaming (bool): List, search, summarize and render the movies one at a
+        time, for catalogues larger than memory.
+        posters (bool): Download the posters for the website instead of linking them.
+        chart_format (str): Draw the charts as 'svg' or 'png' files.
 
     Attributes:
         _storage: The storage object used for accessing and manipulating movie data.
+        _page_size (int): The number of movies per website page, or None.
+        _group_by (str): How the website pages are grouped, or None.
 
     """
 
-    def __init__(self, storage):
+    def __init__(self, storage, page_size=None, group_by=None, streaming=False, posters=True,
+                 chart_format='svg'):
         self._storage = storage
-        self._util = Utility(storage)
+        self._util = Utility(storage, streaming, posters, chart_format)
+        self._page_size = page_size
+        self._group_by = group_by
 
     def _command_list_movies(self):
         """
@@ -59,7 +74,10 @@ class MovieApp:
         """
         Command to generate website_html.
         """
-        self._util.generate_website()
+        report = self._util.generate_website(self._page_size, self._group_by)
+        if report and report['failed']:
+            print(Fore.RED, f"{len(report['failed'])} posters could not be downloaded "
+                  "and are linked instead.", Style.RESET_ALL)
 
     def _command_get_stats(self):
         """
@@ -71,7 +89,14 @@ class MovieApp:
         """
         Get a Random movie from the database
         """
-        self._util.random_movie()
+        count = self._input_number("How many movies? (empty for 1):", int) or 1
+        print(Fore.MAGENTA, "Favour rating, recency or genre:<name>? (empty for none):",
+              Style.RESET_ALL, end="\t")
+        weight = input().strip() or None
+        try:
+            self._util.random_movie(count, weight)
+        except ValueError as error:
+            print(Fore.YELLOW, error, Style.RESET_ALL)
 
     def _command_search_movie(self):
         """
@@ -81,15 +106,64 @@ class MovieApp:
         query = input()
         self._util.search_movie(query)
 
+    def _show_pages(self, **filters):
+        """
+        Show the movies sorted by rating one page at a time.
+
+        Args:
+            **filters: The rating and year range and ordering, see
+            IStorage.query_movies.
+        """
+        offset = 0
+        while self._util.movies_sorted_by_rating(offset, LIST_PAGE_SIZE, **filters):
+            offset += LIST_PAGE_SIZE
+            print(Fore.MAGENTA, "Press Enter for more, q to stop:", Style.RESET_ALL, end="\t")
+            if input().strip().lower() == "q":
+                break
+
+    @staticmethod
+    def _input_number(prompt, convert):
+        """
+        Ask for an optional number.
+
+        Args:
+            prompt (str): The question.
+            convert (callable): int or float.
+
+        Returns:
+            The number, or None if left empty or invalid.
+        """
+        print(Fore.MAGENTA, prompt, Style.RESET_ALL, end="\t")
+        answer = input().strip()
+        try:
+            return convert(answer) if answer else None
+        except ValueError:
+            print(Fore.YELLOW, f"Ignoring invalid number {answer}", Style.RESET_ALL)
+            return None
+
     def _command_get_sorted_movie(self):
         """
         Get sorted movies by rating
         """
-        self._util.movies_sorted_by_rating()
+        self._show_pages()
+
+    def _command_filter_movies(self):
+        """
+        Get the movies in a rating and year range
+        """
+        filters = {
+            "min_rating": self._input_number("Lowest rating (empty for any):", float),
+            "max_rating": self._input_number("Highest rating (empty for any):", float),
+            "min_year": self._input_number("First year (empty for any):", int),
+            "max_year": self._input_number("Last year (empty for any):", int),
+        }
+        print(Fore.MAGENTA, "Order by rating or year? (r/y):", Style.RESET_ALL, end="\t")
+        filters["order_by"] = "year" if input().strip().lower().startswith("y") else "rating"
+        self._show_pages(**filters)
     
     def _command_get_histogram(self):
         """
-        Generate a Histogram from data
+        Draw the rating charts to files and show where they are
         """
         self._util.create_rating_histogram()
 
@@ -112,7 +186,8 @@ class MovieApp:
             7.  Random movies
             8.  Search movies
             9.  Movies sorted by rating
-            10. Histogram
+            10. Rating charts
+            11. Filter movies by rating and year
             ''', Style.RESET_ALL)
 
             print(Fore.MAGENTA, "\n\nEnter 0, 1, 2, 3, 4:", Style.RESET_ALL, end="\t")
@@ -139,6 +214,8 @@ class MovieApp:
                 self._command_get_sorted_movie()
             elif selection == "10":
                 self._command_get_histogram()
+            elif selection == "11":
+                self._command_filter_movies()
             elif selection == "0":
                 print("Goodbye!")
                 break
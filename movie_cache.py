@@ -0,0 +1,121 @@
+'''
+This module contains the in-memory cache used by the
+file based storage systems.
+'''
+
+import os
+import metrics
+
+
+def file_stamp(*file_paths):
+    """
+    Take a snapshot of the state of files.
+
+    Args:
+        *file_paths (str): The files to look at.
+
+    Returns:
+        tuple: One (inode, mtime, size) entry per file, None if missing.
+    """
+    stamp = []
+    for file_path in file_paths:
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            stamp.append(None)
+        else:
+            stamp.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+    return tuple(stamp)
+
+
+class MovieCache:
+    """
+    MovieCache keeps the movie data of a storage file resident in memory.
+
+    The cached data is tagged with the inode, modification time and size of
+    the backing files, so changes made outside the process are picked up on
+    the next access while repeated reads cost a single ``os.stat``.
+
+    Args:
+        *file_paths (str): The files the cached movie data is loaded from.
+
+    Attributes:
+        loads (int): The number of times the movie data was read from disk.
+        _file_paths (tuple): The files the cached movie data is loaded from.
+        _movies (dict): The resident movie data, or None if not loaded yet.
+        _stamp (tuple): The state of the backing files when _movies was loaded.
+    """
+
+    def __init__(self, *file_paths):
+        self.loads = 0
+        self._file_paths = file_paths
+        self._movies = None
+        self._stamp = None
+
+    def _current_stamp(self):
+        """
+        Take a snapshot of the state of the backing files.
+
+        Returns:
+            tuple: One (inode, mtime, size) entry per file, None if missing.
+        """
+        return file_stamp(*self._file_paths)
+
+    @property
+    def stamp(self):
+        """
+        The state of the backing files when the resident data was loaded or
+        stored, or None if nothing is resident.
+        """
+        return self._stamp
+
+    def get(self, loader):
+        """
+        Return the resident movie data, reloading it if the files changed.
+
+        Args:
+            loader (callable): Reads the movie data from disk.
+
+        Returns:
+            dict: The movie data.
+        """
+        stamp = self._current_stamp()
+        if self._movies is None or stamp != self._stamp:
+            with metrics.timer("storage.read"):
+                self._movies = loader()
+            self._stamp = stamp
+            self.loads += 1
+            metrics.count("storage.records_read", len(self._movies))
+            metrics.count("storage.bytes_read", sum(entry[2] for entry in stamp if entry))
+        else:
+            metrics.count("storage.cache_hits")
+        return self._movies
+
+    def peek(self):
+        """
+        Return the resident movie data without loading it.
+
+        Returns:
+            dict: The movie data, or None if it is not resident or the files
+            changed since it was loaded.
+        """
+        if self._movies is None or self._current_stamp() != self._stamp:
+            return None
+        return self._movies
+
+    def store(self, movies):
+        """
+        Record movie data that has just been written to disk.
+
+        Args:
+            movies (dict): The movie data that was saved.
+        """
+        self._movies = movies
+        self._stamp = self._current_stamp()
+
+    def invalidate(self):
+        """
+        Drop the resident movie data so the next access reloads it.
+        """
+        self._movies = None
+        self._stamp = None
@@ -0,0 +1,371 @@
+'''
+This module contains the random movie suggestions: uniform sampling
+without repeats until every movie was suggested, and weighted sampling.
+'''
+
+import datetime
+import random
+from rating_stats import movie_genres, movie_rating
+from sorted_index import movie_year
+
+# The number of years after which a movie counts half as much for 'recency'.
+RECENCY_HALF_LIFE = 10
+
+WEIGHTS = ('rating', 'recency', 'genre:<name>')
+
+
+def weight_function(weight):
+    """
+    Return the function giving the weight of a movie for a weighting.
+
+    Args:
+        weight (str): 'rating' favours better rated movies, 'recency' newer
+        movies, and 'genre:<name>' only draws movies of that genre.
+
+    Returns:
+        callable: Maps a movie to a weight of 0 or more.
+
+    Raises:
+        ValueError: If the weighting is not supported.
+    """
+    if weight == 'rating':
+        return lambda movie: max(movie_rating(movie) or 0.0, 0.0)
+    if weight == 'recency':
+        this_year = datetime.date.today().year
+
+        def recency(movie):
+            year = movie_year(movie)
+            if year is None:
+                return 0.0
+            return 0.5 ** (max(this_year - year, 0) / RECENCY_HALF_LIFE)
+        return recency
+    if weight.startswith('genre:') and weight[len('genre:'):].strip():
+        genre = weight[len('genre:'):].strip().casefold()
+        return lambda movie: float(genre in {name.casefold() for name in movie_genres(movie)})
+    raise ValueError(f"Unsupported weighting: {weight}, use one of {', '.join(WEIGHTS)}")
+
+
+class FenwickTree:
+    """
+    FenwickTree holds one weight per position and finds the position a
+    cumulative weight falls in, both in O(log N), so a weighted draw stays
+    cheap while weights change.
+
+    Args:
+        weights (list): The initial weights.
+
+    Attributes:
+        weights (list): The weight per position.
+        _tree (list): The partial sums, 1-indexed.
+    """
+
+    def __init__(self, weights):
+        self.weights = list(weights)
+        self._tree = [0.0] + self.weights
+        for index in range(1, len(self._tree)):
+            parent = index + (index & -index)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[index]
+
+    def append(self, weight):
+        """
+        Add a position at the end.
+
+        Args:
+            weight (float): Its weight.
+        """
+        index = len(self._tree)
+        self.weights.append(0.0)
+        # The new node covers the positions (index - lowbit, index].
+        covered = index - (index & -index)
+        self._tree.append(self.prefix(index - 1) - self.prefix(covered))
+        self.update(index - 1, weight)
+
+    def pop(self):
+        """
+        Remove the last position.
+
+        Returns:
+            float: Its weight.
+        """
+        self._tree.pop()
+        return self.weights.pop()
+
+    def update(self, position, weight):
+        """
+        Change the weight of a position.
+
+        Args:
+            position (int): The position, from 0.
+            weight (float): The new weight.
+        """
+        delta = weight - self.weights[position]
+        self.weights[position] = weight
+        index = position + 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def prefix(self, count):
+        """
+        Return the total weight of the first count positions.
+
+        Args:
+            count (int): The number of positions.
+
+        Returns:
+            float: The total weight.
+        """
+        total = 0.0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def find(self, target):
+        """
+        Find the position whose cumulative weight range holds target.
+
+        Args:
+            target (float): A value from 0 to the total weight.
+
+        Returns:
+            int: The position, from 0.
+        """
+        position = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            index = position + step
+            if index < len(self._tree) and self._tree[index] <= target:
+                position = index
+                target -= self._tree[index]
+            step >>= 1
+        return position
+
+
+class MovieSampler:
+    """
+    MovieSampler draws random movies in O(1) without repeating a movie
+    until every movie was drawn, or weighted in O(log N) per movie.
+
+    The titles are kept in an array split in two: the movies not drawn yet
+    in this round come first, the drawn ones after _unseen. A uniform draw
+    picks a position among the first _unseen and swaps it to the drawn
+    part, and once all are drawn a new round starts.
+
+    For each weighting used, a FenwickTree holds the weights in the same
+    order. Weighted draws pick from all movies, whatever the round, so a
+    movie is suggested in proportion to its weight over time. Only the
+    movies of a single sample are distinct.
+
+    It is a storage listener: movies are added at the end and removed by
+    swapping them with the last one, and after a reset it is rebuilt on
+    the next draw, keeping the movies already drawn in this round.
+
+    Args:
+        rng (random.Random): The random generator, None for a new one.
+
+    Attributes:
+        _titles (list): The titles, the ones not drawn yet first.
+        _positions (dict): The position of every title in _titles.
+        _movies (dict): The movie data keyed by title, a copy of the
+        stored movies since weights are computed for new weightings.
+        _unseen (int): The number of titles not drawn yet in this round.
+        _trees (dict): A FenwickTree per weighting used so far.
+        _weights (dict): The weight function per weighting used so far.
+        _pending (dict): The movies to rebuild from on the next draw, or None.
+        _rng (random.Random): The random generator.
+    """
+
+    def __init__(self, rng=None):
+        self._titles = []
+        self._positions = {}
+        self._movies = {}
+        self._unseen = 0
+        self._trees = {}
+        self._weights = {}
+        self._pending = None
+        self._rng = rng or random.Random()
+
+    def reset(self, movies):
+        """
+        Storage listener call: the stored movies were replaced.
+
+        Args:
+            movies (dict): The new movie data keyed by title.
+        """
+        self._pending = movies
+
+    def _rebuild_pending(self):
+        """
+        Rebuild the arrays if the stored movies were replaced, keeping the
+        titles drawn in this round in the drawn part.
+        """
+        if self._pending is None:
+            return
+        movies, self._pending = self._pending, None
+        drawn = set(self._titles[self._unseen:])
+        unseen = [title for title in movies if title not in drawn]
+        self._titles = unseen + [title for title in movies if title in drawn]
+        self._positions = {title: position for position, title in enumerate(self._titles)}
+        self._movies = dict(movies)
+        self._unseen = len(unseen)
+        self._trees = {weight: FenwickTree(map(function, map(movies.get, self._titles)))
+                       for weight, function in self._weights.items()}
+
+    def _swap(self, first, second):
+        """
+        Swap two positions of the arrays.
+        """
+        if first == second:
+            return
+        titles = self._titles
+        titles[first], titles[second] = titles[second], titles[first]
+        self._positions[titles[first]] = first
+        self._positions[titles[second]] = second
+        for tree in self._trees.values():
+            first_weight, second_weight = tree.weights[first], tree.weights[second]
+            tree.update(first, second_weight)
+            tree.update(second, first_weight)
+
+    def add(self, title, movie):
+        """
+        Storage listener call: make a movie available to draw.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data.
+        """
+        if self._pending is not None:
+            return
+        if title in self._positions:
+            self.remove(title, movie)
+        self._titles.append(title)
+        self._positions[title] = len(self._titles) - 1
+        self._movies[title] = movie
+        for weight, tree in self._trees.items():
+            tree.append(self._weights[weight](movie))
+        # A new movie has not been drawn in this round yet.
+        self._swap(len(self._titles) - 1, self._unseen)
+        self._unseen += 1
+
+    def remove(self, title, movie):  # pylint: disable=unused-argument
+        """
+        Storage listener call: stop drawing a movie.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data.
+        """
+        if self._pending is not None or title not in self._positions:
+            return
+        position = self._positions[title]
+        if position < self._unseen:
+            self._swap(position, self._unseen - 1)
+            position = self._unseen - 1
+            self._unseen -= 1
+        self._swap(position, len(self._titles) - 1)
+        self._titles.pop()
+        del self._positions[title]
+        self._movies.pop(title, None)
+        for tree in self._trees.values():
+            tree.pop()
+
+    def _tree(self, weight):
+        """
+        Return the FenwickTree of a weighting, building it on first use.
+        """
+        if weight not in self._trees:
+            function = weight_function(weight)
+            self._trees[weight] = FenwickTree(
+                function(self._movies[title]) for title in self._titles)
+            self._weights[weight] = function
+        return self._trees[weight]
+
+    def _draw(self):
+        """
+        Draw one movie not drawn yet in this round.
+
+        Returns:
+            str: The title, or None if every movie was drawn in this round.
+        """
+        if not self._unseen:
+            return None
+        position = self._rng.randrange(self._unseen)
+        title = self._titles[position]
+        self._swap(position, self._unseen - 1)
+        self._unseen -= 1
+        return title
+
+    def _draw_weighted(self, count, weight):
+        """
+        Draw distinct movies in proportion to their weight, from all movies.
+        The weights of the movies drawn are set to 0 until the end of the
+        sample, so none is drawn twice.
+
+        Returns:
+            list: Up to count titles, fewer when fewer movies have a weight above 0.
+        """
+        tree = self._tree(weight)
+        titles = []
+        drawn = []
+        try:
+            while len(titles) < count:
+                total = tree.prefix(len(self._titles))
+                if total <= 0:
+                    break
+                position = min(tree.find(self._rng.random() * total), len(self._titles) - 1)
+                if tree.weights[position] <= 0:
+                    # Rounding errors of the partial sums led to a movie without
+                    # weight; recompute them and draw again.
+                    tree = self._trees[weight] = FenwickTree(tree.weights)
+                    total = tree.prefix(len(self._titles))
+                    if total <= 0:
+                        break
+                    position = min(tree.find(self._rng.random() * total),
+                                   len(self._titles) - 1)
+                    if tree.weights[position] <= 0:
+                        break
+                drawn.append((position, tree.weights[position]))
+                tree.update(position, 0.0)
+                titles.append(self._titles[position])
+        finally:
+            for position, movie_weight in drawn:
+                tree.update(position, movie_weight)
+        return titles
+
+    def sample(self, count=1, weight=None):
+        """
+        Draw distinct movies. Uniform draws skip the movies drawn before in
+        this round; when all movies were drawn, a new round starts with
+        every movie but the ones just drawn. Weighted draws pick from all
+        movies, see _draw_weighted.
+
+        Args:
+            count (int): The number of movies to draw.
+            weight (str): None for uniform draws, or a weighting, see
+            weight_function.
+
+        Returns:
+            list: Up to count distinct titles. Fewer when the catalogue is
+            smaller, or when fewer movies have a weight above 0.
+        """
+        self._rebuild_pending()
+        if weight is not None:
+            return self._draw_weighted(count, weight)
+        titles = []
+        new_round = False
+        while len(titles) < count:
+            title = self._draw()
+            if title is not None:
+                titles.append(title)
+                continue
+            if new_round:
+                break
+            # Start a new round, keeping the movies just drawn out of it.
+            new_round = True
+            self._unseen = len(self._titles)
+            for drawn in titles:
+                self._swap(self._positions[drawn], self._unseen - 1)
+                self._unseen -= 1
+        return titles
@@ -0,0 +1,397 @@
+'''
+This module contains the poster store of the website. Posters are
+downloaded once into a local, content-addressed directory and shrunk to
+thumbnails, so the generated pages do not hot-link full size images.
+'''
+
+import hashlib
+import io
+import json
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from journal import atomic_write
+import metrics
+
+POSTER_DIR = '_static/posters'
+MANIFEST_NAME = 'posters.json'
+
+# The largest thumbnail width and height; cards show posters 300 pixels high.
+THUMBNAIL_SIZE = (300, 450)
+
+# The seconds a downloaded poster is used before the server is asked whether it changed.
+MAX_AGE = 24 * 3600
+
+# The JPEG start of frame markers, which carry the image size.
+_JPEG_FRAMES = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def is_poster_url(url):
+    """
+    Check whether a poster URL can be downloaded.
+
+    Args:
+        url (str): The poster_url of a movie, "N/A" when OMDB has no poster.
+
+    Returns:
+        bool: Whether url is an HTTP(S) URL.
+    """
+    return isinstance(url, str) and url.startswith(('http://', 'https://'))
+
+
+def image_type(data):
+    """
+    Recognize a PNG, GIF or JPEG image by its first bytes.
+
+    Args:
+        data (bytes): The image file.
+
+    Returns:
+        str: The file extension of the image, or None if it is not one of these.
+    """
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return '.png'
+    if data.startswith((b'GIF87a', b'GIF89a')):
+        return '.gif'
+    if data.startswith(b'\xff\xd8'):
+        return '.jpg'
+    return None
+
+
+def image_size(data):
+    """
+    Read the width and height of a PNG, GIF or JPEG image from its header,
+    without decoding it.
+
+    Args:
+        data (bytes): The image file, or at least its header.
+
+    Returns:
+        tuple: The width and height in pixels, or None if they cannot be read.
+    """
+    kind = image_type(data)
+    if kind == '.png' and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+    if kind == '.gif' and len(data) >= 10:
+        return struct.unpack('<HH', data[6:10])
+    if kind != '.jpg':
+        return None
+    position = 2
+    while position + 9 <= len(data):
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker.
+            position += 1
+        elif marker in _JPEG_FRAMES:
+            height, width = struct.unpack('>HH', data[position + 5:position + 9])
+            return width, height
+        elif 0xD0 <= marker <= 0xD9 or marker == 0x01:
+            # Markers without a length.
+            position += 2
+        else:
+            position += 2 + struct.unpack('>H', data[position + 2:position + 4])[0]
+    return None
+
+
+def make_thumbnail(data, size=THUMBNAIL_SIZE):
+    """
+    Shrink an image to fit in size, keeping its aspect ratio.
+
+    Pillow is optional: without it no thumbnail is made and the cards show
+    the downloaded posters.
+
+    Args:
+        data (bytes): The image file.
+        size (tuple): The largest width and height.
+
+    Returns:
+        tuple: The JPEG thumbnail and its width and height, or None if
+        Pillow is not installed or cannot read the image.
+    """
+    try:
+        from PIL import Image  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.draft('RGB', size)
+            image.thumbnail(size)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            output = io.BytesIO()
+            image.save(output, 'JPEG', quality=80, optimize=True, progressive=True)
+            return output.getvalue(), image.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+class PosterStore:
+    """
+    PosterStore downloads the posters of the website into a directory next
+    to its pages and gives every card a local thumbnail to show.
+
+    Files are named after the SHA-256 of their content, so a poster shared
+    by several movies, or downloaded again unchanged, is stored once and
+    its thumbnail is made once. posters.json maps every poster URL to its
+    files, the thumbnail size and the ETag and Last-Modified headers it was
+    served with. A poster is checked again once it is max_age seconds old,
+    with a conditional request the server answers with 304 Not Modified if
+    the poster did not change.
+
+    Args:
+        directory (str): The directory of the posters, inside the website directory.
+        max_workers (int): The maximum number of downloads in flight.
+        timeout (float): The seconds to wait for a server.
+        max_age (float): The seconds a poster is used before it is checked again.
+        thumbnail_size (tuple): The largest thumbnail width and height.
+
+    Attributes:
+        directory (str): The directory of the posters.
+        _max_workers (int): The maximum number of downloads in flight.
+        _timeout (float): The seconds to wait for a server.
+        _max_age (float): The seconds a poster is used before it is checked again.
+        _thumbnail_size (tuple): The largest thumbnail width and height.
+        _manifest (dict): The stored posters keyed by URL, None until read.
+        _session (requests.Session): The pooled HTTP session, None until needed.
+        _session_lock (threading.Lock): Guards the creation of the session.
+    """
+
+    def __init__(self, directory=POSTER_DIR, max_workers=8, timeout=10.0, max_age=MAX_AGE,
+                 thumbnail_size=THUMBNAIL_SIZE):
+        self.directory = directory
+        self._max_workers = max_workers
+        self._timeout = timeout
+        self._max_age = max_age
+        self._thumbnail_size = tuple(thumbnail_size)
+        self._manifest = None
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def _manifest_path(self):
+        """
+        Return the path of posters.json.
+        """
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def _load_manifest(self):
+        """
+        Return the stored posters, reading posters.json on first use.
+        """
+        if self._manifest is None:
+            try:
+                with open(self._manifest_path(), 'r', encoding='utf-8') as file:
+                    self._manifest = json.load(file)
+            except (FileNotFoundError, ValueError):
+                self._manifest = {}
+        return self._manifest
+
+    def _save_manifest(self):
+        """
+        Write posters.json atomically.
+        """
+        with atomic_write(self._manifest_path()) as temp_path:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(self._manifest, file, indent=1, sort_keys=True)
+
+    def _get_session(self):
+        """
+        Return the pooled session, creating it on first use.
+
+        Returns:
+            requests.Session: The session.
+        """
+        with self._session_lock:
+            if self._session is None:
+                import requests  # pylint: disable=import-outside-toplevel
+                from requests.adapters import HTTPAdapter  # pylint: disable=import-outside-toplevel
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self._max_workers)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def close(self):
+        """
+        Close the pooled connections.
+        """
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _has_files(self, entry):
+        """
+        Check whether the files of a manifest entry are on disk.
+        """
+        return all(os.path.exists(os.path.join(self.directory, entry[name]))
+                   for name in ('file', 'thumbnail'))
+
+    def _is_due(self, entry, now):
+        """
+        Check whether a poster has to be downloaded or checked again.
+        """
+        return (entry is None or now - entry.get('checked', 0) >= self._max_age
+                or list(entry.get('thumbnail_size', ())) != list(self._thumbnail_size)
+                or not self._has_files(entry))
+
+    def _write(self, name, data):
+        """
+        Write a file of the store, unless a file with that content-addressed
+        name is there already.
+        """
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            with atomic_write(path) as temp_path:
+                with open(temp_path, 'wb') as file:
+                    file.write(data)
+
+    def _store(self, data, extension):
+        """
+        Store a downloaded poster and its thumbnail.
+
+        Args:
+            data (bytes): The poster.
+            extension (str): The file extension of the poster.
+
+        Returns:
+            dict: The file, thumbnail, width, height and sha256 of the manifest entry.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        name = digest[:32]
+        self._write(f"{name}{extension}", data)
+        width, height = self._thumbnail_size
+        thumbnail = f"{name}-{width}x{height}.jpg"
+        thumbnail_path = os.path.join(self.directory, thumbnail)
+        if os.path.exists(thumbnail_path):
+            with open(thumbnail_path, 'rb') as file:
+                size = image_size(file.read(65536))
+        else:
+            made = make_thumbnail(data, self._thumbnail_size)
+            if made is None or len(made[0]) >= len(data):
+                # No smaller thumbnail could be made, the poster itself is shown.
+                thumbnail, size = f"{name}{extension}", image_size(data)
+            else:
+                self._write(thumbnail, made[0])
+                size = made[1]
+        return {"sha256": digest, "file": f"{name}{extension}", "thumbnail": thumbnail,
+                "width": size[0] if size else None, "height": size[1] if size else None}
+
+    def _fetch(self, url, entry):
+        """
+        Download a poster, or check that the stored copy is still current.
+        Runs in a worker thread.
+
+        Args:
+            url (str): The poster URL.
+            entry (dict): The manifest entry of the poster, or None.
+
+        Returns:
+            tuple: The URL, the new manifest entry or None, and 'downloaded',
+            'unchanged' or the reason the download failed.
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+        headers = {}
+        if entry is not None and self._has_files(entry):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        metrics.count("posters.requests")
+        try:
+            with metrics.timer("posters.request"):
+                response = self._get_session().get(url, headers=headers, timeout=self._timeout)
+        except requests.RequestException as error:
+            return url, None, type(error).__name__
+        metrics.count("posters.bytes_read", len(response.content))
+        validators = {'etag': response.headers.get('ETag'),
+                      'last_modified': response.headers.get('Last-Modified'),
+                      'checked': time.time(), 'thumbnail_size': list(self._thumbnail_size)}
+        if response.status_code == 304 and headers:
+            return url, {**entry, **{key: value for key, value in validators.items()
+                                     if value is not None}}, 'unchanged'
+        if response.status_code != 200:
+            return url, None, f"HTTP {response.status_code}"
+        data = response.content
+        extension = image_type(data)
+        if extension is None:
+            return url, None, "Not an image"
+        if (entry is not None and entry.get('sha256') == hashlib.sha256(data).hexdigest()
+                and headers):
+            return url, {**entry, **validators}, 'unchanged'
+        return url, {**self._store(data, extension), **validators}, 'downloaded'
+
+    def sync(self, urls, prune=True):
+        """
+        Download the posters not stored yet, concurrently, and check the
+        stored posters older than max_age.
+
+        A poster that cannot be downloaded is reported in the failures and
+        does not stop the others; a copy stored before is kept.
+
+        Args:
+            urls: The poster URLs; "N/A", None and repeated URLs are skipped.
+            prune (bool): Forget the posters not in urls and remove their files.
+
+        Returns:
+            dict: The number of posters 'downloaded', 'unchanged' after a
+            check, and 'cached' without a request, and the 'failed' reasons
+            keyed by URL.
+        """
+        urls = sorted({url for url in urls if is_poster_url(url)})
+        manifest = self._load_manifest()
+        now = time.time()
+        due = [url for url in urls if self._is_due(manifest.get(url), now)]
+        report = {'downloaded': 0, 'unchanged': 0, 'cached': len(urls) - len(due), 'failed': {}}
+        changed = False
+        if due:
+            os.makedirs(self.directory, exist_ok=True)
+            with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                for url, entry, outcome in executor.map(self._fetch, due,
+                                                        [manifest.get(url) for url in due]):
+                    if entry is None:
+                        report['failed'][url] = outcome
+                    else:
+                        manifest[url] = entry
+                        report[outcome] += 1
+                        changed = True
+        if prune:
+            changed = self._prune(set(urls)) or changed
+        if changed:
+            self._save_manifest()
+        return report
+
+    def _prune(self, urls):
+        """
+        Forget the posters not in urls and remove the files no poster uses.
+
+        Returns:
+            bool: Whether the manifest changed.
+        """
+        manifest = self._load_manifest()
+        stale = [url for url in manifest if url not in urls]
+        for url in stale:
+            del manifest[url]
+        if not os.path.isdir(self.directory):
+            return bool(stale)
+        used = {entry[name] for entry in manifest.values() for name in ('file', 'thumbnail')}
+        used.add(MANIFEST_NAME)
+        for file_name in os.listdir(self.directory):
+            if file_name not in used and not file_name.startswith('.'):
+                os.remove(os.path.join(self.directory, file_name))
+        return bool(stale)
+
+    def images(self):
+        """
+        The local images of the stored posters, as cards show them.
+
+        Returns:
+            dict: The thumbnail path relative to the website directory, its
+            width and its height, keyed by poster URL.
+        """
+        folder = os.path.basename(os.path.normpath(self.directory))
+        return {url: (f"{folder}/{entry['thumbnail']}", entry.get('width'), entry.get('height'))
+                for url, entry in self._load_manifest().items()}
@@ -0,0 +1,412 @@
+'''
+This module contains the rating statistics of the movie
+database, maintained as movies are added and removed.
+'''
+
+import math
+from collections import Counter
+
+# The percentiles reported besides the median.
+PERCENTILES = (10, 25, 75, 90)
+
+# The number of one point wide rating bins of a distribution, [0, 1) to [9, 10].
+RATING_BINS = 10
+
+
+def movie_rating(movie):
+    """
+    Return the rating of a movie as a number.
+
+    Args:
+        movie (dict): The movie data.
+
+    Returns:
+        float: The rating, or None if the movie has no usable rating.
+    """
+    try:
+        rating = float(movie.get('rating'))
+    except (TypeError, ValueError):
+        return None
+    return rating if math.isfinite(rating) else None
+
+
+def movie_genres(movie):
+    """
+    Split the comma separated genre of a movie.
+
+    Args:
+        movie (dict): The movie data.
+
+    Returns:
+        set: The genres of the movie.
+    """
+    genre = movie.get('genre')
+    if not isinstance(genre, str):
+        return set()
+    return {name.strip() for name in genre.split(',') if name.strip()}
+
+
+def movie_decade(movie):
+    """
+    Return the decade a movie was released in, e.g. 1990.
+
+    Args:
+        movie (dict): The movie data.
+
+    Returns:
+        int: The decade, or None if the movie has no usable year.
+    """
+    try:
+        return int(movie.get('year')) // 10 * 10
+    except (TypeError, ValueError):
+        return None
+
+
+class RatingHistogram:
+    """
+    RatingHistogram counts how many movies have each rating.
+
+    Ratings come in steps of 0.1, so there are at most a hundred distinct
+    values whatever the size of the catalogue. The mean, exact quantiles,
+    minimum and maximum are read off the counts without sorting the movies,
+    and a movie is added or removed in constant time.
+
+    Attributes:
+        count (int): The number of ratings counted.
+        _counts (dict): The number of movies per rating.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._counts = {}
+
+    def add(self, rating, count=1):
+        """
+        Count a rating.
+
+        Args:
+            rating (float): The rating.
+            count (int): The number of movies with this rating.
+        """
+        self._counts[rating] = self._counts.get(rating, 0) + count
+        self.count += count
+
+    def remove(self, rating, count=1):
+        """
+        Uncount a rating.
+
+        Args:
+            rating (float): The rating.
+            count (int): The number of movies with this rating.
+        """
+        remaining = self._counts[rating] - count
+        if remaining:
+            self._counts[rating] = remaining
+        else:
+            del self._counts[rating]
+        self.count -= count
+
+    def mean(self):
+        """
+        Returns:
+            float: The average rating, or None if nothing was counted.
+        """
+        if not self.count:
+            return None
+        return math.fsum(rating * count for rating, count in self._counts.items()) / self.count
+
+    def quantile(self, fraction):
+        """
+        Return the rating below which fraction of the ratings fall,
+        interpolating between the two nearest ratings like the median does.
+
+        Args:
+            fraction (float): Between 0 and 1, 0.5 being the median.
+
+        Returns:
+            float: The quantile, or None if nothing was counted.
+        """
+        if not self.count:
+            return None
+        position = fraction * (self.count - 1)
+        lower_rank, upper_rank = math.floor(position), math.ceil(position)
+        lower = upper = None
+        seen = 0
+        for rating in sorted(self._counts):
+            seen += self._counts[rating]
+            if lower is None and seen > lower_rank:
+                lower = rating
+            if seen > upper_rank:
+                upper = rating
+                break
+        if lower == upper:
+            return lower
+        return lower + (upper - lower) * (position - lower_rank)
+
+    def minimum(self):
+        """
+        Returns:
+            float: The lowest rating, or None if nothing was counted.
+        """
+        return min(self._counts) if self._counts else None
+
+    def maximum(self):
+        """
+        Returns:
+            float: The highest rating, or None if nothing was counted.
+        """
+        return max(self._counts) if self._counts else None
+
+    def distribution(self):
+        """
+        Bin the ratings, going over the distinct ratings only.
+
+        Returns:
+            list: The number of ratings in each of the RATING_BINS one point
+            wide bins, the last one including 10.
+        """
+        bins = [0] * RATING_BINS
+        for rating, count in self._counts.items():
+            bins[min(max(int(rating), 0), RATING_BINS - 1)] += count
+        return bins
+
+    def summary(self):
+        """
+        Returns:
+            dict: The count, average and median rating and the distribution.
+        """
+        return {"count": self.count, "average": self.mean(), "median": self.quantile(0.5),
+                "distribution": self.distribution()}
+
+
+def summarize(histogram, best, worst, genres, decades):
+    """
+    Assemble the rating statistics returned by IStorage.rating_stats.
+
+    Args:
+        histogram (RatingHistogram): The ratings of all movies.
+        best (list): The titles of the best rated movies.
+        worst (list): The titles of the worst rated movies.
+        genres (dict): A RatingHistogram per genre.
+        decades (dict): A RatingHistogram per decade.
+
+    Returns:
+        dict: The count, average, median, percentiles, minimum and maximum
+        rating, the distribution, the best and worst rated titles, and the
+        count, average, median and distribution per genre and per decade.
+        Averages and medians are None when there are no rated movies.
+    """
+    return {
+        "count": histogram.count,
+        "average": histogram.mean(),
+        "median": histogram.quantile(0.5),
+        "percentiles": {percentile: histogram.quantile(percentile / 100)
+                        for percentile in PERCENTILES},
+        "min": histogram.minimum(),
+        "max": histogram.maximum(),
+        "distribution": histogram.distribution(),
+        "best": best,
+        "worst": worst,
+        "genres": {genre: genres[genre].summary() for genre in sorted(genres)},
+        "decades": {decade: decades[decade].summary() for decade in sorted(decades)},
+    }
+
+
+class RatingStats:
+    """
+    RatingStats keeps the rating statistics of the stored movies up to date.
+
+    It is a storage listener: every movie added or removed updates the
+    histograms of the catalogue, of its genres and of its decade, so the
+    statistics are available without going over the movies again. The
+    best and worst rated titles are tracked too, and only looked up again
+    when the last movie with the highest or lowest rating is removed.
+    After a reset everything is recounted on the next call to summary.
+
+    Attributes:
+        _movies (dict): The movie data the statistics are about.
+        _histogram (RatingHistogram): The ratings of all movies.
+        _genres (dict): A RatingHistogram per genre.
+        _decades (dict): A RatingHistogram per decade.
+        _best (set): The titles with the highest rating, or None if unknown.
+        _worst (set): The titles with the lowest rating, or None if unknown.
+        _stale (bool): Whether everything must be recounted from _movies.
+    """
+
+    def __init__(self, movies):
+        self._movies = movies
+        self._histogram = RatingHistogram()
+        self._genres = {}
+        self._decades = {}
+        self._best = None
+        self._worst = None
+        self._stale = True
+
+    def reset(self, movies):
+        """
+        Storage listener call: the stored movies were replaced.
+
+        Args:
+            movies (dict): The new movie data keyed by title.
+        """
+        self._movies = movies
+        self._stale = True
+
+    def _groups(self, movie):
+        """
+        Return the genre and decade histogram maps and keys of a movie.
+        """
+        decade = movie_decade(movie)
+        groups = [(self._genres, genre) for genre in movie_genres(movie)]
+        if decade is not None:
+            groups.append((self._decades, decade))
+        return groups
+
+    def add(self, title, movie):
+        """
+        Storage listener call: count a movie.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data.
+        """
+        rating = movie_rating(movie)
+        if self._stale or rating is None:
+            return
+        maximum, minimum = self._histogram.maximum(), self._histogram.minimum()
+        self._histogram.add(rating)
+        for histograms, key in self._groups(movie):
+            histograms.setdefault(key, RatingHistogram()).add(rating)
+        if self._best is not None:
+            if maximum is None or rating > maximum:
+                self._best = {title}
+            elif rating == maximum:
+                self._best.add(title)
+        if self._worst is not None:
+            if minimum is None or rating < minimum:
+                self._worst = {title}
+            elif rating == minimum:
+                self._worst.add(title)
+
+    def remove(self, title, movie):
+        """
+        Storage listener call: uncount a movie.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data, as it was counted.
+        """
+        rating = movie_rating(movie)
+        if self._stale or rating is None:
+            return
+        self._histogram.remove(rating)
+        for histograms, key in self._groups(movie):
+            histogram = histograms[key]
+            histogram.remove(rating)
+            if not histogram.count:
+                del histograms[key]
+        for extreme in (self._best, self._worst):
+            if extreme is not None:
+                extreme.discard(title)
+        if not self._best:
+            self._best = None
+        if not self._worst:
+            self._worst = None
+
+    def _recount(self):
+        """
+        Count the movies from scratch.
+
+        The movies are counted per raw genre, year and rating value, since
+        there are far fewer distinct values than movies to split and convert.
+        """
+        movies = self._movies.values()
+        genre_counts = Counter((movie.get('genre'), movie.get('rating')) for movie in movies)
+        year_counts = Counter((movie.get('year'), movie.get('rating')) for movie in movies)
+        ratings = {raw_rating: movie_rating({'rating': raw_rating})
+                   for _, raw_rating in genre_counts}
+        self._histogram = RatingHistogram()
+        self._genres, self._decades = {}, {}
+        genres = {}
+        for (genre, raw_rating), count in genre_counts.items():
+            rating = ratings[raw_rating]
+            if rating is None:
+                continue
+            self._histogram.add(rating, count)
+            if genre not in genres:
+                genres[genre] = [self._genres.setdefault(name, RatingHistogram())
+                                 for name in movie_genres({'genre': genre})]
+            for histogram in genres[genre]:
+                histogram.add(rating, count)
+        for (year, raw_rating), count in year_counts.items():
+            rating = ratings[raw_rating]
+            decade = movie_decade({'year': year})
+            if rating is not None and decade is not None:
+                self._decades.setdefault(decade, RatingHistogram()).add(rating, count)
+        self._best = self._worst = None
+        self._stale = False
+
+    def _find_extremes(self):
+        """
+        Find the titles with the highest and the lowest rating in one scan.
+        """
+        maximum, minimum = self._histogram.maximum(), self._histogram.minimum()
+        self._best, self._worst = set(), set()
+        for title, movie in self._movies.items():
+            rating = movie.get('rating')
+            if isinstance(rating, str):
+                rating = movie_rating(movie)
+            if rating == maximum:
+                self._best.add(title)
+            if rating == minimum:
+                self._worst.add(title)
+
+    def summary(self):
+        """
+        Return the statistics, see summarize.
+
+        Returns:
+            dict: The rating statistics.
+        """
+        if self._stale:
+            self._recount()
+        if self._best is None or self._worst is None:
+            self._find_extremes()
+        return summarize(self._histogram, sorted(self._best), sorted(self._worst),
+                         self._genres, self._decades)
+
+
+def stream_stats(movies):
+    """
+    Calculate the rating statistics in a single pass over movies, keeping
+    only the histograms and the best and worst rated titles in memory.
+
+    Args:
+        movies (iterable): (title, movie) pairs, e.g. IStorage.iter_movies.
+
+    Returns:
+        dict: The rating statistics, see summarize.
+    """
+    histogram = RatingHistogram()
+    genres, decades = {}, {}
+    best, worst = [], []
+    maximum = minimum = None
+    for title, movie in movies:
+        rating = movie_rating(movie)
+        if rating is None:
+            continue
+        histogram.add(rating)
+        for genre in movie_genres(movie):
+            genres.setdefault(genre, RatingHistogram()).add(rating)
+        decade = movie_decade(movie)
+        if decade is not None:
+            decades.setdefault(decade, RatingHistogram()).add(rating)
+        if maximum is None or rating > maximum:
+            maximum, best = rating, [title]
+        elif rating == maximum:
+            best.append(title)
+        if minimum is None or rating < minimum:
+            minimum, worst = rating, [title]
+        elif rating == minimum:
+            worst.append(title)
+    return summarize(histogram, sorted(best), sorted(worst), genres, decades)
@@ -0,0 +1,127 @@
+'''
+This module is used to refresh the stored movies from OMDB.
+'''
+
+import json
+import os
+from bulk_import import fetch_movies
+from title_index import MISSING_VALUES, movie_imdb_id
+
+# The fields a refresh updates. The title a movie is stored under is kept.
+REFRESH_FIELDS = ('year', 'rating', 'genre', 'poster_url', 'director', 'actors', 'plot')
+
+
+def read_checkpoint(checkpoint_path):
+    """
+    Read the titles a previous, interrupted refresh already went through.
+
+    Args:
+        checkpoint_path (str): The checkpoint file, one JSON encoded title per line.
+
+    Returns:
+        set: The titles, empty if there is no checkpoint.
+    """
+    done = set()
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    done.add(json.loads(line))
+                except ValueError:
+                    # A line cut short by the interruption; its batch is redone.
+                    continue
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def changed_fields(movie, fresh):
+    """
+    Compare a stored movie with its refreshed data.
+
+    Args:
+        movie (dict): The stored movie data.
+        fresh (dict): The movie data just fetched and extracted.
+
+    Returns:
+        dict: The REFRESH_FIELDS whose fetched value is known and differs
+        from the stored one, mapped to the fetched value.
+    """
+    changes = {}
+    for field in REFRESH_FIELDS:
+        value = fresh.get(field)
+        if value not in MISSING_VALUES and movie.get(field) != value:
+            changes[field] = value
+    return changes
+
+
+def refresh_movies(storage, api_requester, batch_size=100, max_workers=8, rate_limit=None,
+                   checkpoint_path=None):
+    """
+    Fetch every stored movie again by its imdbID and save what changed.
+
+    The catalogue is refreshed batch_size movies at a time: the movies of a
+    batch are fetched concurrently, and the ones with changed fields are
+    saved in a single merge. Only the REFRESH_FIELDS that changed are set,
+    on the current version of every movie, so notes and other fields are
+    kept, even when they are edited while the refresh runs. Movies deleted
+    while it runs are skipped. After each batch the titles it refreshed
+    are appended to the checkpoint file, so an interrupted refresh resumes
+    after the last saved batch. The checkpoint file is removed once the
+    refresh completes.
+
+    Args:
+        storage (IStorage): The storage to refresh.
+        api_requester (IApiRequester): The requester used to fetch movie data.
+        It should not answer from a cache, or the ratings stay as stale.
+        batch_size (int): The number of movies fetched and saved together.
+        max_workers (int): The maximum number of API requests in flight.
+        rate_limit (float): The maximum number of API requests per second, or None.
+        checkpoint_path (str): The checkpoint file, or None to not checkpoint.
+
+    Returns:
+        dict: The "updated" titles, the "unchanged" count, the "skipped"
+        titles without an imdbID, and the "failed" titles mapped to the
+        reason they failed.
+    """
+    done = read_checkpoint(checkpoint_path) if checkpoint_path else set()
+    movies = storage.load_movies()
+    skipped = [title for title, movie in movies.items() if movie_imdb_id(movie) is None]
+    pending = [title for title, movie in movies.items()
+               if title not in done and movie_imdb_id(movie) is not None]
+    report = {"updated": [], "unchanged": 0, "skipped": skipped, "failed": {}}
+
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        titles_by_id = {}
+        for title in batch:
+            movie = movies.get(title)
+            if movie is not None:
+                titles_by_id.setdefault(movie_imdb_id(movie), []).append(title)
+        fetched, failures = fetch_movies(api_requester, list(titles_by_id), max_workers,
+                                         rate_limit, by_id=True)
+        for imdb_id, reason in failures.items():
+            for title in titles_by_id[imdb_id]:
+                report["failed"][title] = reason
+
+        updates = {}
+        for imdb_id, fresh in fetched.items():
+            for title in titles_by_id[imdb_id]:
+                changes = changed_fields(movies[title], fresh)
+                if changes:
+                    updates[title] = changes
+                else:
+                    report["unchanged"] += 1
+        if updates:
+            report["updated"].extend(storage.merge_movies(updates))
+            # The merge may have replaced the resident movie data.
+            movies = storage.load_movies()
+        if checkpoint_path:
+            # Failed titles are left out, so a resumed refresh tries them again.
+            with open(checkpoint_path, 'a', encoding='utf-8') as file:
+                file.writelines(f"{json.dumps(title)}\n" for title in batch
+                                if title not in report["failed"])
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return report
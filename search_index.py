@@ -0,0 +1,381 @@
+'''
+This module contains the full text search index behind
+movie searches.
+'''
+
+import heapq
+import math
+import pickle
+import re
+import unicodedata
+from journal import atomic_write
+
+# How much a match in each field counts towards the score of a movie.
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "director": 1.5,
+    "actors": 1.5,
+    "genre": 1.0,
+    "plot": 0.5,
+}
+
+# How much a query word counts when it matches a word of a movie exactly,
+# as a part of a longer word, or only approximately.
+EXACT_MATCH = 1.0
+PARTIAL_MATCH = 0.7
+FUZZY_MATCH = 0.5
+
+# The trigram similarity a word needs to count as a misspelling of a query word.
+MIN_SIMILARITY = 0.45
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# The number of words scan_movies remembers the match quality of.
+SCAN_MEMO_SIZE = 100_000
+
+
+def normalize(text):
+    """
+    Fold text to lower case and strip accents.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The normalized text.
+    """
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """
+    Split text into normalized words.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        list: The words.
+    """
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(normalize(text))
+
+
+def trigrams(word):
+    """
+    Return the trigrams of a word, padded so short words have some too.
+
+    Args:
+        word (str): A normalized word.
+
+    Returns:
+        set: The trigrams.
+    """
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def match_quality(query_word, query_trigrams, word):
+    """
+    Rate how well a word matches a query word.
+
+    Args:
+        query_word (str): A normalized query word.
+        query_trigrams (set): The trigrams of query_word.
+        word (str): A normalized word of a movie.
+
+    Returns:
+        float: EXACT_MATCH, PARTIAL_MATCH if word contains the query word,
+        FUZZY_MATCH scaled by the similarity for a likely misspelling, or 0.
+    """
+    if word == query_word:
+        return EXACT_MATCH
+    if query_word in word:
+        return PARTIAL_MATCH
+    word_trigrams = trigrams(word)
+    shared = len(query_trigrams & word_trigrams)
+    similarity = shared / (len(query_trigrams) + len(word_trigrams) - shared)
+    return FUZZY_MATCH * similarity if similarity >= MIN_SIMILARITY else 0.0
+
+
+def movie_words(title, movie):
+    """
+    Return the words of a movie mapped to their total field weight.
+
+    Args:
+        title (str): The title the movie is stored under.
+        movie (dict): The movie data.
+
+    Returns:
+        dict: The weight of every word.
+    """
+    weights = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        text = title if field == "title" else movie.get(field)
+        for word in tokenize(text):
+            weights[word] = weights.get(word, 0.0) + weight
+    return weights
+
+
+def scan_movies(movies, query, limit=None):
+    """
+    Find the movies best matching a query in a single pass over movies,
+    without building an index, so only the best limit movies are kept in
+    memory. Used for catalogues larger than memory.
+
+    Movies are scored like SearchIndex.search scores them, except that
+    without an index the frequency of a word is unknown, so every word
+    counts the same.
+
+    Args:
+        movies (iterable): (title, movie) pairs, e.g. IStorage.iter_movies.
+        query (str): The words to search for.
+        limit (int): The maximum number of results, or None for all.
+
+    Returns:
+        list: The matching (title, movie) pairs, best match first.
+    """
+    query_words = [(word, trigrams(word)) for word in dict.fromkeys(tokenize(query))]
+    qualities = {}
+    best = []
+    for position, (title, movie) in enumerate(movies):
+        if not query_words:
+            break
+        scores = [0.0] * len(query_words)
+        for word, weight in movie_words(title, movie).items():
+            matches = qualities.get(word)
+            if matches is None:
+                if len(qualities) >= SCAN_MEMO_SIZE:
+                    qualities.clear()
+                # Only the query words the word matches, as most words match none.
+                matches = qualities[word] = tuple(
+                    (number, quality) for number, (query_word, query_trigrams)
+                    in enumerate(query_words)
+                    if (quality := match_quality(query_word, query_trigrams, word)))
+            for number, quality in matches:
+                scores[number] = max(scores[number], quality * weight)
+        score = sum(scores)
+        if score <= 0:
+            continue
+        # The position breaks ties between titles without comparing movies.
+        entry = (score, title, -position, movie)
+        if limit is None or len(best) < limit:
+            heapq.heappush(best, entry)
+        elif entry[:3] > best[0][:3]:
+            heapq.heapreplace(best, entry)
+    return [(title, movie) for _, title, _, movie in sorted(best, reverse=True)]
+
+
+class SearchIndex:
+    """
+    SearchIndex is an inverted index over the title, genre, director,
+    actors and plot of every movie, with a trigram index over the
+    vocabulary for typo tolerant matching.
+
+    Results are ranked by the field weighted, idf scaled matches of the
+    query words. It is kept up to date through the storage listener calls
+    add, remove and reset, and rebuilt lazily after a reset.
+
+    Attributes:
+        _postings (dict): For every word, the weight of the word per title.
+        _documents (dict): For every title, the words indexed for it.
+        _word_trigrams (dict): For every trigram, the words containing it.
+        _pending (dict): The movies to rebuild from on the next search, or None.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._documents = {}
+        self._word_trigrams = {}
+        self._pending = None
+
+    @classmethod
+    def build(cls, movies):
+        """
+        Build an index of movies.
+
+        Args:
+            movies (dict): The movie data keyed by title.
+
+        Returns:
+            SearchIndex: The index.
+        """
+        index = cls()
+        for title, movie in movies.items():
+            index.add(title, movie)
+        return index
+
+    @classmethod
+    def load(cls, file_path, stamp):
+        """
+        Load an index saved by save.
+
+        Args:
+            file_path (str): The path of the saved index.
+            stamp: The stamp of the movies the index must have been built from.
+
+        Returns:
+            SearchIndex: The index, or None if there is none for this stamp.
+        """
+        try:
+            with open(file_path, "rb") as file:
+                saved_stamp, state = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return None
+        if saved_stamp != stamp:
+            return None
+        index = cls()
+        index._postings, index._documents, index._word_trigrams = state
+        return index
+
+    def save(self, file_path, stamp):
+        """
+        Save the index to disk.
+
+        Args:
+            file_path (str): The path to save the index to.
+            stamp: The stamp of the movies the index was built from.
+        """
+        self._rebuild_pending()
+        with atomic_write(file_path) as temp_path:
+            with open(temp_path, "wb") as file:
+                pickle.dump((stamp, (self._postings, self._documents, self._word_trigrams)),
+                            file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def reset(self, movies):
+        """
+        Storage listener call: the stored movies were replaced.
+
+        Args:
+            movies (dict): The new movie data keyed by title.
+        """
+        self._pending = movies
+
+    def add(self, title, movie):
+        """
+        Storage listener call: index a movie.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data.
+        """
+        if self._pending is not None:
+            return
+        weights = movie_words(title, movie)
+        for word, weight in weights.items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+                for trigram in trigrams(word):
+                    self._word_trigrams.setdefault(trigram, set()).add(word)
+            postings[title] = weight
+        self._documents[title] = tuple(weights)
+
+    def remove(self, title, movie):  # pylint: disable=unused-argument
+        """
+        Storage listener call: remove a movie from the index.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data.
+        """
+        if self._pending is not None:
+            return
+        for word in self._documents.pop(title, ()):
+            postings = self._postings[word]
+            del postings[title]
+            if not postings:
+                del self._postings[word]
+                for trigram in trigrams(word):
+                    words = self._word_trigrams[trigram]
+                    words.discard(word)
+                    if not words:
+                        del self._word_trigrams[trigram]
+
+    def _rebuild_pending(self):
+        """
+        Rebuild the index if the stored movies were replaced.
+        """
+        if self._pending is not None:
+            movies, self._pending = self._pending, None
+            self._postings, self._documents, self._word_trigrams = {}, {}, {}
+            for title, movie in movies.items():
+                self.add(title, movie)
+
+    def _matching_words(self, query_word):
+        """
+        Find the indexed words matching a query word.
+
+        A word similar enough to the query word shares at least
+        MIN_SIMILARITY of its trigrams, so it contains one of the rarest
+        trigrams left once that many are set aside. Only the words holding
+        those rare trigrams are compared, which skips the huge lists of
+        common trigrams.
+
+        Args:
+            query_word (str): A normalized query word.
+
+        Returns:
+            dict: The matching words mapped to how well they match.
+        """
+        matches = {}
+        if query_word in self._postings:
+            matches[query_word] = EXACT_MATCH
+
+        query_trigrams = trigrams(query_word)
+        rarest = sorted(query_trigrams,
+                        key=lambda trigram: len(self._word_trigrams.get(trigram, ())))
+        required = math.ceil(MIN_SIMILARITY * len(query_trigrams))
+        candidates = set()
+        for trigram in rarest[:len(rarest) - required + 1]:
+            candidates.update(self._word_trigrams.get(trigram, ()))
+        if len(query_word) >= 3:
+            # Longer words containing the query word hold all its inner trigrams.
+            inner = min((query_word[i:i + 3] for i in range(len(query_word) - 2)),
+                        key=lambda trigram: len(self._word_trigrams.get(trigram, ())))
+            candidates.update(self._word_trigrams.get(inner, ()))
+        else:
+            # Too short to share an inner trigram with longer words.
+            candidates.update(word for word in self._postings if query_word in word)
+
+        for word in candidates:
+            if word not in matches:
+                quality = match_quality(query_word, query_trigrams, word)
+                if quality:
+                    matches[word] = quality
+        return matches
+
+    def search(self, query, limit=None):
+        """
+        Find the movies best matching a query.
+
+        Args:
+            query (str): The words to search for.
+            limit (int): The maximum number of results, or None for all.
+
+        Returns:
+            list: The matching titles, best match first.
+        """
+        self._rebuild_pending()
+        document_count = max(len(self._documents), 1)
+        scores = {}
+        for query_word in dict.fromkeys(tokenize(query)):
+            best = {}
+            for word, quality in self._matching_words(query_word).items():
+                postings = self._postings[word]
+                idf = math.log(1 + document_count / len(postings))
+                for title, weight in postings.items():
+                    score = quality * weight * idf
+                    if score > best.get(title, 0.0):
+                        best[title] = score
+            for title, score in best.items():
+                scores[title] = scores.get(title, 0.0) + score
+
+        ranked = ((score, title) for title, score in scores.items())
+        if limit is None:
+            return [title for _, title in sorted(ranked, reverse=True)]
+        return [title for _, title in heapq.nlargest(limit, ranked)]
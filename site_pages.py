@@ -0,0 +1,236 @@
+'''
+This module is used to generate the website as many small pages,
+for catalogues too large to show on a single page.
+'''
+
+import json
+import os
+import re
+import unicodedata
+from string import Template
+from json_stream import strict_json
+
+GROUP_BY = ('genre', 'year', 'letter')
+
+# The movie fields stored in the JSON index of every page.
+PAGE_FIELDS = ('title', 'year', 'rating', 'poster_url', 'imdbID', 'genre', 'notes')
+
+
+def _slug(name):
+    '''
+    Turn a group name into a file name friendly slug. Accents are dropped
+    and letters of other scripts kept, so "Drame Épique" gives
+    "drame-epique" and "日本" stays "日本".
+    '''
+    name = unicodedata.normalize('NFKD', str(name).casefold())
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    return re.sub(r'[\W_]+', '-', name).strip('-') or 'other'
+
+
+def group_slugs(names):
+    '''
+    Give every group a distinct slug, adding a number to a slug already
+    taken by a previous group, e.g. "sci-fi" and "sci-fi-2" for "Sci-Fi"
+    and "Sci Fi".
+
+    Args:
+        names (list): The group names, in order.
+
+    Returns:
+        dict: The slug of every group name, in the same order.
+    '''
+    slugs = {}
+    taken = set()
+    for name in names:
+        slug = base = _slug(name)
+        number = 2
+        while slug in taken:
+            slug = f"{base}-{number}"
+            number += 1
+        taken.add(slug)
+        slugs[name] = slug
+    return slugs
+
+
+def _group_names(movie, group_by):
+    '''
+    Return the names of the groups a movie belongs to.
+    A movie with several genres is listed under each of them.
+    '''
+    if group_by is None:
+        return ['all']
+    if group_by == 'genre':
+        genre = movie.get('genre')
+        names = [name.strip() for name in genre.split(',')] if isinstance(genre, str) else []
+        return [name for name in names if name] or ['Unknown']
+    if group_by == 'year':
+        return [movie.get('year', 'Unknown')]
+    first = str(movie.get('title') or '?')[:1].upper()
+    return [first if first.isalnum() else '#']
+
+
+def group_movies(movies, group_by=None):
+    '''
+    Split movies into groups.
+
+    Args:
+        movies (dict): The movie data keyed by title.
+        group_by (str): None, 'genre', 'year' or 'letter'.
+
+    Returns:
+        dict: Lists of movies keyed by group name, in group name order.
+    '''
+    if group_by not in (None, *GROUP_BY):
+        raise ValueError(f"Unsupported grouping: {group_by}")
+    groups = {}
+    for movie in movies.values():
+        for name in _group_names(movie, group_by):
+            groups.setdefault(name, []).append(movie)
+    return {name: groups[name] for name in sorted(groups, key=str)}
+
+
+def page_file(slug, number):
+    '''
+    Return the file name of a page of a group, without extension.
+    '''
+    return f"page-{slug}-{number}"
+
+
+def _navigation_html(slugs, group, number, pages):
+    '''
+    Render the links to the other groups and to the previous and next page.
+    '''
+    group_links = ''.join(
+        f'<a class="btn btn-sm {"btn-primary" if name == group else "btn-outline-primary"} m-1" '
+        f'href="{page_file(slug, 1)}.html">{name}</a>'
+        for name, slug in slugs.items()) if len(slugs) > 1 else ''
+    slug = slugs[group]
+    previous_link = (f'<a class="btn btn-secondary" href="{page_file(slug, number - 1)}.html">'
+                     f'&laquo; Previous</a>' if number > 1 else '')
+    next_link = (f'<a class="btn btn-secondary" href="{page_file(slug, number + 1)}.html">'
+                 f'Next &raquo;</a>' if number < pages else '')
+    return f"""
+        <div class="col-12 mb-4 text-center">
+            <div>{group_links}</div>
+            <div class="d-flex justify-content-between align-items-center mt-2">
+                <span>{previous_link}</span>
+                <span>{group} &middot; page {number} of {pages}</span>
+                <span>{next_link}</span>
+            </div>
+        </div>
+        """
+
+
+def _write_if_changed(file_path, content):
+    '''
+    Write content to file_path unless the file already holds it.
+    '''
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            if file.read() == content:
+                return
+    except FileNotFoundError:
+        pass
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+def _write_page(job):
+    '''
+    Render one page and its JSON index. Runs in a worker process.
+    '''
+    # utility imports this module, so Utility can only be imported lazily.
+    from utility import Utility  # pylint: disable=import-outside-toplevel
+
+    output_dir, template_text, slugs, group, number, pages, movies, images, charts = job
+    slug = slugs[group]
+    name = page_file(slug, number)
+    cards = ''.join(Utility._generate_movie_html(  # pylint: disable=protected-access
+        movie, images.get(movie.get('poster_url'))) for movie in movies)
+    navigation = _navigation_html(slugs, group, number, pages)
+    html = Template(template_text).substitute(movie_list=navigation + cards, charts=charts)
+    _write_if_changed(os.path.join(output_dir, f"{name}.html"), html)
+
+    index = {
+        "group": str(group),
+        "page": number,
+        "pages": pages,
+        "previous": f"{page_file(slug, number - 1)}.json" if number > 1 else None,
+        "next": f"{page_file(slug, number + 1)}.json" if number < pages else None,
+        "movies": [{field: movie.get(field) for field in PAGE_FIELDS if field in movie}
+                   for movie in movies],
+    }
+    _write_if_changed(os.path.join(output_dir, f"{name}.json"),
+                      json.dumps(strict_json(index), default=str, allow_nan=False))
+    return name
+
+
+def generate_pages(movies, template_text, output_dir, page_size, group_by=None, workers=None,
+                   images=None, charts_html=''):
+    '''
+    Generate the website as pages of page_size movies each.
+
+    Every group gets its own numbered pages, page-<group>-<n>.html, each with
+    a page-<group>-<n>.json index of its movies for client side navigation.
+    pages.json lists the groups and their page count, and index.html is a
+    copy of the first page. Pages are rendered in parallel by a process
+    pool, files whose content did not change are not rewritten, and pages
+    left over from a previous, larger catalogue are removed.
+
+    Args:
+        movies (dict): The movie data keyed by title.
+        template_text (str): The website template.
+        output_dir (str): The directory to write the pages to.
+        page_size (int): The number of movies per page.
+        group_by (str): None, 'genre', 'year' or 'letter'.
+        workers (int): The number of worker processes, None for one per CPU.
+        images (dict): The local posters, with their width and height, keyed
+        by poster URL, see posters.PosterStore.images. Other posters are linked.
+        charts_html (str): The charts section of the first page of every group.
+
+    Returns:
+        list: The file names of the pages written, without extension.
+    '''
+    from concurrent.futures import ProcessPoolExecutor  # pylint: disable=import-outside-toplevel
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1")
+    images = images or {}
+    groups = group_movies(movies, group_by) or {'all': []}
+    slugs = group_slugs(groups)
+    jobs = []
+    page_counts = {group: max(1, -(-len(members) // page_size))
+                   for group, members in groups.items()}
+    for group, members in groups.items():
+        pages = page_counts[group]
+        for number in range(1, pages + 1):
+            chunk = members[(number - 1) * page_size:number * page_size]
+            chunk_images = {movie.get('poster_url'): images[movie.get('poster_url')]
+                            for movie in chunk if movie.get('poster_url') in images}
+            jobs.append((output_dir, template_text, slugs, group, number, pages, chunk,
+                         chunk_images, charts_html if number == 1 else ''))
+
+    if len(jobs) == 1 or workers == 1:
+        names = [_write_page(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            names = list(executor.map(_write_page, jobs, chunksize=4))
+
+    manifest = {
+        "page_size": page_size,
+        "group_by": group_by,
+        "groups": [{"name": str(group), "pages": pages,
+                    "first": f"{page_file(slugs[group], 1)}.html"}
+                   for group, pages in page_counts.items()],
+    }
+    _write_if_changed(os.path.join(output_dir, 'pages.json'),
+                      json.dumps(strict_json(manifest), default=str, allow_nan=False))
+    with open(os.path.join(output_dir, f"{names[0]}.html"), 'r', encoding='utf-8') as file:
+        _write_if_changed(os.path.join(output_dir, 'index.html'), file.read())
+
+    current = set(names)
+    for file_name in os.listdir(output_dir):
+        stem, extension = os.path.splitext(file_name)
+        if (file_name.startswith('page-') and extension in ('.html', '.json')
+                and stem not in current):
+            os.remove(os.path.join(output_dir, file_name))
+    return names
@@ -0,0 +1,308 @@
+'''
+This module contains the binary snapshot format of the movie
+database, read through mmap so records are decoded only when used.
+'''
+
+import json
+import math
+import mmap
+import struct
+from array import array
+from collections.abc import Mapping
+from journal import atomic_write
+
+MAGIC = b"MOVSNAP1"
+
+# magic, record count, string field count, then the offsets of the field
+# names, years, ratings, title order, null flags, string offsets and heap.
+HEADER = struct.Struct("<8sII7Q")
+
+MISSING_YEAR = -2 ** 31
+
+
+def _align(position):
+    """
+    Round a file position up to a multiple of 8.
+    """
+    return -(-position // 8) * 8
+
+
+def _is_number(value):
+    """
+    Check whether a value is a number, not a bool.
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def write_snapshot(file_path, movies):
+    """
+    Write movies to a snapshot file, replacing it atomically.
+
+    A snapshot stores the year and rating of every movie as fixed width
+    columns, every string field in a string heap located through an offset
+    index, and the titles in sorted order for lookups by binary search.
+    Values of other types are kept as JSON in an extra string per movie.
+
+    Args:
+        file_path (str): The path of the snapshot file.
+        movies (dict): The movie data keyed by title.
+    """
+    fields = sorted({field for movie in movies.values() for field, value in movie.items()
+                     if isinstance(value, str) and field not in ('year', 'rating')})
+    years = array('i')
+    ratings = array('d')
+    nulls = bytearray()
+    offsets = array('Q', [0])
+    heap = bytearray()
+    keys = []
+
+    for title, movie in movies.items():
+        extra = {field: value for field, value in movie.items()
+                 if not isinstance(value, str) or field in ('year', 'rating')}
+        year = extra.pop('year', None)
+        if _is_number(year) and year == int(year) and MISSING_YEAR < year < 2 ** 31:
+            years.append(int(year))
+        else:
+            years.append(MISSING_YEAR)
+            if 'year' in movie:
+                extra['year'] = year
+        rating = extra.pop('rating', None)
+        if _is_number(rating) and not math.isnan(rating):
+            ratings.append(rating)
+            if isinstance(rating, int):
+                # Keep the type of whole number ratings.
+                extra['rating'] = rating
+        else:
+            ratings.append(math.nan)
+            if 'rating' in movie:
+                extra['rating'] = rating
+
+        key = str(title).encode('utf-8')
+        keys.append(key)
+        values = [key]
+        values.extend(movie[field].encode('utf-8') if isinstance(movie.get(field), str) else None
+                      for field in fields)
+        values.append(json.dumps(extra, default=str).encode('utf-8') if extra else None)
+        for value in values:
+            nulls.append(value is None)
+            if value is not None:
+                heap += value
+            offsets.append(len(heap))
+
+    order = array('I', sorted(range(len(keys)), key=keys.__getitem__))
+    sections = [json.dumps(fields).encode('utf-8'), years.tobytes(), ratings.tobytes(),
+                order.tobytes(), bytes(nulls), offsets.tobytes(), bytes(heap)]
+    positions = []
+    position = HEADER.size
+    for section in sections:
+        position = _align(position)
+        positions.append(position)
+        position += len(section)
+
+    with atomic_write(file_path) as temp_path:
+        with open(temp_path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, len(keys), len(fields), *positions))
+            for section, start in zip(sections, positions):
+                file.write(b"\0" * (start - file.tell()))
+                file.write(section)
+
+
+class Snapshot(Mapping):
+    """
+    Snapshot is a read only mapping of titles to movies over a snapshot
+    file written by write_snapshot.
+
+    The file is mapped into memory, so opening it reads nothing but the
+    header and the field names. Looking up a title bisects the sorted
+    titles, and a movie is a SnapshotMovie decoding its fields on access.
+
+    Args:
+        file_path (str): The path of the snapshot file.
+
+    Raises:
+        ValueError: If the file is not a snapshot.
+
+    Attributes:
+        fields (list): The string fields, besides the title and extra columns.
+        years (memoryview): The year per movie, MISSING_YEAR when unknown.
+        ratings (memoryview): The rating per movie, NaN when unknown.
+        _count (int): The number of movies.
+        _field_count (int): The number of string columns per movie.
+        _field_index (dict): The string column of every field.
+        _order (memoryview): The movie indexes sorted by title.
+        _nulls (memoryview): Per movie and string column, 1 if it is missing.
+        _offsets (memoryview): The heap offset of every string.
+        _heap (memoryview): The utf-8 encoded strings.
+        _mmap (mmap.mmap): The mapped file.
+    """
+
+    def __init__(self, file_path):
+        with open(file_path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if len(view) < HEADER.size or view[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{file_path} is not a movie snapshot")
+        (_, self._count, string_fields, fields_at, years_at, ratings_at, order_at,
+         nulls_at, offsets_at, heap_at) = HEADER.unpack_from(view)
+        self._field_count = string_fields + 2
+        cells = self._count * self._field_count
+        self.fields = json.loads(bytes(view[fields_at:years_at]).rstrip(b"\0"))
+        self._field_index = {field: column + 1 for column, field in enumerate(self.fields)}
+        self.years = view[years_at:years_at + 4 * self._count].cast('i')
+        self.ratings = view[ratings_at:ratings_at + 8 * self._count].cast('d')
+        self._order = view[order_at:order_at + 4 * self._count].cast('I')
+        self._nulls = view[nulls_at:nulls_at + cells]
+        self._offsets = view[offsets_at:offsets_at + 8 * (cells + 1)].cast('Q')
+        self._heap = view[heap_at:]
+
+    def is_null(self, index, column):
+        """
+        Check whether a string column of a movie is missing.
+        """
+        return bool(self._nulls[index * self._field_count + column])
+
+    def has_extra(self, index):
+        """
+        Check whether a movie has values kept as JSON.
+        """
+        return not self.is_null(index, self._field_count - 1)
+
+    def _bytes(self, index, column):
+        """
+        Return the raw bytes of a string column of a movie, None if missing.
+        """
+        cell = index * self._field_count + column
+        if self._nulls[cell]:
+            return None
+        return self._heap[self._offsets[cell]:self._offsets[cell + 1]]
+
+    def string(self, index, column):
+        """
+        Decode a string column of a movie.
+
+        Args:
+            index (int): The position of the movie in the file.
+            column (int): The string column, 0 for the title.
+
+        Returns:
+            str: The value, or None if it is missing.
+        """
+        value = self._bytes(index, column)
+        return None if value is None else str(value, 'utf-8')
+
+    def key(self, index):
+        """
+        Return the title the movie at a position is stored under.
+        """
+        return self.string(index, 0)
+
+    def extra(self, index):
+        """
+        Return the values of a movie kept as JSON.
+        """
+        value = self._bytes(index, self._field_count - 1)
+        return {} if value is None else json.loads(str(value, 'utf-8'))
+
+    def field_column(self, field):
+        """
+        Return the string column of a field, or None if it has none.
+        """
+        return self._field_index.get(field)
+
+    def _find(self, title):
+        """
+        Find the position of a title by bisecting the sorted titles.
+
+        Returns:
+            int: The position of the movie in the file, or None.
+        """
+        if not isinstance(title, str):
+            return None
+        target = title.encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(self._bytes(self._order[middle], 0)) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._bytes(self._order[low], 0) == target:
+            return self._order[low]
+        return None
+
+    def __getitem__(self, title):
+        index = self._find(title)
+        if index is None:
+            raise KeyError(title)
+        return SnapshotMovie(self, index)
+
+    def __contains__(self, title):
+        return self._find(title) is not None
+
+    def __iter__(self):
+        return (self.key(index) for index in range(self._count))
+
+    def __len__(self):
+        return self._count
+
+    def items(self):
+        """
+        Iterate over the titles and movies in the order they were written.
+        """
+        return ((self.key(index), SnapshotMovie(self, index)) for index in range(self._count))
+
+    def values(self):
+        """
+        Iterate over the movies in the order they were written.
+        """
+        return (SnapshotMovie(self, index) for index in range(self._count))
+
+
+class SnapshotMovie(Mapping):
+    """
+    SnapshotMovie is a read only movie of a Snapshot, decoding a field only
+    when it is accessed. Pickling it gives a plain dictionary.
+
+    Args:
+        snapshot (Snapshot): The snapshot holding the movie.
+        index (int): The position of the movie in the file.
+    """
+
+    __slots__ = ('_snapshot', '_index')
+
+    def __init__(self, snapshot, index):
+        self._snapshot = snapshot
+        self._index = index
+
+    def __getitem__(self, field):
+        snapshot, index = self._snapshot, self._index
+        if field == 'year' and snapshot.years[index] != MISSING_YEAR:
+            return snapshot.years[index]
+        if field == 'rating' and not math.isnan(snapshot.ratings[index]):
+            if snapshot.has_extra(index):
+                return snapshot.extra(index).get('rating', snapshot.ratings[index])
+            return snapshot.ratings[index]
+        column = snapshot.field_column(field)
+        if column is not None:
+            value = snapshot.string(index, column)
+            if value is not None:
+                return value
+        return snapshot.extra(index)[field]
+
+    def __iter__(self):
+        snapshot, index = self._snapshot, self._index
+        fields = []
+        if snapshot.years[index] != MISSING_YEAR:
+            fields.append('year')
+        if not math.isnan(snapshot.ratings[index]):
+            fields.append('rating')
+        fields.extend(field for field in snapshot.fields
+                      if not snapshot.is_null(index, snapshot.field_column(field)))
+        fields.extend(field for field in snapshot.extra(index) if field not in fields)
+        return iter(fields)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
@@ -0,0 +1,209 @@
+'''
+This module contains the sorted indexes behind top-k and range
+queries on the rating and year of the movies.
+'''
+
+import heapq
+import math
+from bisect import bisect_left, insort
+from itertools import islice
+from rating_stats import movie_rating
+
+ORDER_BY = ('rating', 'year')
+
+
+def movie_year(movie):
+    """
+    Return the release year of a movie as a number.
+
+    Args:
+        movie (dict): The movie data.
+
+    Returns:
+        int: The year, or None if the movie has no usable year.
+    """
+    try:
+        return int(movie.get('year'))
+    except (TypeError, ValueError):
+        return None
+
+
+class SortedIndex:
+    """
+    SortedIndex keeps the movies in two sorted lists, so the best rated
+    movies, a rating range or a year range are found by bisection instead of
+    sorting the catalogue: a query costs O(log N + k) for k results.
+
+    _by_rating holds (-rating, title, year) keys, best rated first. _by_year
+    holds (year, -rating, title) keys, so within a year movies are best rated
+    first, and a year range ordered by rating merges one run per year.
+
+    It is a storage listener, updated with insort and bisection as movies
+    are added and removed, and rebuilt lazily after a reset.
+
+    Attributes:
+        _by_rating (list): The sorted (-rating, title, year) keys.
+        _by_year (list): The sorted (year, -rating, title) keys.
+        _years (dict): The number of movies per year.
+        _pending (dict): The movies to rebuild from on the next query, or None.
+    """
+
+    def __init__(self):
+        self._by_rating = []
+        self._by_year = []
+        self._years = {}
+        self._pending = None
+
+    @classmethod
+    def build(cls, movies):
+        """
+        Build the indexes of movies.
+
+        Args:
+            movies (dict): The movie data keyed by title.
+
+        Returns:
+            SortedIndex: The index.
+        """
+        index = cls()
+        index.reset(movies)
+        return index
+
+    @staticmethod
+    def _keys(title, movie):
+        """
+        Return the rating and year keys of a movie, None for those it lacks.
+        """
+        rating = movie_rating(movie)
+        if rating is None:
+            return None, None
+        year = movie_year(movie)
+        return (-rating, title, year), (year, -rating, title) if year is not None else None
+
+    def reset(self, movies):
+        """
+        Storage listener call: the stored movies were replaced.
+
+        Args:
+            movies (dict): The new movie data keyed by title.
+        """
+        self._pending = movies
+
+    def add(self, title, movie):
+        """
+        Storage listener call: index a movie.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data.
+        """
+        if self._pending is not None:
+            return
+        rating_key, year_key = self._keys(title, movie)
+        if rating_key is not None:
+            insort(self._by_rating, rating_key)
+        if year_key is not None:
+            insort(self._by_year, year_key)
+            self._years[year_key[0]] = self._years.get(year_key[0], 0) + 1
+
+    def remove(self, title, movie):
+        """
+        Storage listener call: remove a movie from the indexes.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data, as it was indexed.
+        """
+        if self._pending is not None:
+            return
+        rating_key, year_key = self._keys(title, movie)
+        for keys, key in ((self._by_rating, rating_key), (self._by_year, year_key)):
+            if key is not None:
+                position = bisect_left(keys, key)
+                if position < len(keys) and keys[position] == key:
+                    del keys[position]
+        if year_key is not None and year_key[0] in self._years:
+            self._years[year_key[0]] -= 1
+            if not self._years[year_key[0]]:
+                del self._years[year_key[0]]
+
+    def _rebuild_pending(self):
+        """
+        Rebuild the indexes if the stored movies were replaced.
+        """
+        if self._pending is None:
+            return
+        movies, self._pending = self._pending, None
+        by_rating, by_year, years = [], [], {}
+        for title, movie in movies.items():
+            rating_key, year_key = self._keys(title, movie)
+            if rating_key is not None:
+                by_rating.append(rating_key)
+            if year_key is not None:
+                by_year.append(year_key)
+                years[year_key[0]] = years.get(year_key[0], 0) + 1
+        by_rating.sort()
+        by_year.sort()
+        self._by_rating, self._by_year, self._years = by_rating, by_year, years
+
+    def query(self, min_rating=None, max_rating=None, min_year=None, max_year=None,
+              order_by='rating', limit=None, offset=0):
+        """
+        Find the movies in a rating and year range.
+
+        Ordered by rating, the movies come best rated first, and movies of
+        a year range are merged from one bisected run per year. Ordered by
+        year, they come oldest first and best rated first within a year,
+        and a rating range is checked movie by movie.
+
+        Args:
+            min_rating (float): The lowest rating, or None.
+            max_rating (float): The highest rating, or None.
+            min_year (int): The first release year, or None.
+            max_year (int): The last release year, or None.
+            order_by (str): 'rating' or 'year'.
+            limit (int): The maximum number of results, or None for all.
+            offset (int): The number of results to skip, for paging.
+
+        Returns:
+            list: (title, year, rating) tuples. The year is None for
+            movies without one, which only match queries without a year range.
+        """
+        if order_by not in ORDER_BY:
+            raise ValueError(f"Unsupported ordering: {order_by}")
+        self._rebuild_pending()
+        # Keys hold negated ratings: the best rating allowed is the lowest key.
+        high = -max_rating if max_rating is not None else -math.inf
+        low = -min_rating if min_rating is not None else math.inf
+        past_low = math.nextafter(low, math.inf)
+
+        if order_by == 'rating' and min_year is None and max_year is None:
+            start = bisect_left(self._by_rating, (high,))
+            end = bisect_left(self._by_rating, (past_low,))
+            stop = end if limit is None else min(end, start + offset + limit)
+            return [(title, year, -negative_rating)
+                    for negative_rating, title, year in self._by_rating[start + offset:stop]]
+
+        years = sorted(year for year in self._years
+                       if (min_year is None or year >= min_year)
+                       and (max_year is None or year <= max_year))
+        if order_by == 'rating':
+            runs = []
+            for year in years:
+                start = bisect_left(self._by_year, (year, high))
+                end = bisect_left(self._by_year, (year, past_low))
+                runs.append(self._run(start, end))
+            matches = heapq.merge(*runs, key=lambda key: key[1:])
+        else:
+            start = bisect_left(self._by_year, (years[0],)) if years else 0
+            end = bisect_left(self._by_year, (years[-1] + 1,)) if years else 0
+            matches = (key for key in self._run(start, end) if high <= key[1] <= low)
+        stop = None if limit is None else offset + limit
+        return [(title, year, -negative_rating)
+                for year, negative_rating, title in islice(matches, offset, stop)]
+
+    def _run(self, start, end):
+        """
+        Iterate over _by_year[start:end] without copying it.
+        """
+        return (self._by_year[position] for position in range(start, end))
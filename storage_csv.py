@@ -5,11 +5,15 @@ csv.
 
 import os
 import pandas as pd
-from istorage import IStorage
+from file_storage import FileStorage
 from api_requester import IApiRequester
+from journal import atomic_write
 
+# The number of rows iter_movies reads from the CSV file at a time.
+CHUNK_ROWS = 10_000
 
-class StorageCsv(IStorage):
+
+class StorageCsv(FileStorage):
     """
     StorageCsv class represents a storage implementation using CSV files for a movie database.
 
@@ -17,111 +21,78 @@ class StorageCsv(IStorage):
         file_path (str): The path to the CSV file storing the movie data.
         api_requester (IApiRequester): An object implementing the IApiRequester interface for
         making API requests.
-
-    Attributes:
-        _file_path (str): The path to the CSV file storing the movie data.
-        _api_requester (IApiRequester): An object implementing the
-        IApiRequester interface for making API requests.
+        journaled (bool): Append mutations to a journal instead of rewriting the file.
+        compact_threshold (int): The number of journal entries that triggers a compaction.
     """
 
-    def __init__(self, file_path: str, api_requester: IApiRequester):
-        self._file_path = file_path
-        self._api_requester = api_requester
-
-    def load_movies(self):
+    def _read_movies(self):
         """
-        Load movies from the CSV file.
+        Read movies from the CSV file.
 
         Returns:
             dict: A dictionary representing the loaded movie data.
 
         """
-        if os.path.exists(self._file_path):
-            data_frame = pd.read_csv(self._file_path, index_col=0)
-            return data_frame.to_dict('index')
-        return {}    
-
-    def _save_movies(self, movies):
-        """
-        Save movies to the CSV file.
-
-        Args:
-            movies (dict): A dictionary representing the movie data to be saved.
+        if not os.path.exists(self._file_path):
+            return {}
+        return pd.read_csv(self._file_path, index_col=0).to_dict('index')
 
+    def iter_movies(self):
         """
-        data_frame = pd.DataFrame.from_dict(movies, orient='index')
-        data_frame.to_csv(self._file_path, index=True)
+        Iterate over the stored movies one at a time.
 
-    def list_movies(self):
-        """
-        List all movies in the database.
+        Unless the movies are resident already, the CSV file is read
+        CHUNK_ROWS rows at a time instead of loaded, so memory use does not
+        grow with the file. In journaled mode the movies are loaded, since
+        the journal is replayed onto the whole file.
 
+        Yields:
+            tuple: The title and the movie data of every movie.
         """
-        movies = self.load_movies()
-        if not movies:
-            print("No movies found in the database.")
-        else:
-            print("List of movies:")
-            for title, movie in movies.items():
-                if 'year' not in movie:
-                    print("Error: Movie data is missing the 'year' field.")
-                    continue
-                print(f"{title} ({movie.get('year', '')})")
-                print(f"Director: {movie.get('director', 'N/A')}")
-                print(f"Genre: {movie.get('genre', 'N/A')}")
-                print(f"Rating: {movie.get('rating', 'N/A')}/10")
-                print()
-
-    def add_movie(self, title):
-        """
-        Add a movie to the database.
-
-        Args:
-            title (str): The title of the movie to be added.
-
-        """
-        movies = self.load_movies()
-        if title in movies:
-            print(f"Movie {title} already exists!")
+        movies = self._cache.peek()
+        if movies is None and self._journal is not None:
+            movies = self.load_movies()
+        if movies is not None:
+            yield from movies.items()
             return
-        movie_data = self._api_requester.request_movie_data(title)
-        if movie_data.get("Response") == "False":
-            print(f"Error: Movie {title} not found.")
+        if not os.path.exists(self._file_path):
             return
-        movie = self._api_requester.extract_data(movie_data)
-        movies[title] = movie
-        self._save_movies(movies)
-        print(f"Movie {title} successfully added")
+        with pd.read_csv(self._file_path, index_col=0, chunksize=CHUNK_ROWS) as chunks:
+            for chunk in chunks:
+                yield from chunk.to_dict('index').items()
 
-    def delete_movie(self, title):
+    def _write_movies(self, movies):
         """
-        Delete a movie from the database.
+        Write movies to the CSV file, atomically.
 
         Args:
-            title (str): The title of the movie to be deleted.
+            movies (dict): A dictionary representing the movie data to be saved.
 
+        Returns:
+            dict: movies.
         """
-        movies = self.load_movies()
-        if title in movies:
-            del movies[title]
-            self._save_movies(movies)
-            print(f"{title} Deleted Successfully!")
-        else:
-            print(f"{title} doesn't exist in the database!")
-
-    def update_movie(self, title, notes):
-        """
-        Update a movie in the database with additional notes.
+        data_frame = pd.DataFrame.from_dict(movies, orient='index')
+        with atomic_write(self._file_path) as temp_path:
+            data_frame.to_csv(temp_path, index=True)
+        return movies
 
-        Args:
-            title (str): The title of the movie to be updated.
-            notes (str): The additional notes for the movie.
+    def list_movies(self):
+        """
+        List all movies in the database.
 
         """
-        movies = self.load_movies()
-        if title in movies:
-            movies[title]['notes'] = notes
-            self._save_movies(movies)
-            print(f"{title} Updated Successfully!")
-        else:
-            print(f"{title} doesn't exist in the database!")
+        found = False
+        for title, movie in self.iter_movies():
+            if not found:
+                print("List of movies:")
+                found = True
+            if 'year' not in movie:
+                print("Error: Movie data is missing the 'year' field.")
+                continue
+            print(f"{title} ({movie.get('year', '')})")
+            print(f"Director: {movie.get('director', 'N/A')}")
+            print(f"Genre: {movie.get('genre', 'N/A')}")
+            print(f"Rating: {movie.get('rating', 'N/A')}/10")
+            print()
+        if not found:
+            print("No movies found in the database.")
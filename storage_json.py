@@ -4,11 +4,12 @@ json.
 '''
 
 import json
-from istorage import IStorage
-from api_requester import IApiRequester
+from file_storage import FileStorage
+from journal import atomic_write
+from json_stream import iter_object_items
 
 
-class StorageJson(IStorage):
+class StorageJson(FileStorage):
     """
     StorageJson class represents a storage implementation using JSON files for a movie database.
 
@@ -16,22 +17,14 @@ class StorageJson(IStorage):
         file_path (str): The path to the JSON file storing the movie data.
         api_requester (IApiRequester): An object implementing the
         IApiRequester interface for making API requests.
-
-    Attributes:
-        _file_path (str): The path to the JSON file storing the
-        movie data.
-        _api_requester (IApiRequester): An object implementing the
-        IApiRequester interface for making API requests.
+        journaled (bool): Append mutations to a journal instead of rewriting the file.
+        compact_threshold (int): The number of journal entries that triggers a compaction.
 
     """
 
-    def __init__(self, file_path: str, api_requester: IApiRequester):
-        self._file_path = file_path
-        self._api_requester = api_requester
-
-    def load_movies(self):
+    def _read_movies(self):
         """
-        Private method to load movies from the JSON file.
+        Private method to read movies from the JSON file.
 
         Returns:
             dict: A dictionary representing the loaded movie data.
@@ -42,90 +35,63 @@ class StorageJson(IStorage):
         except FileNotFoundError:
             return {}
 
-    def _save_movies(self, movies):
-        """
-        Private method to save movies to the JSON file.
-
-        Args:
-            movies (dict): A dictionary representing the movie data to be saved.
-
+    def iter_movies(self):
         """
-        with open(self._file_path, "w") as file:
-            json.dump(movies, file)
+        Iterate over the stored movies one at a time.
 
-    def list_movies(self):
-        """
-        List all movies in the database.
-
-        """
-        movies = self.load_movies()
-        if not movies:
-            print("No movies found in the database.")
-        else:
-            print("List of movies:")
-            for _, movie in movies.items():
-                if 'title' not in movie:
-                    print("Error: Movie data is missing the 'title' field.")
-                    continue
-                print(f"{movie['title']} ({movie['year']})")
-                print(f"Director: {movie.get('director', '')}")
-                print(f"Genre: {movie.get('genre', '')}")
-                print(f"Rating: {movie.get('rating', '')}/10")
-                print()
+        Unless the movies are resident already, the JSON file is parsed
+        incrementally instead of loaded, so memory use does not grow with
+        the file. In journaled mode the movies are loaded, since the journal
+        is replayed onto the whole file.
 
-    def add_movie(self, title):
+        Yields:
+            tuple: The title and the movie data of every movie.
         """
-        Add a new movie to the database.
-
-        Args:
-            title (str): The title of the movie to be added.
-
-        """
-        movies = self.load_movies()
-        if title in movies:
-            print(f"Movie {title} already exists!")
+        movies = self._cache.peek()
+        if movies is None and self._journal is not None:
+            movies = self.load_movies()
+        if movies is not None:
+            yield from movies.items()
             return
-        movie_data = self._api_requester.request_movie_data(title)
-        if movie_data.get("Response") == "False":
-            print(f"Error: Movie {title} not found.")
+        try:
+            file = open(self._file_path, "r")
+        except FileNotFoundError:
             return
-        movie = self._api_requester.extract_data(movie_data)
-        movies[title] = movie
-        self._save_movies(movies)
-        print(f"Movie {title} successfully added")
+        with file:
+            yield from iter_object_items(file)
 
-    def delete_movie(self, title):
+    def _write_movies(self, movies):
         """
-        Delete an existing movie from the database.
+        Private method to write movies to the JSON file, atomically.
 
         Args:
-            title (str): The title of the movie to be deleted.
+            movies (dict): A dictionary representing the movie data to be saved.
 
+        Returns:
+            dict: movies.
         """
-        movies = self.load_movies()
-        if title in movies:
-            del movies[title]
-            self._save_movies(movies)
-            print(f"Movie {title} Deleted Successfully!")
-        else:
-            print(f"Movie {title} doesn't exist in the database!")
+        with atomic_write(self._file_path) as temp_path:
+            with open(temp_path, "w") as file:
+                json.dump(movies, file)
+        return movies
 
-    def update_movie(self, title, notes):
+    def list_movies(self):
         """
-        Update the notes for an existing movie in the database.
-
-        Args:
-            title (str): The title of the movie to be updated.
-            notes (str): The additional notes for the movie.
+        List all movies in the database.
 
         """
-        movies = self.load_movies()
-        title_lowercase = title.lower()
-        movies_lowercase = {k.lower(): v for k, v in movies.items()}
-        if movies_lowercase.get(title_lowercase):
-            original_title = [k for k in movies.keys() if k.lower() == title_lowercase][0]
-            movies[original_title]["notes"] = notes
-            self._save_movies(movies)
-            print(f"{original_title} Updated Successfully!")
-        else:
-            print(f"{title} doesn't exist in the database!")
+        found = False
+        for _, movie in self.iter_movies():
+            if not found:
+                print("List of movies:")
+                found = True
+            if 'title' not in movie:
+                print("Error: Movie data is missing the 'title' field.")
+                continue
+            print(f"{movie['title']} ({movie['year']})")
+            print(f"Director: {movie.get('director', '')}")
+            print(f"Genre: {movie.get('genre', '')}")
+            print(f"Rating: {movie.get('rating', '')}/10")
+            print()
+        if not found:
+            print("No movies found in the database.")
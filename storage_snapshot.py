@@ -0,0 +1,92 @@
+'''
+This module is implementation of storage system using
+binary snapshot files.
+'''
+
+import os
+from file_storage import FileStorage
+from api_requester import IApiRequester
+from snapshot import Snapshot, write_snapshot
+
+
+class StorageSnapshot(FileStorage):
+    """
+    StorageSnapshot class represents a storage implementation using binary
+    snapshot files for a movie database, see snapshot.write_snapshot.
+
+    Opening the database maps the file into memory instead of parsing it,
+    and a movie is only decoded when it is read, so starting up and looking
+    up a few movies costs little whatever the size of the database.
+    load_movies returns a read only Snapshot of the file.
+
+    Every change rewrites the whole file, so the snapshot format suits
+    large databases that are mostly read, such as one migrated from JSON
+    or CSV for browsing.
+
+    Args:
+        file_path (str): The path to the snapshot file storing the movie data.
+        api_requester (IApiRequester): An object implementing the
+        IApiRequester interface for making API requests.
+    """
+
+    def __init__(self, file_path: str, api_requester: IApiRequester):
+        super().__init__(file_path, api_requester)
+
+    def _read_movies(self):
+        """
+        Private method to map the snapshot file.
+
+        Returns:
+            Snapshot: The movie data keyed by title, or an empty dictionary
+            if the file does not exist yet.
+        """
+        if not os.path.exists(self._file_path):
+            return {}
+        return Snapshot(self._file_path)
+
+    def _mutable(self, movies):
+        """
+        Decode a Snapshot into dictionaries that can be changed. Movie data
+        already decoded, such as that of a batch, is changed in place.
+
+        Args:
+            movies (Snapshot): The movie data, as returned by load_movies.
+
+        Returns:
+            dict: The movie data keyed by title.
+        """
+        if not isinstance(movies, Snapshot):
+            return movies
+        return {title: dict(movie) for title, movie in movies.items()}
+
+    def _write_movies(self, movies):
+        """
+        Private method to write movies to the snapshot file, atomically.
+        The new file is mapped again, so the listeners are reset on the next
+        load instead of being notified of each change.
+
+        Args:
+            movies (dict): The movie data keyed by title.
+
+        Returns:
+            Snapshot: The new snapshot file.
+        """
+        write_snapshot(self._file_path, movies)
+        return Snapshot(self._file_path)
+
+    def list_movies(self):
+        """
+        List all movies in the database.
+
+        """
+        movies = self.load_movies()
+        if not movies:
+            print("No movies found in the database.")
+        else:
+            print("List of movies:")
+            for title, movie in movies.items():
+                print(f"{movie.get('title', title)} ({movie.get('year', '')})")
+                print(f"Director: {movie.get('director', '')}")
+                print(f"Genre: {movie.get('genre', '')}")
+                print(f"Rating: {movie.get('rating', '')}/10")
+                print()
@@ -0,0 +1,548 @@
+'''
+This module is implementation of storage system using
+sqlite.
+'''
+
+import json
+import sqlite3
+from istorage import IStorage
+from api_requester import IApiRequester, ApiError
+from movie_cache import file_stamp
+from movie_sampler import MovieSampler
+from rating_stats import RatingHistogram, summarize
+from search_index import SearchIndex
+from sorted_index import ORDER_BY
+from title_index import TitleIndex, movie_imdb_id
+import metrics
+
+COLUMNS = ("title", "year", "rating", "poster_url", "imdbID", "genre", "director",
+           "actors", "plot", "language", "country", "awards", "notes")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    name TEXT PRIMARY KEY,
+    title TEXT,
+    year INTEGER,
+    rating REAL,
+    poster_url TEXT,
+    imdbID TEXT,
+    genre TEXT,
+    director TEXT,
+    actors TEXT,
+    plot TEXT,
+    language TEXT,
+    country TEXT,
+    awards TEXT,
+    notes TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_movies_name_nocase ON movies (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_movies_imdb_id ON movies (imdbID);
+CREATE INDEX IF NOT EXISTS idx_movies_rating_name ON movies (rating DESC, name);
+CREATE INDEX IF NOT EXISTS idx_movies_year_rating ON movies (year, rating DESC, name);
+CREATE TABLE IF NOT EXISTS movie_genres (
+    name TEXT NOT NULL REFERENCES movies (name) ON DELETE CASCADE,
+    genre TEXT NOT NULL,
+    PRIMARY KEY (name, genre)
+);
+CREATE INDEX IF NOT EXISTS idx_movie_genres_genre ON movie_genres (genre);
+"""
+
+
+class StorageSqlite(IStorage):
+    """
+    StorageSqlite class represents a storage implementation using a SQLite database.
+
+    Movies live in an indexed ``movies`` table, so sorting by rating and
+    the rating statistics run as indexed queries instead of loading every
+    movie into Python. Searching goes through the same SearchIndex as the
+    other storages, persisted next to the database.
+
+    Args:
+        file_path (str): The path to the SQLite database storing the movie data.
+        api_requester (IApiRequester): An object implementing the
+        IApiRequester interface for making API requests.
+
+    Attributes:
+        _file_path (str): The path to the SQLite database storing the movie data.
+        _api_requester (IApiRequester): An object implementing the
+        IApiRequester interface for making API requests.
+        _connection (sqlite3.Connection): The connection to the database.
+
+    """
+
+    def __init__(self, file_path: str, api_requester: IApiRequester):
+        super().__init__()
+        self._file_path = file_path
+        self._api_requester = api_requester
+        # Callers such as AsyncStorage serialize access from worker threads.
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        """
+        Close the connection to the database.
+        """
+        self._connection.close()
+
+    @staticmethod
+    def _movie_to_row(title, movie):
+        """
+        Convert a movie dictionary into a row of the movies table.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data.
+
+        Returns:
+            tuple: The values of the name, COLUMNS and extra columns.
+        """
+        extra = {key: value for key, value in movie.items() if key not in COLUMNS}
+        return (title, *(movie.get(column) for column in COLUMNS),
+                json.dumps(extra) if extra else None)
+
+    @staticmethod
+    def _row_to_movie(row):
+        """
+        Convert a row of the movies table into a movie dictionary.
+
+        Args:
+            row (tuple): The values of the COLUMNS and extra columns.
+
+        Returns:
+            dict: The movie data, without the columns that are NULL.
+        """
+        movie = {column: value for column, value in zip(COLUMNS, row) if value is not None}
+        if row[-1]:
+            movie.update(json.loads(row[-1]))
+        return movie
+
+    @staticmethod
+    def _genres(movie):
+        """
+        Split the comma separated genre of a movie.
+
+        Args:
+            movie (dict): The movie data.
+
+        Returns:
+            set: The genres of the movie.
+        """
+        genre = movie.get("genre")
+        if not isinstance(genre, str):
+            return set()
+        return {name.strip() for name in genre.split(",") if name.strip()}
+
+    def _insert_movies(self, movies):
+        """
+        Insert or replace movies. Must be called inside a transaction.
+
+        Args:
+            movies (dict): The movie data keyed by title.
+        """
+        metrics.count("storage.records_written", len(movies))
+        placeholders = ", ".join("?" * (len(COLUMNS) + 2))
+        self._connection.execute(
+            "DELETE FROM movies WHERE name IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(movies)),))
+        self._connection.executemany(
+            f"INSERT INTO movies (name, {', '.join(COLUMNS)}, extra) VALUES ({placeholders})",
+            (self._movie_to_row(title, movie) for title, movie in movies.items()))
+        self._connection.executemany(
+            "INSERT INTO movie_genres (name, genre) VALUES (?, ?)",
+            ((title, genre) for title, movie in movies.items() for genre in self._genres(movie)))
+
+    def _summaries(self, titles=None):
+        """
+        Load the year, rating, genre and IMDb id of movies, all that the
+        listeners of this storage look at.
+
+        Args:
+            titles (list): The titles of the movies, or None for all movies.
+
+        Returns:
+            dict: The year, rating, genre and imdbID keyed by title.
+        """
+        query = "SELECT name, year, rating, genre, imdbID FROM movies"
+        params = ()
+        if titles is not None:
+            query += " WHERE name IN (SELECT value FROM json_each(?))"
+            params = (json.dumps(list(titles)),)
+        return {name: {"year": year, "rating": rating, "genre": genre, "imdbID": imdb_id}
+                for name, year, rating, genre, imdb_id
+                in self._connection.execute(query, params)}
+
+    def _stored_movies(self, titles):
+        """
+        Load some movies, to pass them to the listeners.
+
+        Args:
+            titles (list): The titles of the movies.
+
+        Returns:
+            dict: The movie data keyed by title, for the titles stored.
+        """
+        cursor = self._connection.execute(
+            f"SELECT name, {', '.join(COLUMNS)}, extra FROM movies "
+            "WHERE name IN (SELECT value FROM json_each(?))", (json.dumps(list(titles)),))
+        return {row[0]: self._row_to_movie(row[1:]) for row in cursor}
+
+    def title_lookup(self):
+        """
+        Return the lookup resolving titles, ignoring case and accents, and
+        IMDb ids to the names of the stored movies. It is built from the
+        name and imdbID columns and kept up to date by this storage, so
+        changes made by other connections are not seen.
+
+        Returns:
+            TitleIndex: The lookup.
+        """
+        if self._title_index is None:
+            summaries = self._summaries()
+            self._title_index = TitleIndex.build(summaries)
+            self.add_listener(self._title_index, summaries)
+        return self._title_index
+
+    def load_movies(self):
+        """
+        Load all movies from the database.
+
+        Returns:
+            dict: A dictionary representing the loaded movie data.
+        """
+        with metrics.timer("storage.read"):
+            cursor = self._connection.execute(
+                f"SELECT name, {', '.join(COLUMNS)}, extra FROM movies")
+            movies = {row[0]: self._row_to_movie(row[1:]) for row in cursor}
+        metrics.count("storage.records_read", len(movies))
+        return movies
+
+    def iter_movies(self):
+        """
+        Iterate over the movies one at a time, as the cursor fetches them.
+
+        Yields:
+            tuple: The title and the movie data of every movie.
+        """
+        cursor = self._connection.execute(
+            f"SELECT name, {', '.join(COLUMNS)}, extra FROM movies")
+        for row in cursor:
+            yield row[0], self._row_to_movie(row[1:])
+
+    def import_movies(self, movies):
+        """
+        Add already fetched movies to the database in a single transaction.
+        Movies whose title is already stored are replaced.
+
+        Args:
+            movies (dict): The movie data keyed by title.
+
+        """
+        replaced = self._stored_movies(movies) if self._listeners else {}
+        with metrics.timer("storage.write"), self._connection:
+            self._insert_movies(movies)
+        for title, movie in replaced.items():
+            self._notify_remove(title, movie)
+        if self._listeners:
+            for title, movie in self._stored_movies(movies).items():
+                self._notify_add(title, movie)
+
+    def merge_movies(self, changes):
+        """
+        Change some fields of stored movies in a single transaction. The
+        rows are read and written within one write transaction, so
+        concurrent changes to their other fields are kept.
+
+        Args:
+            changes (dict): The fields to set, keyed by title.
+
+        Returns:
+            list: The titles changed; titles no longer stored are skipped.
+        """
+        with metrics.timer("storage.write"), self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            replaced = self._stored_movies(changes)
+            merged = {title: {**movie, **changes[title]} for title, movie in replaced.items()}
+            self._insert_movies(merged)
+        for title, movie in replaced.items():
+            self._notify_remove(title, movie)
+        if self._listeners:
+            for title, movie in self._stored_movies(merged).items():
+                self._notify_add(title, movie)
+        return list(merged)
+
+    def list_movies(self):
+        """
+        List all movies in the database.
+
+        """
+        cursor = self._connection.execute(
+            "SELECT title, year, director, genre, rating FROM movies")
+        row = cursor.fetchone()
+        if row is None:
+            print("No movies found in the database.")
+            return
+        print("List of movies:")
+        while row is not None:
+            title, year, director, genre, rating = row
+            print(f"{title} ({year})")
+            print(f"Director: {director or ''}")
+            print(f"Genre: {genre or ''}")
+            print(f"Rating: {rating if rating is not None else ''}/10")
+            print()
+            row = cursor.fetchone()
+
+    def add_movie(self, title):
+        """
+        Add a new movie to the database.
+
+        Args:
+            title (str): The title of the movie to be added.
+
+        Returns:
+            bool: Whether the movie was added.
+
+        """
+        existing = self.title_lookup().resolve(title)
+        if existing is not None:
+            print(f"Movie {existing} already exists!")
+            return False
+        try:
+            movie_data = self._api_requester.request_movie_data(title)
+        except ApiError as error:
+            print(f"Error: {error}")
+            return False
+        if movie_data.get("Response") == "False":
+            print(f"Error: Movie {title} not found.")
+            return False
+        return self.add_fetched_movie(title, self._api_requester.extract_data(movie_data))
+
+    def add_fetched_movie(self, title, movie):
+        """
+        Add a movie already fetched from OMDB, unless its title or IMDb id
+        is already stored. The check and the insert run in one write
+        transaction, and the check looks at the table, so a movie another
+        connection added meanwhile is found too.
+
+        Args:
+            title (str): The title to store the movie under.
+            movie (dict): The extracted movie data.
+
+        Returns:
+            bool: Whether the movie was added.
+        """
+        placeholders = ", ".join("?" * (len(COLUMNS) + 2))
+        with metrics.timer("storage.write"), self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            row = self._connection.execute(
+                "SELECT name FROM movies WHERE name = ? COLLATE NOCASE OR imdbID = ? LIMIT 1",
+                (title, movie_imdb_id(movie))).fetchone()
+            # The lookup also ignores accents, for the movies this connection knows.
+            existing = row[0] if row else self.title_lookup().find(title, movie)
+            if existing is None:
+                added = self._connection.execute(
+                    f"INSERT INTO movies (name, {', '.join(COLUMNS)}, extra) "
+                    f"VALUES ({placeholders}) ON CONFLICT (name) DO NOTHING",
+                    self._movie_to_row(title, movie)).rowcount
+                if added:
+                    self._connection.executemany(
+                        "INSERT INTO movie_genres (name, genre) VALUES (?, ?)",
+                        ((title, genre) for genre in self._genres(movie)))
+                else:
+                    existing = title
+        if existing is not None:
+            print(f"Movie {existing} already exists!")
+            return False
+        metrics.count("storage.records_written")
+        if self._listeners:
+            for name, stored in self._stored_movies([title]).items():
+                self._notify_add(name, stored)
+        print(f"Movie {title} successfully added")
+        return True
+
+    def delete_movie(self, title):
+        """
+        Delete an existing movie from the database.
+
+        Args:
+            title (str): The title of the movie to be deleted.
+
+        Returns:
+            bool: Whether the movie was deleted.
+
+        """
+        key = self.title_lookup().resolve(title)
+        if key is None:
+            print(f"Movie {title} doesn't exist in the database!")
+            return False
+        removed = self._stored_movies([key]) if self._listeners else {}
+        with metrics.timer("storage.write"), self._connection:
+            self._connection.execute("DELETE FROM movies WHERE name = ?", (key,))
+        metrics.count("storage.records_written")
+        for name, movie in removed.items():
+            self._notify_remove(name, movie)
+        print(f"Movie {key} Deleted Successfully!")
+        return True
+
+    def update_movie(self, title, notes):
+        """
+        Update the notes for an existing movie in the database.
+        The title is matched ignoring case and accents.
+
+        Args:
+            title (str): The title of the movie to be updated.
+            notes (str): The additional notes for the movie.
+
+        Returns:
+            bool: Whether the movie was updated.
+
+        """
+        key = self.title_lookup().resolve(title)
+        if key is None:
+            print(f"{title} doesn't exist in the database!")
+            return False
+        # None of the listeners look at the notes.
+        with metrics.timer("storage.write"), self._connection:
+            self._connection.execute(
+                "UPDATE movies SET notes = ? WHERE name = ?", (notes, key))
+        metrics.count("storage.records_written")
+        print(f"{key} Updated Successfully!")
+        return True
+
+    def _search_index_file(self):
+        """
+        Persist the search index next to the database, tagged with the
+        state of the database and its write-ahead log.
+
+        Returns:
+            tuple: The path of the index file and the stamp of the database.
+        """
+        database, log = file_stamp(self._file_path, f"{self._file_path}-wal")
+        # Every connection creates and removes an empty log, which changes no data.
+        return f"{self._file_path}.search", (database, log if log and log[2] else None)
+
+    def search_movies(self, query, limit=None):
+        """
+        Find the movies best matching query in their title, genre,
+        director, actors or plot, tolerating typos, ranked like in the
+        other storages. The index is built from the whole table once and
+        kept up to date by this storage, so changes made by other
+        connections are only seen once it is built again.
+
+        Args:
+            query (str): The words to search for.
+            limit (int): The maximum number of results, or None for all.
+
+        Returns:
+            dict: The matching titles mapped to their rating, best match first.
+        """
+        if self._search_index is None:
+            index_file = self._search_index_file()
+            index = SearchIndex.load(*index_file)
+            if index is None:
+                movies = self.load_movies()
+                index = SearchIndex.build(movies)
+                index.save(*index_file)
+            self._search_index = index
+            # The table is never reloaded as a whole, so the index is never reset.
+            self.add_listener(index, None)
+        titles = self._search_index.search(query, limit)
+        summaries = self._summaries(titles)
+        return {title: summaries[title]["rating"] for title in titles}
+
+    def query_movies(self, min_rating=None, max_rating=None, min_year=None, max_year=None,
+                     order_by='rating', limit=None, offset=0):
+        """
+        Find the movies in a rating and year range, best rated or oldest
+        first, using the rating and year indexes.
+
+        Args:
+            min_rating (float): The lowest rating, or None.
+            max_rating (float): The highest rating, or None.
+            min_year (int): The first release year, or None.
+            max_year (int): The last release year, or None.
+            order_by (str): 'rating' for best rated first, or 'year' for
+            oldest first and best rated first within a year.
+            limit (int): The maximum number of results, or None for all.
+            offset (int): The number of results to skip, for paging.
+
+        Returns:
+            list: (title, year, rating) tuples.
+        """
+        if order_by not in ORDER_BY:
+            raise ValueError(f"Unsupported ordering: {order_by}")
+        conditions = ["typeof(rating) IN ('integer', 'real')"]
+        params = []
+        for condition, value in (("rating >= ?", min_rating), ("rating <= ?", max_rating),
+                                 ("year >= ?", min_year), ("year <= ?", max_year)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        if min_year is not None or max_year is not None:
+            conditions.append("typeof(year) = 'integer'")
+        ordering = "rating DESC, name" if order_by == 'rating' else "year, rating DESC, name"
+        return self._connection.execute(
+            f"SELECT name, year, rating FROM movies WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {ordering} LIMIT ? OFFSET ?",
+            (*params, -1 if limit is None else limit, offset)).fetchall()
+
+    def sample_movies(self, count=1, weight=None):
+        """
+        Suggest random movies. Uniform suggestions do not repeat a movie
+        before all movies were suggested, across calls; weighted ones
+        suggest every movie in proportion to its weight. The sampler is
+        built from the year, rating and genre of the movies and kept up to
+        date by this storage, so changes made by other connections are not
+        seen.
+
+        Args:
+            count (int): The number of movies to suggest.
+            weight (str): None for uniform suggestions, 'rating', 'recency'
+            or 'genre:<name>', see movie_sampler.weight_function.
+
+        Returns:
+            list: Up to count distinct (title, year, rating) tuples.
+        """
+        if self._sampler is None:
+            summaries = self._summaries()
+            self._sampler = MovieSampler()
+            self._sampler.reset(summaries)
+            self.add_listener(self._sampler, summaries)
+        titles = self._sampler.sample(count, weight)
+        summaries = self._summaries(titles)
+        return [(title, summaries[title]["year"], summaries[title]["rating"])
+                for title in titles]
+
+    def rating_stats(self):
+        """
+        Calculate the rating statistics of the movies from the number of
+        movies per rating, per genre and rating and per decade and rating,
+        grouped by indexed queries.
+
+        Returns:
+            dict: The rating statistics, see rating_stats.summarize.
+        """
+        histogram = RatingHistogram()
+        for rating, count in self._connection.execute(
+                "SELECT rating, COUNT(*) FROM movies "
+                "WHERE typeof(rating) IN ('integer', 'real') GROUP BY rating"):
+            histogram.add(rating, count)
+        genres = {}
+        for genre, rating, count in self._connection.execute(
+                "SELECT movie_genres.genre, movies.rating, COUNT(*) FROM movie_genres "
+                "JOIN movies ON movies.name = movie_genres.name "
+                "WHERE typeof(movies.rating) IN ('integer', 'real') GROUP BY 1, 2"):
+            genres.setdefault(genre, RatingHistogram()).add(rating, count)
+        decades = {}
+        for decade, rating, count in self._connection.execute(
+                "SELECT year / 10 * 10, rating, COUNT(*) FROM movies "
+                "WHERE typeof(rating) IN ('integer', 'real') AND typeof(year) = 'integer' "
+                "GROUP BY 1, 2"):
+            decades.setdefault(decade, RatingHistogram()).add(rating, count)
+
+        best, worst = ([name for (name,) in self._connection.execute(
+            "SELECT name FROM movies WHERE rating = ? ORDER BY name", (rating,))]
+            for rating in (histogram.maximum(), histogram.minimum()))
+        return summarize(histogram, best, worst, genres, decades)
@@ -0,0 +1,243 @@
+'''
+This module contains the lookup index resolving a title or an IMDb id
+to the key a movie is stored under.
+'''
+
+import unicodedata
+
+# Values OMDB answers for a field it knows nothing about.
+MISSING_VALUES = (None, 'N/A', '')
+
+
+def movie_imdb_id(movie):
+    """
+    Return the IMDb id of a stored movie.
+
+    Args:
+        movie (dict): The movie data.
+
+    Returns:
+        str: The id, or None if the movie has none.
+    """
+    imdb_id = movie.get('imdbID')
+    if not isinstance(imdb_id, str) or imdb_id in MISSING_VALUES:
+        return None
+    return imdb_id
+
+
+def normalize_title(title):
+    """
+    Fold a title to compare it with other titles: case and accents are
+    ignored, and runs of whitespace count as a single space.
+
+    Args:
+        title (str): The title.
+
+    Returns:
+        str: The normalized title.
+
+    Raises:
+        TypeError: If title is not a string.
+    """
+    if not isinstance(title, str):
+        raise TypeError(f"A title must be a string, not {type(title).__name__}")
+    if title.isascii():
+        return " ".join(title.lower().split())
+    title = unicodedata.normalize("NFKD", title.casefold())
+    return " ".join("".join(char for char in title if not unicodedata.combining(char)).split())
+
+
+class TitleIndex:
+    """
+    TitleIndex maps the normalized title and the IMDb id of every stored
+    movie to the key it is stored under, so add, delete and update find a
+    movie in O(1) whatever the case or accents of the title they are given,
+    and a movie fetched under another title is recognized by its id.
+
+    A normalized title or an id maps to a list of keys, as catalogues saved
+    before the index existed may hold the same movie twice.
+
+    It is a storage listener, updated as movies are added and removed, and
+    rebuilt lazily after a reset.
+
+    Attributes:
+        _titles (dict): The keys by normalized title.
+        _ids (dict): The keys by IMDb id.
+        _pending (dict): The movies to rebuild from on the next lookup, or None.
+    """
+
+    def __init__(self):
+        self._titles = {}
+        self._ids = {}
+        self._pending = None
+
+    @classmethod
+    def build(cls, movies):
+        """
+        Build the index of movies.
+
+        Args:
+            movies (dict): The movie data keyed by title.
+
+        Returns:
+            TitleIndex: The index.
+        """
+        index = cls()
+        index.reset(movies)
+        return index
+
+    def reset(self, movies):
+        """
+        Storage listener call: the stored movies were replaced.
+
+        Args:
+            movies (dict): The new movie data keyed by title.
+        """
+        self._pending = movies
+
+    def add(self, title, movie):
+        """
+        Storage listener call: index a movie.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data.
+        """
+        if self._pending is not None:
+            return
+        self._insert(title, movie)
+
+    def _insert(self, title, movie):
+        """
+        Index a movie under its normalized title and its IMDb id.
+        """
+        keys = self._titles.setdefault(normalize_title(str(title)), [])
+        if title not in keys:
+            keys.append(title)
+        imdb_id = movie_imdb_id(movie)
+        if imdb_id is not None:
+            keys = self._ids.setdefault(imdb_id, [])
+            if title not in keys:
+                keys.append(title)
+
+    def remove(self, title, movie):
+        """
+        Storage listener call: remove a movie from the index.
+
+        Args:
+            title (str): The title the movie is stored under.
+            movie (dict): The movie data, as it was indexed.
+        """
+        if self._pending is not None:
+            return
+        for keys_by, key in ((self._titles, normalize_title(str(title))),
+                             (self._ids, movie_imdb_id(movie))):
+            keys = keys_by.get(key)
+            if keys and title in keys:
+                keys.remove(title)
+                if not keys:
+                    del keys_by[key]
+
+    def _rebuild_pending(self):
+        """
+        Rebuild the index if the stored movies were replaced.
+        """
+        if self._pending is None:
+            return
+        movies, self._pending = self._pending, None
+        self._titles, self._ids = {}, {}
+        for title, movie in movies.items():
+            self._insert(title, movie)
+
+    def resolve(self, title):
+        """
+        Find the key of the movie stored under title, ignoring case, accents
+        and whitespace.
+
+        Args:
+            title (str): The title.
+
+        Returns:
+            str: title itself if a movie is stored under it, otherwise the
+            key of a movie with the same normalized title, or None.
+        """
+        self._rebuild_pending()
+        keys = self._titles.get(normalize_title(title))
+        if not keys:
+            return None
+        return title if title in keys else keys[0]
+
+    def find_id(self, imdb_id):
+        """
+        Find the key of the movie with an IMDb id.
+
+        Args:
+            imdb_id (str): The IMDb id, e.g. "tt0145487".
+
+        Returns:
+            str: The key of the movie, or None if no movie has that id.
+        """
+        self._rebuild_pending()
+        keys = self._ids.get(imdb_id)
+        return keys[0] if keys else None
+
+    def find(self, title, movie=None):
+        """
+        Find the stored movie a new movie would duplicate.
+
+        Args:
+            title (str): The title the new movie would be stored under.
+            movie (dict): The fetched movie data, or None to only look at the title.
+
+        Returns:
+            str: The key of the stored movie with the same normalized title,
+            or else with the same IMDb id, or None.
+        """
+        key = self.resolve(title)
+        if key is None and movie is not None:
+            imdb_id = movie_imdb_id(movie)
+            if imdb_id is not None:
+                key = self.find_id(imdb_id)
+        return key
+
+    def split_titles(self, titles):
+        """
+        Split the titles of movies to add into the ones to fetch and the
+        ones to skip, being stored already or repeated.
+
+        Args:
+            titles (list): The titles.
+
+        Returns:
+            tuple: The titles to skip and the titles to fetch, in order.
+        """
+        skipped, new_titles, seen = [], [], set()
+        for title in titles:
+            normalized = normalize_title(title)
+            if normalized in seen or self.resolve(title) is not None:
+                skipped.append(title)
+            else:
+                seen.add(normalized)
+                new_titles.append(title)
+        return skipped, new_titles
+
+    def drop_duplicates(self, movies):
+        """
+        Remove the fetched movies that are stored already, or fetched twice,
+        under another title, going by their IMDb id.
+
+        Args:
+            movies (dict): The fetched movie data keyed by title, changed in place.
+
+        Returns:
+            list: The titles removed.
+        """
+        dropped, fetched_ids = [], set()
+        for title, movie in list(movies.items()):
+            imdb_id = movie_imdb_id(movie)
+            if imdb_id in fetched_ids or self.find(title, movie) is not None:
+                dropped.append(title)
+                del movies[title]
+            elif imdb_id is not None:
+                fetched_ids.add(imdb_id)
+        return dropped
@@ -5,10 +5,29 @@ This module is used to store Utility Methods like
 3. Graphs etc.
 '''
 
-import random
+import os
 from string import Template
 from colorama import Fore, Style
-from matplotlib import pyplot as plt
+from charts import CHART_DIR, chart_images, render_charts
+from journal import atomic_write
+import metrics
+from posters import PosterStore
+from rating_stats import stream_stats
+from search_index import scan_movies
+from site_pages import generate_pages
+
+TEMPLATE_PATH = '_static/index_template.html'
+WEBSITE_PATH = '_static/index.html'
+
+# The movie fields a card shows; a card is re-rendered only when one of them changes.
+CARD_FIELDS = ('title', 'year', 'poster_url', 'rating', 'notes', 'imdbID')
+
+# The image, width and height shown for a movie without a poster.
+PLACEHOLDER_POSTER = ('poster_placeholder.svg', 300, 450)
+
+# The number of best matches shown for a search.
+SEARCH_LIMIT = 20
+
 
 class Utility:
     '''
@@ -16,18 +35,67 @@ class Utility:
 
     Args:
         storage: The storage system used.
+        streaming (bool): Search, summarize and render the movies in a single
+        pass over IStorage.iter_movies, for catalogues larger than memory.
+        posters (bool): Download the posters for the website instead of
+        linking them, see posters.PosterStore.
+        chart_format (str): Draw the charts as 'svg' or 'png' files.
+
+    Attributes:
+        _storage: The storage system used.
+        _streaming (bool): Whether to go over the movies one at a time.
+        _posters (PosterStore): The local posters of the website, or None to link them.
+        _chart_format (str): The file format of the charts.
+        _card_cache (dict): Rendered movie cards keyed by the CARD_FIELDS values
+        of their movie and their local poster.
+        _template (tuple): The stat of the template file and the parsed Template.
+        _website_state (tuple): The template stat and card keys of the website
+        last written, or None.
     '''
 
-    def __init__(self, storage):
+    def __init__(self, storage, streaming=False, posters=True, chart_format='svg'):
         '''
         Initialize local storage.
         '''
         self._storage = storage
+        self._streaming = streaming
+        self._posters = PosterStore() if posters else None
+        self._chart_format = chart_format
+        self._card_cache = {}
+        self._template = None
+        self._website_state = None
+
+    def _load_template(self):
+        '''
+        Return the parsed website template, re-reading it only if the file changed.
+        '''
+        stat = os.stat(TEMPLATE_PATH)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if self._template is None or self._template[0] != stamp:
+            with open(TEMPLATE_PATH, 'r', encoding='utf-8') as file:
+                self._template = (stamp, Template(file.read()))
+        return self._template
 
     @staticmethod
-    def _generate_movie_html(movie):
+    def _website_on_disk_is(website_html):
+        '''
+        Check whether the website on disk already contains website_html.
+        '''
+        try:
+            with open(WEBSITE_PATH, 'r', encoding='utf-8') as file:
+                return file.read() == website_html
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _generate_movie_html(movie, image=None):
         '''
         Generate Website Helper Function
+
+        Args:
+            movie (dict): The movie data.
+            image (tuple): The local poster, its width and its height, or
+            None to link the poster_url.
         '''
 
         title = movie.get('title', 'Title not available')
@@ -36,13 +104,16 @@ class Utility:
         rating = movie.get('rating', 0)
         notes = movie.get('notes', "No Notes Added")
         link = f"https://www.imdb.com/title/{movie.get('imdbID')}"
-        if poster in ('N/A', None):
-            poster = "https://images.unsplash.com/photo-1531297484001-80022131f5a1?ixlib=rb-4.0.3&ixid=MnwxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8&auto=format&fit=crop&w=1420&q=80"
+        if image is None:
+            image = PLACEHOLDER_POSTER if poster in ('N/A', None) else (poster, None, None)
+        poster, width, height = image
+        size = f' width="{width}" height="{height}"' if width and height else ''
         return f"""
         <div class="col-md-4 mb-4">
             <a href="{link}" target="_blank">
                 <div class="card h-100 shadow">
-                    <img class="card-img-top movie-poster" src="{poster}" alt="{title}">
+                    <img class="card-img-top movie-poster" src="{poster}" alt="{title}"
+                         loading="lazy" decoding="async"{size}>
                     <div class="card-body">
                         <h5 class="card-title movie-title">{title}</h5>
                         <div class="d-flex justify-content-between movie-details">
@@ -58,68 +129,210 @@ class Utility:
         </div>
         """
 
-    def generate_website(self):
+    def _generate_charts_html(self):
+        '''
+        Generate the section of the website showing the charts.
+        '''
+        figures = ''.join(f"""
+            <div class="col-md-6 mb-4">
+                <img class="img-fluid chart" src="{src}" alt="{title}"
+                     loading="lazy" decoding="async" width="{width}" height="{height}">
+            </div>""" for src, title, width, height in chart_images(CHART_DIR, self._chart_format))
+        return f"""
+        <div class="row charts">{figures}
+        </div>
+        """
+
+    @metrics.timed("website.generate")
+    def generate_website(self, page_size=None, group_by=None, workers=None):
         '''
         Generate Website Code.
+
+        Only the cards of movies whose shown fields changed since the last
+        call are rendered again, and index.html is left untouched if
+        neither the cards nor the template changed.
+
+        With a page_size the website is split into pages instead, see
+        site_pages.generate_pages. In streaming mode the single page is
+        written card by card as the movies are read.
+
+        The posters are downloaded first, see posters.PosterStore, and the
+        cards show their local thumbnails. In streaming mode only the
+        posters downloaded before are shown locally, the others are linked.
+        The charts of the ratings are drawn again if their data changed,
+        see charts.render_charts, and shown above the cards.
+
+        Args:
+            page_size (int): The number of movies per page, or None for a single page.
+            group_by (str): Group the pages by 'genre', 'year' or 'letter'.
+            workers (int): The number of processes rendering pages.
+
+        Returns:
+            dict: The poster download report, see PosterStore.sync, or None
+            if no posters were downloaded.
         '''
+        if self._streaming and not page_size:
+            self._stream_website()
+            return None
         movies = self._storage.load_movies()
-        movie_html = ''.join(self._generate_movie_html(movie) for movie in movies.values())
+        report, images = self._download_posters(movies.values())
+        render_charts(self._storage.rating_stats(), CHART_DIR, self._chart_format)
+        charts_html = self._generate_charts_html()
+        if page_size:
+            _, template = self._load_template()
+            generate_pages(movies, template.template, os.path.dirname(WEBSITE_PATH),
+                           page_size, group_by, workers, images, charts_html)
+            self._website_state = None
+            return report
+
+        keys = [(*(movie.get(field) for field in CARD_FIELDS), images.get(movie.get('poster_url')))
+                for movie in movies.values()]
+        template_stamp, template = self._load_template()
+        state = (template_stamp, charts_html, keys)
+        if state == self._website_state:
+            return report
+
+        card_cache = {}
+        rendered = 0
+        for key, movie in zip(keys, movies.values()):
+            card = self._card_cache.get(key)
+            if card is None:
+                card = self._generate_movie_html(movie, key[-1])
+                rendered += 1
+            card_cache[key] = card
+        self._card_cache = card_cache
+        metrics.count("website.cards_rendered", rendered)
+        metrics.count("website.cards_reused", len(keys) - rendered)
+
+        website_html = template.substitute(movie_list=''.join(card_cache[key] for key in keys),
+                                           charts=charts_html)
+        if self._website_state is not None or not self._website_on_disk_is(website_html):
+            with open(WEBSITE_PATH, 'w', encoding='utf-8') as file:
+                file.write(website_html)
+        self._website_state = state
+        return report
+
+    def _download_posters(self, movies):
+        '''
+        Download the posters of movies for the website.
 
-        with open('_static/index_template.html', 'r', encoding='utf-8') as file:
-            template = Template(file.read())
+        Returns:
+            tuple: The PosterStore.sync report, or None if posters are
+            linked, and the local images keyed by poster URL.
+        '''
+        if self._posters is None:
+            return None, {}
+        with metrics.timer("website.posters"):
+            report = self._posters.sync(movie.get('poster_url') for movie in movies)
+        return report, self._posters.images()
+
+    def _stream_website(self):
+        '''
+        Write the single page website card by card while going over the
+        movies, so the page is never held in memory as a whole. The rating
+        statistics of the charts are counted in the same pass.
+        '''
+        _, template = self._load_template()
+        marker = '\0'
+        head, tail = template.substitute(movie_list=marker,
+                                         charts=self._generate_charts_html()).split(marker, 1)
+        images = self._posters.images() if self._posters is not None else {}
 
-        website_html = template.substitute(movie_list=movie_html)
+        def write_cards(file):
+            for title, movie in self._storage.iter_movies():
+                file.write(self._generate_movie_html(movie, images.get(movie.get('poster_url'))))
+                metrics.count("website.cards_rendered")
+                yield title, movie
 
-        with open('_static/index.html', 'w', encoding='utf-8') as file:
-            file.write(website_html)
+        with atomic_write(WEBSITE_PATH) as temp_path:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                file.write(head)
+                stats = stream_stats(write_cards(file))
+                file.write(tail)
+        render_charts(stats, CHART_DIR, self._chart_format)
+        self._website_state = None
+
+    @metrics.timed("utility.rating_stats")
+    def rating_stats(self):
+        """
+        Calculate the rating statistics of the movies.
+
+        Returns:
+            dict: The rating statistics, see rating_stats.summarize.
+        """
+        if self._streaming:
+            return stream_stats(self._storage.iter_movies())
+        return self._storage.rating_stats()
 
     def stats(self):
         """Calculate and print stats of the movies."""
-        movies = self._storage.load_movies()
-        n = len(movies)
-        # Calculate average rating
-        avg = round(sum(float(movie['rating']) for movie in movies.values()) / n, 2)
-        print(f"1. Average rating in the database: {avg}")
-
-        # Calculate median rating
-        sorted_ratings = sorted(movie['rating'] for movie in movies.values())
-        mid = n // 2
-        if n % 2 == 0:  # Even number of values
-            median = (sorted_ratings[mid - 1] + sorted_ratings[mid]) / 2
-        else:  # Odd number of values
-            median = sorted_ratings[mid]
-        print(f"2. Median rating in the database: {median}")
+        stats = self.rating_stats()
+        if not stats['count']:
+            print(Fore.RED, "No rated movies in the database.", Style.RESET_ALL)
+            return
+        print(f"1. Average rating in the database: {round(stats['average'], 2)}")
+        print(f"2. Median rating in the database: {round(stats['median'], 2)}")
 
         # The best and worst movie/movies
-        max_rating = sorted_ratings[-1]
-        min_rating = sorted_ratings[0]
-        best_movies = []
-        worst_movies = []
-        for movie, data in movies.items():
-            if data['rating'] == min_rating:
-                worst_movies.append(movie)
-            elif data['rating'] == max_rating:
-                best_movies.append(movie)
-        temp1 = '\n'.join(best_movies)
-        temp2 = '\n'.join(worst_movies)
+        temp1 = '\n'.join(stats['best'])
+        temp2 = '\n'.join(stats['worst'])
         print(f"3. The best movie(s) by rating:\n{temp1}")
         print(f"   The worst movie(s) by rating:\n{temp2}")
 
-    def random_movie(self):
-        """Suggest a random movie from the list."""
-        movies = self._storage.load_movies()
-        rand = random.randint(0, (len(movies) - 1))
-        temp = list(movies.items())
-        print(f"Here's my movie suggestion for you: "
-            f"{temp[rand][0]} ({temp[rand][1]['year']}), Rating: {temp[rand][1]['rating']}")
+        percentiles = ', '.join(f"p{percentile}: {round(rating, 2)}"
+                                for percentile, rating in stats['percentiles'].items())
+        print(f"4. Rating percentiles: {percentiles}")
+        print("5. Ratings by genre and by decade:")
+        for group in ('genres', 'decades'):
+            for name, summary in stats[group].items():
+                label = f"{name}s" if group == 'decades' else name
+                print(f"   {label:<12}{summary['count']:>8} movies, average "
+                      f"{summary['average']:.2f}, median {summary['median']:.2f}")
+
+    @metrics.timed("utility.random_movie")
+    def random_movie(self, count=1, weight=None):
+        """
+        Suggest random movies. Uniform suggestions are not repeated before
+        every movie was suggested, weighted ones favour the movies with the
+        most weight.
+
+        Args:
+            count (int): The number of movies to suggest, for a movie night list.
+            weight (str): None for uniform suggestions, 'rating', 'recency'
+            or 'genre:<name>'.
+        """
+        suggestions = self._storage.sample_movies(count, weight)
+        if not suggestions:
+            print(Fore.RED, "No movies to suggest...", Style.RESET_ALL)
+        elif len(suggestions) == 1:
+            title, year, rating = suggestions[0]
+            print(f"Here's my movie suggestion for you: "
+                f"{title} ({year}), Rating: {rating}")
+        else:
+            print("Here are my movie suggestions for you:")
+            for title, year, rating in suggestions:
+                print(f"{title} ({year}), Rating: {rating}")
+
+    @metrics.timed("utility.find_movies")
+    def find_movies(self, query, limit=SEARCH_LIMIT):
+        """
+        Find the movies best matching query.
+
+        Args:
+            query (str): The words to search for.
+            limit (int): The maximum number of results, or None for all.
+
+        Returns:
+            dict: The matching titles mapped to their rating, best match first.
+        """
+        if self._streaming:
+            return {title: movie.get('rating') for title, movie in
+                    scan_movies(self._storage.iter_movies(), query, limit)}
+        return self._storage.search_movies(query, limit)
 
     def search_movie(self, query):
-        """Search movies by query."""
-        movies = self._storage.load_movies()
-        matching_movies = {}
-        for movie, data in movies.items():
-            if query.lower() in movie.lower():
-                matching_movies[movie] = data['rating']
+        """Search movies by query, showing the best matches first."""
+        matching_movies = self.find_movies(query)
 
         if len(matching_movies) == 0:
             print(Fore.RED, "No matching movies found...", Style.RESET_ALL)
@@ -127,23 +340,46 @@ class Utility:
             print("Matching movies:")
             print(matching_movies)
 
-    def movies_sorted_by_rating(self):
-        """Print movies sorted by rating."""
-        movies = self._storage.load_movies()
-        sorted_movies = sorted(movies.items(), key=lambda x: x[1]['rating'], reverse=True)
+    @metrics.timed("utility.sorted_by_rating")
+    def movies_sorted_by_rating(self, offset=0, limit=None, **filters):
+        """
+        Print one page of movies sorted by rating.
 
-        print("\nMovies sorted by ratings: \n------------------------------------------ \n")
-        for movie in sorted_movies:
-            title = movie[0].ljust(30)
-            rating = movie[1]['rating']
-            print(f"{title}{rating}")
+        Args:
+            offset (int): The number of movies to skip.
+            limit (int): The number of movies per page, or None for all.
+            **filters: The rating and year range and ordering, see
+            IStorage.query_movies.
 
+        Returns:
+            bool: Whether there are more movies after this page.
+        """
+        sorted_movies = self._storage.query_movies(
+            offset=offset, limit=None if limit is None else limit + 1, **filters)
+        more = limit is not None and len(sorted_movies) > limit
+
+        if offset == 0:
+            if not sorted_movies:
+                print(Fore.RED, "No matching movies found...", Style.RESET_ALL)
+            print("\nMovies sorted by ratings: \n------------------------------------------ \n")
+        for title, year, rating in sorted_movies[:limit]:
+            print(f"{title.ljust(30)}{str(year or '').ljust(6)}{rating}")
+        return more
+
+    @metrics.timed("utility.charts")
     def create_rating_histogram(self):
-        """Create histogram of movie ratings."""
-        movies = self._storage.load_movies()
-        ratings = [movie['rating'] for movie in movies.values()]
-        plt.hist(ratings)
-        plt.xlabel('Rating')
-        plt.ylabel('Frequency')
-        plt.title('Movie Rating Histogram')
-        plt.show()
+        """
+        Draw the rating charts to files, without opening a window, and
+        print where they are. Charts whose data did not change are not
+        drawn again.
+
+        Returns:
+            list: The paths of the charts.
+        """
+        drawn = render_charts(self.rating_stats(), CHART_DIR, self._chart_format)
+        paths = [os.path.join(os.path.dirname(WEBSITE_PATH), src)
+                 for src, _, _, _ in chart_images(CHART_DIR, self._chart_format)]
+        print(f"Charts ({len(drawn)} redrawn):")
+        for path in paths:
+            print(f"  {path}")
+        return paths